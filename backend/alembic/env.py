@@ -3,7 +3,7 @@ from sqlalchemy import engine_from_config, pool
 from alembic import context
 
 from models.visit import Base
-from core.config import settings
+from core.config import get_settings
 
 config = context.config
 
@@ -12,7 +12,7 @@ if config.config_file_name is not None:
 
 target_metadata = Base.metadata
 
-config.set_main_option("sqlalchemy.url", settings.database_url)
+config.set_main_option("sqlalchemy.url", get_settings().database_url)
 config.set_main_option("sqlalchemy.pool_pre_ping", "True")
 config.set_main_option("sqlalchemy.pool_recycle", "3600")
 
@@ -24,6 +24,17 @@ def upgrade() -> None:
     )
     op.create_index(op.f('ix_urls_id'), 'urls', ['id'], unique=False)
     op.create_index(op.f('ix_urls_url'), 'urls', ['url'], unique=True)
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite cannot ALTER constraints; batch mode rebuilds the table instead
+        with op.batch_alter_table('visits') as batch_op:
+            batch_op.add_column(sa.Column('url_id', sa.Integer(), nullable=False))
+            batch_op.drop_index('idx_url_datetime')
+            batch_op.drop_index('ix_visits_url')
+            batch_op.create_index('idx_url_id_datetime', ['url_id', 'datetime_visited'], unique=False)
+            batch_op.create_index('ix_visits_url_id', ['url_id'], unique=False)
+            batch_op.create_foreign_key('fk_visits_url_id_urls', 'urls', ['url_id'], ['id'])
+            batch_op.drop_column('url')
+        return
     op.add_column('visits', sa.Column('url_id', sa.Integer(), nullable=False))
     op.drop_index(op.f('idx_url_datetime'), table_name='visits')
     op.drop_index(op.f('ix_visits_url'), table_name='visits')
@@ -35,6 +46,19 @@ def upgrade() -> None:
 
 
 def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('visits') as batch_op:
+            batch_op.add_column(sa.Column('url', sa.VARCHAR(), nullable=False))
+            batch_op.drop_constraint('fk_visits_url_id_urls', type_='foreignkey')
+            batch_op.drop_index('ix_visits_url_id')
+            batch_op.drop_index('idx_url_id_datetime')
+            batch_op.create_index('ix_visits_url', ['url'], unique=False)
+            batch_op.create_index('idx_url_datetime', ['url', 'datetime_visited'], unique=False)
+            batch_op.drop_column('url_id')
+        op.drop_index(op.f('ix_urls_url'), table_name='urls')
+        op.drop_index(op.f('ix_urls_id'), table_name='urls')
+        op.drop_table('urls')
+        return
     # ### commands auto generated by Alembic - please adjust! ###
     op.add_column('visits', sa.Column('url', sa.VARCHAR(), autoincrement=False, nullable=False))
     op.drop_constraint(None, 'visits', type_='foreignkey')
@@ -0,0 +1,33 @@
+"""add url sketches
+
+Revision ID: 5d8e2a7f4b90
+Revises: 9e4b7d2c6a15
+Create Date: 2026-10-18 15:21:47.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '5d8e2a7f4b90'
+down_revision = '9e4b7d2c6a15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'url_sketches',
+        sa.Column('url_id', sa.Integer(), nullable=False),
+        sa.Column('visit_days', sa.LargeBinary(), nullable=True),
+        sa.Column('clients', sa.LargeBinary(), nullable=True),
+        sa.Column('backfill_pending', sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.ForeignKeyConstraint(['url_id'], ['urls.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('url_id')
+    )
+    # Existing URLs get their visit days from the backfill maintenance job
+    op.execute("INSERT INTO url_sketches (url_id, backfill_pending) SELECT id, true FROM urls")
+
+
+def downgrade() -> None:
+    op.drop_table('url_sketches')
@@ -0,0 +1,36 @@
+"""add client visit id to visits
+
+Revision ID: 7c2f5a9d31e4
+Revises: 13b6e3f931a8
+Create Date: 2026-10-18 10:12:40.218553
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '7c2f5a9d31e4'
+down_revision = '13b6e3f931a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite cannot ALTER constraints; batch mode rebuilds the table instead
+        with op.batch_alter_table('visits') as batch_op:
+            batch_op.add_column(sa.Column('client_visit_id', sa.String(length=36), nullable=True))
+            batch_op.create_unique_constraint('uq_visits_client_visit_id', ['client_visit_id'])
+        return
+    op.add_column('visits', sa.Column('client_visit_id', sa.String(length=36), nullable=True))
+    op.create_unique_constraint('uq_visits_client_visit_id', 'visits', ['client_visit_id'])
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.batch_alter_table('visits') as batch_op:
+            batch_op.drop_constraint('uq_visits_client_visit_id', type_='unique')
+            batch_op.drop_column('client_visit_id')
+        return
+    op.drop_constraint('uq_visits_client_visit_id', 'visits', type_='unique')
+    op.drop_column('visits', 'client_visit_id')
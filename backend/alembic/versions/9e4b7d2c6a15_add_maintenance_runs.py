@@ -0,0 +1,28 @@
+"""add maintenance runs
+
+Revision ID: 9e4b7d2c6a15
+Revises: 7c2f5a9d31e4
+Create Date: 2026-10-18 14:02:11.530418
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '9e4b7d2c6a15'
+down_revision = '7c2f5a9d31e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'maintenance_runs',
+        sa.Column('job', sa.String(length=64), nullable=False),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('job')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('maintenance_runs')
@@ -0,0 +1,30 @@
+"""add import checkpoints
+
+Revision ID: b81f4c6e2d93
+Revises: 5d8e2a7f4b90
+Create Date: 2026-10-19 10:12:36.402981
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'b81f4c6e2d93'
+down_revision = '5d8e2a7f4b90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'import_checkpoints',
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('last_visit_id', sa.BigInteger(), nullable=False),
+        sa.Column('imported_visits', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('source')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('import_checkpoints')
@@ -0,0 +1,66 @@
+"""covering visits index
+
+Revision ID: e3a71c5d9f28
+Revises: b81f4c6e2d93
+Create Date: 2026-10-19 16:40:12.530714
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'e3a71c5d9f28'
+down_revision = 'b81f4c6e2d93'
+branch_labels = None
+depends_on = None
+
+# Duplicates of the primary keys, and a prefix of idx_url_id_datetime
+REDUNDANT_INDEXES = [('ix_visits_id', 'visits', ['id']), ('ix_urls_id', 'urls', ['id']),
+                     ('ix_visits_url_id', 'visits', ['url_id'])]
+COVERING_COLUMNS = ['url_id', sa.text('datetime_visited DESC'), sa.text('id DESC')]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        for name, table, _ in REDUNDANT_INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True)
+        op.drop_index('idx_url_id_datetime', table_name='visits')
+        op.create_index('idx_url_id_datetime', 'visits', COVERING_COLUMNS)
+        return
+    # CONCURRENTLY keeps visits writable while the index builds, but cannot run
+    # in a transaction. The new index is built under a temporary name so reads
+    # always have one of the two; a build that failed part way leaves an
+    # invalid index behind, which is dropped when the migration is retried.
+    # Every drop tolerates a missing index so a retry after a failure at any
+    # later step (including the rename) also goes through.
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_url_id_datetime_new', table_name='visits',
+                      postgresql_concurrently=True, if_exists=True)
+        op.create_index('idx_url_id_datetime_new', 'visits', COVERING_COLUMNS,
+                        postgresql_include=['link_count', 'word_count', 'image_count'],
+                        postgresql_concurrently=True)
+        op.drop_index('idx_url_id_datetime', table_name='visits',
+                      postgresql_concurrently=True, if_exists=True)
+        for name, table, _ in REDUNDANT_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+        op.execute('ALTER INDEX idx_url_id_datetime_new RENAME TO idx_url_id_datetime')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.drop_index('idx_url_id_datetime', table_name='visits')
+        op.create_index('idx_url_id_datetime', 'visits', ['url_id', 'datetime_visited'])
+        for name, table, columns in REDUNDANT_INDEXES:
+            op.create_index(name, table, columns)
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_url_id_datetime_old', table_name='visits',
+                      postgresql_concurrently=True, if_exists=True)
+        op.create_index('idx_url_id_datetime_old', 'visits', ['url_id', 'datetime_visited'],
+                        postgresql_concurrently=True)
+        for name, table, columns in REDUNDANT_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+        op.drop_index('idx_url_id_datetime', table_name='visits',
+                      postgresql_concurrently=True, if_exists=True)
+        op.execute('ALTER INDEX idx_url_id_datetime_old RENAME TO idx_url_id_datetime')
@@ -1,33 +1,42 @@
 from datetime import datetime
 
-from fastapi import APIRouter, status
-from fastapi.responses import JSONResponse
-from sqlalchemy import text
+from fastapi import APIRouter
 
 from api.response import error_response, success_response
-from core.config import APP_VERSION, start_time
-from db.session import engine
-from utils.logger import logger
+from core.config import APP_VERSION, get_settings, start_time
+from core.health import health_prober
 
 router = APIRouter()
 
 
-@router.get("/health")
-def health_check():
+def current_health() -> tuple[bool, dict]:
+    """Readiness and details from the prober's latest result; never touches the database."""
+    result = health_prober.latest
+    stale = result is None or result.age() > get_settings().health_max_staleness_seconds
+    ready = not stale and result.connected
     health_status = {
-        "status": "healthy",
+        "status": "healthy" if ready else "unhealthy",
         "version": APP_VERSION,
         "uptime_seconds": (datetime.now() - start_time).total_seconds(),
+        "database": "unknown" if result is None else "connected" if result.connected else "disconnected",
     }
-    
-    try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        health_status["database"] = "connected"
-    except Exception as e:
-        logger.error("Database health check failed", extra={"error": str(e)})
-        health_status["database"] = "disconnected"
-        health_status["status"] = "unhealthy"
+    if result is not None:
+        health_status["probe"] = {
+            "latency_ms": round(result.latency_ms, 2),
+            "age_seconds": round(result.age(), 2),
+            "stale": stale,
+        }
+        if result.error:
+            health_status["probe"]["error"] = result.error
+        if result.pool is not None:
+            health_status["pool"] = result.pool
+    return ready, health_status
+
+
+@router.get("/health")
+async def health_check():
+    ready, health_status = current_health()
+    if not ready:
         return error_response(
             message="Service unhealthy",
             status_code=503,
@@ -40,10 +49,36 @@ def health_check():
     )
 
 
+@router.get("/health/live")
+async def liveness():
+    """The process is up and serving; deliberately independent of the database."""
+    return success_response(
+        data={"status": "alive", "uptime_seconds": (datetime.now() - start_time).total_seconds()},
+        message="Service is alive"
+    )
+
+
+@router.get("/health/ready")
+async def readiness():
+    """Whether to route traffic here: the latest probe succeeded and is recent enough."""
+    ready, health_status = current_health()
+    data = {key: health_status[key] for key in ("status", "database")}
+    if not ready:
+        return error_response(
+            message="Service not ready",
+            status_code=503,
+            data=data
+        )
+    
+    return success_response(
+        data=data,
+        message="Service is ready"
+    )
+
+
 @router.get("/")
 def root():
     return success_response(
         data={"message": "History Sidepanel API"},
         message="API is running"
     )
-
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from utils.metrics import CONTENT_TYPE_LATEST, registry
+
+router = APIRouter()
+
+
+# Async so scrapes are served on the event loop even when the threadpool is saturated
+@router.get("/internal/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(content=registry.render(), media_type=CONTENT_TYPE_LATEST)
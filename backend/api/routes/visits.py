@@ -1,12 +1,32 @@
+from collections import Counter
+from typing import Literal
+
 from fastapi import APIRouter, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from sqlalchemy.orm import Session
 
-from api.response import success_response
-from api.schemas import VisitCreate, VisitResponse, PaginatedVisitResponse
-from db.session import get_db
+from api.response import error_response, success_response
+from api.schemas import (
+    VisitCreate,
+    VisitResponse,
+    HISTORY_COLUMNS,
+    ContentMetricsResponse,
+    PageSummaryResponse,
+    PaginatedVisitResponse,
+    VisitChangesResponse,
+    history_columns,
+    validate_visit_batch,
+)
+from core.config import get_settings
+from db.session import get_db, get_read_db, track_client_write
+from models.visit import VisitRow
 from repositories.visit_repository import VisitRepository
+from services.events import TooManySubscribers, broadcaster, event_stream
 from services.visit_service import VisitService
 
 limiter = Limiter(key_func=get_remote_address)
@@ -18,53 +38,84 @@ def get_visit_service(db: Session = Depends(get_db)) -> VisitService:
     return VisitService(repository)
 
 
+def get_read_visit_service(db: Session = Depends(get_read_db)) -> VisitService:
+    repository = VisitRepository(db)
+    return VisitService(repository)
+
+
+def client_visit_id(visit: VisitCreate) -> str | None:
+    return str(visit.client_visit_id) if visit.client_visit_id else None
+
+
 def validate_url(url: str = Query(..., min_length=1)) -> str:
     return url.rstrip("/")
 
 
-@router.post("")
+@router.post("", dependencies=[Depends(track_client_write)])
 @limiter.limit("30/minute")
 def create_visit(
         request: Request,
         visit_data: VisitCreate,
         service: VisitService = Depends(get_visit_service)
 ):
-    visit = service.record_visit(
+    visit, created = service.record_visit(
         url=str(visit_data.url),
         title=visit_data.title,
         description=visit_data.description,
         link_count=visit_data.link_count,
         word_count=visit_data.word_count,
-        image_count=visit_data.image_count
+        image_count=visit_data.image_count,
+        client_visit_id=client_visit_id(visit_data),
+        datetime_visited=visit_data.datetime_visited,
+        client_key=get_remote_address(request)
     )
+    data = VisitResponse.model_validate(visit).model_dump()
+    # A retried visit that is already stored changes nothing subscribers can see
+    if created:
+        broadcaster.publish([{"type": "visits", "url": data["url"], "count": 1, "visit": data}])
     return success_response(
-        data=VisitResponse.model_validate(visit).model_dump(),
-        message="Visit created successfully",
+        data=data,
+        message="Visit created successfully" if created else "Visit already recorded",
         status_code=201
     )
 
 
-@router.post("/batch")
+async def parse_visit_batch(request: Request) -> list[VisitRow]:
+    body = await request.body()
+    try:
+        return validate_visit_batch(body, get_settings().batch_max_items)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        )
+
+
+@router.post(
+    "/batch",
+    dependencies=[Depends(track_client_write)],
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {
+            "type": "array", "items": {"$ref": "#/components/schemas/VisitCreate"}
+        }}}
+    }}
+)
 @limiter.limit("10/minute")
 def create_visits_batch(
         request: Request,
-        visits: list[VisitCreate],
+        visits: list[VisitRow] = Depends(parse_visit_batch),
         service: VisitService = Depends(get_visit_service)
 ):
-    visits_data = [
-        {
-            'url': str(visit.url),
-            'title': visit.title,
-            'description': visit.description,
-            'link_count': visit.link_count,
-            'word_count': visit.word_count,
-            'image_count': visit.image_count
-        }
-        for visit in visits
-    ]
-    created_count = service.batch_record_visits(visits_data)
+    created_count, duplicate_count = service.batch_record_rows(
+        visits, get_settings().batch_chunk_size, client_key=get_remote_address(request)
+    )
+    if created_count:
+        broadcaster.publish([
+            {"type": "visits", "url": url, "count": count, "visit": None}
+            for url, count in Counter(row.url for row in visits).items()
+        ])
     return success_response(
-        data={'created_count': created_count},
+        data={'created_count': created_count, 'duplicate_count': duplicate_count},
         message="Visits created successfully",
         status_code=201
     )
@@ -77,8 +128,25 @@ def get_visit_history(
         url: str = Depends(validate_url),
         page: int = Query(1, ge=1),
         page_size: int = Query(10, ge=1, le=100),
-        service: VisitService = Depends(get_visit_service)
+        format: Literal["items", "columnar"] = Query("items"),
+        timestamps: Literal["iso", "epoch_ms"] = Query("iso"),
+        service: VisitService = Depends(get_read_visit_service)
 ):
+    if format == "columnar":
+        # Built straight from row tuples: the URL is sent once and no per-row models are created
+        rows, total = service.get_history_rows(url, page, page_size)
+        return success_response(
+            data={
+                "url": url,
+                "columns": history_columns(rows, timestamps),
+                "total": total,
+                "page": page,
+                "page_size": page_size,
+                "has_more": (page * page_size) < total
+            },
+            message="History retrieved successfully"
+        )
+    
     visits, total = service.get_history(url, page, page_size)
     has_more = (page * page_size) < total
     
@@ -96,15 +164,128 @@ def get_visit_history(
     )
 
 
+@router.get("/history/changes")
+@limiter.limit("60/minute")
+def get_visit_history_changes(
+        request: Request,
+        url: str = Depends(validate_url),
+        since_id: int = Query(..., ge=1),
+        limit: int = Query(100, ge=1, le=100),
+        service: VisitService = Depends(get_read_visit_service)
+):
+    changes = service.get_history_changes(url, since_id, limit + 1)
+    if changes is None:
+        # The watermark is gone (e.g. pruned); the client reloads the first page
+        response_data = VisitChangesResponse(items=[], total=0, since_id=since_id, has_more=False, reset=True)
+    else:
+        visits, total = changes
+        response_data = VisitChangesResponse(
+            items=visits[:limit],
+            total=total,
+            since_id=visits[min(len(visits), limit) - 1].id if visits else since_id,
+            has_more=len(visits) > limit,
+            reset=False
+        )
+    
+    return success_response(
+        data=response_data.model_dump(),
+        message="History changes retrieved successfully"
+    )
+
+
 @router.get("/metrics")
 @limiter.limit("60/minute")
 def get_page_metrics(
         request: Request,
         url: str = Depends(validate_url),
-        service: VisitService = Depends(get_visit_service)
+        service: VisitService = Depends(get_read_visit_service)
 ):
     metrics = service.get_page_metrics(url)
     return success_response(
         data=metrics,
         message="Metrics retrieved successfully"
     )
+
+
+@router.get("/metrics/content")
+@limiter.limit("60/minute")
+def get_content_metrics(
+        request: Request,
+        url: str = Depends(validate_url),
+        service: VisitService = Depends(get_read_visit_service)
+):
+    """Distribution and change over time of word, link and image counts across all visits."""
+    response_data = ContentMetricsResponse(url=url, **service.get_content_metrics(url))
+    return success_response(
+        data=response_data.model_dump(),
+        message="Content metrics retrieved successfully"
+    )
+
+
+@router.get("/summary")
+@limiter.limit("60/minute")
+def get_page_summary(
+        request: Request,
+        url: str = Depends(validate_url),
+        page_size: int = Query(10, ge=1, le=100),
+        service: VisitService = Depends(get_read_visit_service)
+):
+    """Latest visit, metrics and the first history page in one request (and one query)."""
+    rows, metrics = service.get_page_summary(url, page_size)
+    items = [VisitResponse(url=url, **dict(zip(HISTORY_COLUMNS, row))) for row in rows]
+    total = metrics["total_visits"]
+    response_data = PageSummaryResponse(
+        url=url,
+        latest_visit=items[0] if items else None,
+        metrics=metrics,
+        history=PaginatedVisitResponse(
+            items=items, total=total, page=1, page_size=page_size, has_more=page_size < total
+        )
+    )
+    
+    return success_response(
+        data=response_data.model_dump(),
+        message="Summary retrieved successfully"
+    )
+
+
+@router.get("/stream")
+@limiter.limit("30/minute")
+async def stream_visit_events(
+        request: Request,
+        url: str = Depends(validate_url),
+        db: Session = Depends(get_read_db)
+):
+    """Server-Sent Events for one URL: ``visits`` when visits are recorded,
+    then fresh ``metrics``; ``resync`` if the client fell behind."""
+    settings = get_settings()
+    try:
+        subscription = broadcaster.subscribe(url)
+    except TooManySubscribers:
+        return error_response(
+            message="Too many open streams, fall back to polling",
+            status_code=503,
+            error_codes=["too_many_streams"]
+        )
+
+    # The session only holds a connection while metrics are being read
+    db.close()
+
+    def read_metrics() -> dict:
+        try:
+            return VisitRepository(db).get_metrics_by_url(url)
+        finally:
+            db.close()
+
+    async def load_metrics() -> dict:
+        return await run_in_threadpool(read_metrics)
+
+    return StreamingResponse(
+        event_stream(
+            broadcaster, subscription, load_metrics,
+            settings.sse_heartbeat_seconds, settings.sse_max_stream_seconds
+        ),
+        media_type="text/event-stream",
+        # Cache-Control: no-store comes from the security headers middleware
+        headers={"X-Accel-Buffering": "no"}
+    )
@@ -1,11 +1,63 @@
 from datetime import datetime, timezone
-from pydantic import BaseModel, HttpUrl, Field, field_validator, field_serializer
+from functools import lru_cache
+from typing import Annotated, Any, Optional
+from uuid import UUID
+from pydantic import (
+    AfterValidator,
+    BaseModel,
+    Field,
+    HttpUrl,
+    TypeAdapter,
+    ValidationError,
+    ValidationInfo,
+    field_serializer,
+    field_validator,
+)
+from pydantic_core import PydanticCustomError
+from typing_extensions import NotRequired, TypedDict
 import html
 import re
 
+from models.visit import VisitRow
+
+_FRAGMENT_RE = re.compile(r'#.*$')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_url_value(url) -> str:
+    """Normalize URL: strip trailing slash, remove fragments (query params are kept)"""
+    url_str = str(url).strip()
+    url_str = url_str.rstrip('/')
+    return _FRAGMENT_RE.sub('', url_str)
+
+
+def sanitize_text_value(v: str | None) -> str | None:
+    """Escape HTML, drop null bytes and collapse whitespace to prevent XSS"""
+    if v is None:
+        return v
+    sanitized = html.escape(v.strip())
+    sanitized = sanitized.replace('\x00', '')
+    sanitized = _WHITESPACE_RE.sub(' ', sanitized)
+    return sanitized if sanitized else None
+
+
+def check_datetime_visited(v: datetime | None, now: datetime | None = None) -> datetime | None:
+    """Treat naive times as UTC and clamp times in the future to now.
+
+    A client whose clock runs ahead would otherwise have every batch
+    containing one of its visits rejected, and re-send it forever.
+    """
+    if v is None:
+        return v
+    if v.tzinfo is None:
+        v = v.replace(tzinfo=timezone.utc)
+    return min(v, now or datetime.now(timezone.utc))
+
 
 class VisitCreate(BaseModel):
     url: HttpUrl
+    client_visit_id: UUID | None = None
+    datetime_visited: datetime | None = None
     title: str | None = Field(default=None, max_length=500)
     description: str | None = Field(default=None, max_length=2000)
     link_count: int = Field(default=0, ge=0, le=100000)
@@ -18,26 +70,106 @@ class VisitCreate(BaseModel):
         """Normalize URL: strip trailing slash, convert to lowercase domain, remove fragments"""
         if v is None:
             return v
-        url_str = str(v).strip()
-        # Remove trailing slash
-        url_str = url_str.rstrip('/')
-        # Remove fragments (but keep query params)
-        url_str = re.sub(r'#.*$', '', url_str)
-        return url_str
+        return normalize_url_value(v)
     
     @field_validator('title', 'description')
     @classmethod
     def sanitize_text(cls, v):
         """Sanitize text fields to prevent XSS attacks"""
-        if v is None:
-            return v
-        # Escape HTML entities
-        sanitized = html.escape(v.strip())
-        # Remove null bytes
-        sanitized = sanitized.replace('\x00', '')
-        # Limit consecutive whitespace
-        sanitized = re.sub(r'\s+', ' ', sanitized)
-        return sanitized if sanitized else None
+        return sanitize_text_value(v)
+    
+    @field_validator('datetime_visited')
+    @classmethod
+    def validate_datetime_visited(cls, v):
+        return check_datetime_visited(v)
+
+
+# Batch fast path: the same rules as VisitCreate, validated by one TypeAdapter
+# straight from JSON into plain dicts (no model per item). URLs and texts repeat
+# heavily within a sync, so their normalization is memoized per batch through
+# the validation context.
+_HTTP_URL = TypeAdapter(HttpUrl)
+
+
+def _batch_url(value: Any, info: ValidationInfo) -> str:
+    # Typed as Any so non-string input fails with HttpUrl's own url_type error
+    cache = info.context["urls"]
+    normalized = cache.get(value) if isinstance(value, str) else None
+    if normalized is None:
+        try:
+            url = _HTTP_URL.validate_python(value)
+        except ValidationError as e:
+            # Re-raise with the original type, message and context, located at this item's url
+            error = e.errors()[0]
+            raise PydanticCustomError(error["type"], error["msg"], error.get("ctx"))
+        normalized = normalize_url_value(url)
+        cache[value] = normalized
+    return normalized
+
+
+def _batch_datetime(value: datetime | None, info: ValidationInfo) -> datetime | None:
+    return check_datetime_visited(value, info.context["now"])
+
+
+def _batch_text(value: str | None, info: ValidationInfo) -> str | None:
+    if value is None:
+        return None
+    cache = info.context["texts"]
+    if value not in cache:
+        cache[value] = sanitize_text_value(value)
+    return cache[value]
+
+
+def _batch_client_id(value: UUID | None) -> str | None:
+    return str(value) if value is not None else None
+
+
+class _BatchVisit(TypedDict):
+    # Keys are declared in VisitRow order and all have defaults, so each
+    # validated dict's values() is already an insert-ready row
+    url: Annotated[Any, AfterValidator(_batch_url)]
+    client_visit_id: NotRequired[Annotated[UUID | None, Field(default=None), AfterValidator(_batch_client_id)]]
+    datetime_visited: NotRequired[Annotated[datetime | None, Field(default=None), AfterValidator(_batch_datetime)]]
+    title: NotRequired[Annotated[str | None, Field(default=None, max_length=500), AfterValidator(_batch_text)]]
+    description: NotRequired[Annotated[str | None, Field(default=None, max_length=2000), AfterValidator(_batch_text)]]
+    link_count: NotRequired[Annotated[int, Field(default=0, ge=0, le=100000)]]
+    word_count: NotRequired[Annotated[int, Field(default=0, ge=0, le=10000000)]]
+    image_count: NotRequired[Annotated[int, Field(default=0, ge=0, le=100000)]]
+
+
+VISIT_BATCH_ADAPTER = TypeAdapter(list[_BatchVisit])
+
+
+class BatchTooLargeError(ValueError):
+    def __init__(self, count: int, max_items: int):
+        super().__init__(f"Batch of {count} visits exceeds the limit of {max_items}")
+        self.count = count
+        self.max_items = max_items
+
+
+@lru_cache
+def _bounded_batch_adapter(max_items: int) -> TypeAdapter:
+    return TypeAdapter(Annotated[list[_BatchVisit], Field(max_length=max_items)])
+
+
+def validate_visit_batch(body: bytes | str, max_items: Optional[int] = None) -> list[VisitRow]:
+    """Validate a JSON array of visits into insert-ready rows.
+
+    Raises pydantic's ValidationError with the same error types, messages
+    and item locations as validating ``list[VisitCreate]``, or
+    BatchTooLargeError when there are more than ``max_items`` visits (item
+    validation stops at the first one over the limit).
+    """
+    adapter = VISIT_BATCH_ADAPTER if max_items is None else _bounded_batch_adapter(max_items)
+    context = {"urls": {}, "texts": {}, "now": datetime.now(timezone.utc)}
+    try:
+        items = adapter.validate_json(body, context=context)
+    except ValidationError as e:
+        for error in e.errors(include_url=False):
+            if error["type"] == "too_long" and error["loc"] == ():
+                raise BatchTooLargeError(error["ctx"]["actual_length"], max_items) from None
+        raise
+    return [VisitRow._make(item.values()) for item in items]
 
 
 class VisitResponse(BaseModel):
@@ -60,6 +192,29 @@ class VisitResponse(BaseModel):
         from_attributes = True
 
 
+HISTORY_COLUMNS = (
+    "id", "datetime_visited", "title", "description", "link_count", "word_count", "image_count"
+)
+
+
+def _as_utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+def history_columns(rows: list[tuple], timestamps: str = "iso") -> dict[str, list]:
+    """Transpose history row tuples into parallel arrays keyed by field name.
+
+    ``timestamps`` is ``"iso"`` (same strings as VisitResponse) or
+    ``"epoch_ms"`` (integer milliseconds since the Unix epoch).
+    """
+    columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in HISTORY_COLUMNS]
+    if timestamps == "epoch_ms":
+        columns[1] = [int(_as_utc(dt).timestamp() * 1000) for dt in columns[1]]
+    else:
+        columns[1] = [_as_utc(dt).isoformat() for dt in columns[1]]
+    return dict(zip(HISTORY_COLUMNS, columns))
+
+
 class PaginatedVisitResponse(BaseModel):
     items: list[VisitResponse]
     total: int
@@ -68,10 +223,57 @@ class PaginatedVisitResponse(BaseModel):
     has_more: bool
 
 
+class VisitChangesResponse(BaseModel):
+    items: list[VisitResponse]
+    total: int
+    since_id: int
+    has_more: bool
+    reset: bool
+
+
 class MetricsResponse(BaseModel):
     total_visits: int
 
 
+class ContentStatistics(BaseModel):
+    min: int
+    max: int
+    mean: float
+    p25: float
+    p50: float
+    p75: float
+    p90: float
+    p99: float
+    first: int
+    latest: int
+    change: int
+    change_pct: float | None
+
+
+class ContentMetricsResponse(BaseModel):
+    url: str
+    total_visits: int
+    first_visit: datetime | None
+    last_visit: datetime | None
+    word_count: ContentStatistics | None
+    link_count: ContentStatistics | None
+    image_count: ContentStatistics | None
+
+    @field_serializer('first_visit', 'last_visit')
+    def serialize_datetime(self, dt: datetime | None, _info):
+        if dt is not None and dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.isoformat() if dt is not None else None
+
+
+class PageSummaryResponse(BaseModel):
+    url: str
+    latest_visit: VisitResponse | None
+    metrics: dict
+    history: PaginatedVisitResponse
+
+
 class BatchCreateResponse(BaseModel):
     created_count: int
+    duplicate_count: int
 
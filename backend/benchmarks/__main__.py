@@ -0,0 +1,73 @@
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime, timezone
+
+import sqlalchemy
+
+from benchmarks.suite import compare_results, run_suite
+
+DEFAULT_SCALES = [10_000, 1_000_000, 10_000_000]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description=(
+            "Seed synthetic visits at several scales and time repository and endpoint calls. "
+            "WARNING: the urls/visits tables of every target database are dropped and recreated."
+        ),
+    )
+    parser.add_argument("--database-url", action="append", required=True, dest="database_urls",
+                        help="Scratch database to benchmark (repeat for SQLite and PostgreSQL)")
+    parser.add_argument("--scale", action="append", type=int, dest="scales",
+                        help="Number of visits to seed (repeatable, default: 10k, 1M, 10M)")
+    parser.add_argument("--runs", type=int, default=50, help="Timed runs per benchmark")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for URL popularity")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for reproducible data")
+    parser.add_argument("--endpoints", action="store_true", help="Also time HTTP endpoints in-process")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write JSON results")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Fail when a median slows down by more than this fraction (default 0.2)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    scales = args.scales or DEFAULT_SCALES
+
+    results = []
+    for database_url in args.database_urls:
+        results.extend(run_suite(database_url, scales, args.runs, args.skew, args.seed, args.endpoints))
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "seed": args.seed,
+        "skew": args.skew,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    comparison = compare_results(results, baseline, args.max_regression)
+    for row in comparison:
+        marker = "REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['backend']:<10} {row['scale']:>10} {row['benchmark']:<35} "
+            f"{row['baseline_ms']:>10.3f} -> {row['current_ms']:>10.3f} ms ({row['change']:+.1%}) {marker}"
+        )
+    return 1 if any(row["regression"] for row in comparison) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+import argparse
+import sys
+import time
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.seed import seed_visits, url_for
+from benchmarks.suite import PAGE_SIZE, backend_name, ensure_database, reset_schema, time_call, visit_payload
+from db.session import create_db_engine
+from repositories.visit_repository import VisitRepository
+
+URL_COUNT = 1000
+APPEND_BATCH_SIZE = 1000
+# Every non-unique index either layout has on urls and visits
+SECONDARY_INDEXES = ("ix_visits_id", "ix_urls_id", "ix_visits_url_id", "idx_url_id_datetime")
+LAYOUTS = {
+    # The indexes before the covering index migration (e3a71c5d9f28)
+    "legacy": [
+        "CREATE INDEX ix_visits_id ON visits (id)",
+        "CREATE INDEX ix_urls_id ON urls (id)",
+        "CREATE INDEX ix_visits_url_id ON visits (url_id)",
+        "CREATE INDEX idx_url_id_datetime ON visits (url_id, datetime_visited)",
+    ],
+    "covering": [
+        "CREATE INDEX idx_url_id_datetime ON visits (url_id, datetime_visited DESC, id DESC){include}",
+    ],
+}
+INCLUDE_COUNTERS = " INCLUDE (link_count, word_count, image_count)"
+
+
+def apply_layout(engine: Engine, layout: str) -> None:
+    """Replace the secondary indexes of urls and visits with ``layout``'s and refresh statistics."""
+    include = INCLUDE_COUNTERS if engine.dialect.name == "postgresql" else ""
+    with engine.begin() as conn:
+        for name in SECONDARY_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        for ddl in LAYOUTS[layout]:
+            conn.execute(text(ddl.format(include=include)))
+    _vacuum(engine)
+
+
+def _vacuum(engine: Engine) -> None:
+    # VACUUM also sets the visibility map bits index-only scans depend on
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("VACUUM ANALYZE urls"))
+            conn.execute(text("VACUUM ANALYZE visits"))
+        else:
+            conn.execute(text("ANALYZE"))
+
+
+def index_bytes(engine: Engine) -> int | None:
+    """Total size of the urls and visits indexes (PostgreSQL only)."""
+    if engine.dialect.name != "postgresql":
+        return None
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT sum(pg_relation_size(indexrelid)) FROM pg_index "
+            "WHERE indrelid IN ('urls'::regclass, 'visits'::regclass)"
+        )).scalar()
+
+
+def layout_benchmarks(engine: Engine, runs: int, append_batches: int) -> dict[str, float]:
+    """Time the per-URL reads and the write paths against the current indexes.
+
+    Appended visits are deleted again (and the table vacuumed) afterwards,
+    so layouts measured one after another see the same data.
+    """
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    hot_url, warm_url = url_for(0), url_for(20)
+    results = {}
+    with session_factory() as session:
+        repo = VisitRepository(session)
+        _, total = repo.get_visit_rows_by_url(hot_url, page=1, page_size=PAGE_SIZE)
+        deep_page = max(1, -(-total // PAGE_SIZE) // 2)
+        reads = {
+            "history page 1": lambda: repo.get_visit_rows_by_url(hot_url, page=1, page_size=PAGE_SIZE),
+            "history page mid": lambda: repo.get_visit_rows_by_url(hot_url, page=deep_page, page_size=PAGE_SIZE),
+            "summary": lambda: repo.get_summary_by_url(warm_url),
+            "content version": lambda: repo.get_content_version(hot_url),
+            "content columns": lambda: repo.get_content_columns(hot_url),
+        }
+        for name, read in reads.items():
+            results[f"{name} (ms)"] = time_call(read, runs, warmup=3)["median_ms"]
+            session.rollback()
+
+        with engine.connect() as conn:
+            max_id = conn.execute(text("SELECT max(id) FROM visits")).scalar() or 0
+        urls = [url_for(i % URL_COUNT) for i in range(APPEND_BATCH_SIZE)]
+        start = time.perf_counter()
+        for _ in range(append_batches):
+            repo.bulk_create_visits([visit_payload(url) for url in urls])
+        results["bulk insert (visits/s)"] = round(append_batches * APPEND_BATCH_SIZE / (time.perf_counter() - start))
+        payload = visit_payload(warm_url)
+        results["create_visit (ms)"] = time_call(
+            lambda: repo.create_visit(
+                payload["url"], payload["title"], payload["description"],
+                payload["link_count"], payload["word_count"], payload["image_count"]
+            ),
+            runs
+        )["median_ms"]
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM visits WHERE id > :max_id"), {"max_id": max_id})
+    _vacuum(engine)
+    size = index_bytes(engine)
+    if size is not None:
+        results["index size (MB)"] = round(size / 2**20, 1)
+    return results
+
+
+def run_index_benchmarks(database_url: str, visits: int, runs: int, append_batches: int,
+                         layouts: list[str], seed: int = 42) -> dict[str, dict[str, float]]:
+    """Seed ``visits`` once, then measure each index layout in turn. The target's tables are recreated."""
+    ensure_database(database_url)
+    engine = create_db_engine(database_url)
+    try:
+        reset_schema(engine)
+        seed_visits(engine, visits, URL_COUNT, seed=seed)
+        results = {}
+        for layout in layouts:
+            apply_layout(engine, layout)
+            results[layout] = layout_benchmarks(engine, runs, append_batches)
+        # Leave the schema as the models define it
+        apply_layout(engine, "covering")
+        return results
+    finally:
+        engine.dispose()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.indexes",
+        description=(
+            "Compare read latency and insert throughput of the legacy visits indexes with "
+            "the covering idx_url_id_datetime. WARNING: the target's tables are dropped and recreated."
+        ),
+    )
+    parser.add_argument("--database-url", required=True, help="Scratch database")
+    parser.add_argument("--visits", type=int, default=1_000_000, help="Visits seeded before measuring")
+    parser.add_argument("--runs", type=int, default=200, help="Timed calls per read benchmark")
+    parser.add_argument("--append-batches", type=int, default=20,
+                        help=f"Batches of {APPEND_BATCH_SIZE} visits appended to measure insert throughput")
+    parser.add_argument("--layout", action="append", choices=sorted(LAYOUTS), dest="layouts",
+                        help="Index layouts to measure (repeatable, default: legacy and covering)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    layouts = args.layouts or ["legacy", "covering"]
+    results = run_index_benchmarks(args.database_url, args.visits, args.runs, args.append_batches, layouts)
+    print(f"{backend_name(args.database_url)}, {args.visits:,} visits")
+    print(f"{'benchmark':<24}" + "".join(f"{layout:>12}" for layout in layouts))
+    for name in results[layouts[0]]:
+        print(f"{name:<24}" + "".join(f"{results[layout][name]:>12}" for layout in layouts))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
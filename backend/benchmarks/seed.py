@@ -0,0 +1,210 @@
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Iterator
+
+import numpy as np
+from decouple import config as env_config
+from sqlalchemy import create_engine, select
+from sqlalchemy.engine import Engine
+
+from db.bulk_load import copy_text, deferred_indexes, format_copy_value, format_timestamps, load_rows
+from models.visit import Base, Url
+
+CHUNK_SIZE = 100_000
+URL_CHUNK_SIZE = 50_000
+VISIT_COLUMNS = ("url_id", "title", "description", "datetime_visited", "link_count", "word_count", "image_count")
+
+SECTIONS = ("news", "blog", "docs", "products", "wiki", "forum", "videos", "search")
+# Relative browsing activity per hour of day (UTC), peaking in the evening
+HOURLY_ACTIVITY = np.array([
+    2, 1, 1, 1, 1, 2, 3, 5, 7, 8, 8, 8, 9, 8, 8, 8, 8, 9, 10, 11, 11, 10, 7, 4
+], dtype=float)
+CORPUS = (
+    "history visit page browser article guide tutorial review release notes update product "
+    "documentation reference example search result weather sport market report analysis "
+    "recipe travel video music stream forum thread question answer community project "
+) * 40
+
+
+def url_for(index: int) -> str:
+    """Deterministic URL for popularity rank ``index`` (0 is the most visited)."""
+    return f"https://www.site{index % 997}.example/{SECTIONS[index % len(SECTIONS)]}/{index}"
+
+
+def zipf_cdf(url_count: int, skew: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, url_count + 1, dtype=float) ** skew
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+
+def _texts(rng: np.random.Generator, count: int, median: float, sigma: float, max_length: int) -> np.ndarray:
+    lengths = np.clip(rng.lognormal(np.log(median), sigma, count), 1, max_length).astype(np.int64)
+    offsets = rng.integers(0, len(CORPUS) - max_length, count)
+    return np.array(
+        [CORPUS[start:start + length].strip() or "page" for start, length in zip(offsets.tolist(), lengths.tolist())],
+        dtype=object,
+    )
+
+
+def generate_url_profiles(rng: np.random.Generator, url_count: int) -> dict[str, np.ndarray]:
+    """Per-URL page content; individual visits jitter around these values."""
+    descriptions = _texts(rng, url_count, median=140, sigma=0.6, max_length=2000)
+    descriptions[rng.random(url_count) < 0.25] = None
+    word_counts = np.clip(rng.lognormal(np.log(800), 1.0, url_count), 0, 10_000_000).astype(np.int64)
+    return {
+        "title": _texts(rng, url_count, median=45, sigma=0.5, max_length=500),
+        "description": descriptions,
+        "word_count": word_counts,
+        "link_count": np.clip(word_counts // 20 + rng.integers(0, 30, url_count), 0, 100_000),
+        "image_count": np.clip(rng.poisson(8, url_count), 0, 100_000),
+    }
+
+
+def generate_visit_chunk(rng: np.random.Generator, cdf: np.ndarray, profiles: dict[str, np.ndarray],
+                         size: int, window_start: float, window_end: float) -> dict[str, np.ndarray]:
+    """Generate ``size`` visits with epoch timestamps sorted within ``[window_start, window_end)``."""
+    url_index = np.searchsorted(cdf, rng.random(size), side="right")
+
+    # Uniform day within the window, then warp the time of day onto the diurnal activity curve
+    raw = np.sort(rng.uniform(window_start, window_end, size))
+    days = np.floor(raw / 86400) * 86400
+    hour_cdf = np.concatenate(([0.0], np.cumsum(HOURLY_ACTIVITY) / HOURLY_ACTIVITY.sum()))
+    seconds_of_day = np.interp(rng.random(size), hour_cdf, np.arange(25) * 3600.0)
+    warped = days + seconds_of_day
+    in_window = (warped >= window_start) & (warped < window_end)
+    timestamps = np.sort(np.where(in_window, warped, raw))
+
+    jitter = rng.integers(-2, 3, size)
+    return {
+        "url_index": url_index,
+        "timestamp": timestamps,
+        "title": profiles["title"][url_index],
+        "description": profiles["description"][url_index],
+        "link_count": np.clip(profiles["link_count"][url_index] + jitter, 0, None),
+        "word_count": np.clip(profiles["word_count"][url_index] + jitter * 5, 0, None),
+        "image_count": profiles["image_count"][url_index],
+    }
+
+
+def _insert_urls(engine: Engine, url_count: int) -> list[int]:
+    urls = [url_for(index) for index in range(url_count)]
+    with engine.begin() as conn:
+        existing = set(conn.execute(select(Url.url)).scalars())
+        missing = [(url,) for url in urls if url not in existing]
+        for start in range(0, len(missing), URL_CHUNK_SIZE):
+            load_rows(conn, Url.__tablename__, ("url",), missing[start:start + URL_CHUNK_SIZE])
+        ids_by_url = dict(conn.execute(select(Url.url, Url.id)).all())
+    return [ids_by_url[url] for url in urls]
+
+
+def _chunks(dialect: str, url_ids: list[int], total: int, skew: float, seed: int, days: int,
+            chunk_size: int, end: datetime | None) -> Iterator:
+    """Yield load-ready chunks: COPY text for PostgreSQL, row tuples otherwise."""
+    url_count = len(url_ids)
+    rng = np.random.default_rng(seed)
+    cdf = zipf_cdf(url_count, skew)
+    profiles = generate_url_profiles(rng, url_count)
+    url_ids = np.array(url_ids, dtype=np.int64)
+    use_copy = dialect == "postgresql"
+    if use_copy:
+        # Escape per-URL values once instead of once per visit
+        url_ids = np.array([str(url_id) for url_id in url_ids.tolist()], dtype=object)
+        for field in ("title", "description"):
+            profiles[field] = np.array([format_copy_value(v) for v in profiles[field].tolist()], dtype=object)
+
+    end_epoch = (end or datetime.now(timezone.utc)).timestamp()
+    start_epoch = end_epoch - days * 86400
+    span = end_epoch - start_epoch
+
+    for offset in range(0, total, chunk_size):
+        size = min(chunk_size, total - offset)
+        chunk = generate_visit_chunk(
+            rng, cdf, profiles, size,
+            start_epoch + span * offset / total,
+            start_epoch + span * (offset + size) / total,
+        )
+        columns = [
+            url_ids[chunk["url_index"]].tolist(),
+            chunk["title"].tolist(),
+            chunk["description"].tolist(),
+            format_timestamps((chunk["timestamp"] * 1e6).astype(np.int64), dialect),
+            chunk["link_count"].tolist(),
+            chunk["word_count"].tolist(),
+            chunk["image_count"].tolist(),
+        ]
+        if use_copy:
+            for index in (4, 5, 6):
+                columns[index] = list(map(str, columns[index]))
+            yield "\n".join(map("\t".join, zip(*columns))) + "\n"
+        else:
+            yield list(zip(*columns))
+
+
+def seed_visits(engine: Engine, total: int, url_count: int, skew: float = 1.1, seed: int = 42,
+                days: int = 365, chunk_size: int = CHUNK_SIZE, end: datetime | None = None) -> int:
+    """Insert ``total`` visits over ``url_count`` URLs with Zipfian popularity.
+
+    Output is fully determined by the arguments (pass ``end`` to pin the time
+    window too). Visit ids increase with ``datetime_visited``, as they would
+    for organically recorded history. The next chunk is generated on a
+    worker thread while the current one is being loaded.
+    """
+    url_ids = _insert_urls(engine, url_count)
+    chunks = _chunks(engine.dialect.name, url_ids, total, skew, seed, days, chunk_size, end)
+    with deferred_indexes(engine, "visits"), ThreadPoolExecutor(max_workers=1) as executor:
+        pending = executor.submit(next, chunks, None)
+        while (chunk := pending.result()) is not None:
+            pending = executor.submit(next, chunks, None)
+            with engine.begin() as conn:
+                if isinstance(chunk, str):
+                    copy_text(conn, "visits", VISIT_COLUMNS, chunk)
+                else:
+                    load_rows(conn, "visits", VISIT_COLUMNS, chunk)
+
+    return total
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.seed",
+        description="Fill a database with synthetic, reproducible visit history.",
+    )
+    parser.add_argument("--database-url", default=env_config("DATABASE_URL", default=None),
+                        help="Target database (default: $DATABASE_URL)")
+    parser.add_argument("--visits", type=int, default=1_000_000, help="Number of visits to generate")
+    parser.add_argument("--urls", type=int, default=10_000, help="Number of distinct URLs")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for URL popularity")
+    parser.add_argument("--days", type=int, default=365, help="Spread visits over this many days")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows per transaction")
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate the urls/visits tables first")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if not args.database_url:
+        print("No database URL given (use --database-url or set DATABASE_URL)", file=sys.stderr)
+        return 2
+
+    engine = create_engine(args.database_url)
+    try:
+        if args.reset:
+            Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+        start = time.perf_counter()
+        count = seed_visits(engine, args.visits, args.urls, args.skew, args.seed, args.days, args.chunk_size)
+        elapsed = time.perf_counter() - start
+    finally:
+        engine.dispose()
+
+    print(f"Inserted {count} visits over {args.urls} URLs in {elapsed:.2f}s ({count / elapsed:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import argparse
+import sys
+
+from sqlalchemy import create_engine, desc, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from benchmarks.seed import seed_visits, url_for
+from benchmarks.suite import PAGE_SIZE, time_call
+from models.visit import Base, Url, Visit
+from repositories.visit_repository import VisitRepository
+
+
+class LegacyQueryRepository:
+    """The read paths as they were written with the legacy ``Query`` API.
+
+    Each call builds new ``Query`` objects (plus a separate URL lookup), which
+    SQLAlchemy has to re-walk to find them in the compiled cache.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_visits_by_url(self, url: str, page: int = 1, page_size: int = 10):
+        url_obj = self.db.query(Url).filter(Url.url == url).first()
+        if not url_obj:
+            return [], 0
+        query = self.db.query(Visit).filter(Visit.url_id == url_obj.id)
+        total = query.count()
+        offset = (page - 1) * page_size
+        return query.order_by(desc(Visit.datetime_visited)).offset(offset).limit(page_size).all(), total
+
+    def get_latest_visit_by_url(self, url: str):
+        url_obj = self.db.query(Url).filter(Url.url == url).first()
+        if not url_obj:
+            return None
+        return self.db.query(Visit).filter(Visit.url_id == url_obj.id).order_by(desc(Visit.datetime_visited)).first()
+
+    def get_metrics_by_url(self, url: str) -> dict:
+        url_obj = self.db.query(Url).filter(Url.url == url).first()
+        if not url_obj:
+            return {"total_visits": 0}
+        stats = self.db.query(func.count(Visit.id).label("total_visits")).filter(Visit.url_id == url_obj.id).first()
+        return {"total_visits": stats.total_visits or 0}
+
+
+def statement_benchmarks(engine: Engine, runs: int) -> list[dict]:
+    """Time each read path on the legacy Query API and on the cached statements."""
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    url = url_for(0)
+    calls = {
+        "get_visits_by_url": lambda repo: repo.get_visits_by_url(url, page=1, page_size=PAGE_SIZE),
+        "get_latest_visit_by_url": lambda repo: repo.get_latest_visit_by_url(url),
+        "get_metrics_by_url": lambda repo: repo.get_metrics_by_url(url),
+    }
+    rows = []
+    with session_factory() as session:
+        legacy, cached = LegacyQueryRepository(session), VisitRepository(session)
+        for name, call in calls.items():
+            before = time_call(lambda: call(legacy), runs, warmup=10)
+            after = time_call(lambda: call(cached), runs, warmup=10)
+            session.expunge_all()
+            rows.append({
+                "benchmark": name,
+                "legacy_us": round(before["median_ms"] * 1000, 1),
+                "cached_us": round(after["median_ms"] * 1000, 1),
+                "saved_us": round((before["median_ms"] - after["median_ms"]) * 1000, 1),
+            })
+    return rows
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.statements",
+        description=(
+            "Compare per-call overhead of the legacy Query read paths with the cached "
+            "statements in VisitRepository. Uses a tiny in-memory SQLite database by "
+            "default so that Python-side statement handling dominates the timings."
+        ),
+    )
+    parser.add_argument("--database-url", default="sqlite://",
+                        help="Database to seed and query (its urls/visits tables are recreated)")
+    parser.add_argument("--visits", type=int, default=200, help="Number of visits to seed")
+    parser.add_argument("--runs", type=int, default=2000, help="Timed calls per benchmark")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.database_url == "sqlite://":
+        engine = create_engine(args.database_url, poolclass=StaticPool)
+    else:
+        engine = create_engine(args.database_url)
+    try:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        seed_visits(engine, args.visits, url_count=10)
+        rows = statement_benchmarks(engine, args.runs)
+    finally:
+        engine.dispose()
+
+    print(f"{'benchmark':<26} {'legacy µs':>10} {'cached µs':>10} {'saved µs':>10}")
+    for row in rows:
+        print(f"{row['benchmark']:<26} {row['legacy_us']:>10} {row['cached_us']:>10} {row['saved_us']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+import statistics
+import time
+from typing import Callable
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.seed import seed_visits, url_for
+from models.visit import Base
+from repositories.visit_repository import VisitRepository
+
+PAGE_SIZE = 10
+BATCH_SIZES = (10, 100, 1000)
+
+
+def backend_name(database_url: str) -> str:
+    return make_url(database_url).get_backend_name()
+
+
+def ensure_database(database_url: str) -> None:
+    """Create the target PostgreSQL database if it does not exist yet."""
+    url = make_url(database_url)
+    if url.get_backend_name() != "postgresql":
+        return
+    admin = create_engine(url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    try:
+        with admin.connect() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": url.database}
+            ).scalar()
+            if not exists:
+                conn.execute(text(f'CREATE DATABASE "{url.database}"'))
+    finally:
+        admin.dispose()
+
+
+def reset_schema(engine: Engine) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def time_call(fn: Callable[[], object], runs: int, warmup: int = 1) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "runs": runs,
+        "min_ms": round(samples[0], 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+    }
+
+
+def visit_payload(url: str) -> dict:
+    return {
+        "url": url,
+        "title": "Benchmark visit",
+        "description": "Synthetic visit recorded by the benchmark suite",
+        "link_count": 42,
+        "word_count": 1200,
+        "image_count": 7,
+    }
+
+
+def repository_benchmarks(session_factory: sessionmaker, runs: int) -> dict[str, dict]:
+    hot_url = url_for(0)
+    results = {}
+
+    with session_factory() as session:
+        repo = VisitRepository(session)
+        _, hot_total = repo.get_visits_by_url(hot_url, page=1, page_size=PAGE_SIZE)
+        deep_page = max(1, -(-hot_total // PAGE_SIZE))
+
+        results["get_visits_by_url[page=1]"] = time_call(
+            lambda: repo.get_visits_by_url(hot_url, page=1, page_size=PAGE_SIZE), runs
+        )
+        results["get_visits_by_url[page=last]"] = time_call(
+            lambda: repo.get_visits_by_url(hot_url, page=deep_page, page_size=PAGE_SIZE), runs
+        )
+        results["get_latest_visit_by_url"] = time_call(lambda: repo.get_latest_visit_by_url(hot_url), runs)
+        results["get_metrics_by_url"] = time_call(lambda: repo.get_metrics_by_url(hot_url), runs)
+
+        payload = visit_payload(hot_url)
+        results["create_visit"] = time_call(
+            lambda: repo.create_visit(
+                payload["url"], payload["title"], payload["description"],
+                payload["link_count"], payload["word_count"], payload["image_count"]
+            ),
+            runs
+        )
+
+        for batch_size in BATCH_SIZES:
+            batch = [visit_payload(url_for(i % 50)) for i in range(batch_size)]
+            results[f"bulk_create_visits[n={batch_size}]"] = time_call(
+                lambda: repo.bulk_create_visits(batch), max(3, runs // 10)
+            )
+
+    return results
+
+
+def endpoint_benchmarks(engine: Engine, session_factory: sessionmaker, runs: int) -> dict[str, dict]:
+    from fastapi.testclient import TestClient
+
+    from api.routes.visits import limiter
+    from core.app import create_app
+    from db.session import configure_engine, get_db, get_read_db
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    configure_engine(engine)
+    app = create_app()
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    hot_url = url_for(0)
+    batch = [visit_payload(url_for(i % 50)) for i in range(100)]
+    results = {}
+
+    limiter.enabled = False
+    try:
+        with TestClient(app) as client:
+            results["GET /history"] = time_call(
+                lambda: client.get("/api/v1/visits/history", params={"url": hot_url}), runs
+            )
+            for history_format in ("items", "columnar"):
+                results[f"GET /history[page_size=100,format={history_format}]"] = time_call(
+                    lambda: client.get("/api/v1/visits/history", params={
+                        "url": hot_url, "page_size": 100, "format": history_format
+                    }),
+                    runs
+                )
+            results["GET /metrics"] = time_call(
+                lambda: client.get("/api/v1/visits/metrics", params={"url": hot_url}), runs
+            )
+            results["POST /visits"] = time_call(
+                lambda: client.post("/api/v1/visits", json=visit_payload(hot_url)), runs
+            )
+            results["POST /visits/batch[n=100]"] = time_call(
+                lambda: client.post("/api/v1/visits/batch", json=batch), max(3, runs // 10)
+            )
+    finally:
+        limiter.enabled = True
+        app.dependency_overrides.clear()
+
+    return results
+
+
+def run_suite(database_url: str, scales: list[int], runs: int, skew: float, seed: int,
+              endpoints: bool = False, log: Callable[[str], None] = print) -> list[dict]:
+    """Seed each scale into a fresh schema and time every benchmark against it.
+
+    The target database's ``urls`` and ``visits`` tables are dropped and recreated.
+    """
+    ensure_database(database_url)
+    engine = create_engine(database_url)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    backend = backend_name(database_url)
+    results = []
+
+    try:
+        for scale in scales:
+            url_count = max(10, scale // 100)
+            log(f"[{backend}] seeding {scale} visits over {url_count} URLs")
+            reset_schema(engine)
+            start = time.perf_counter()
+            seed_visits(engine, scale, url_count, skew=skew, seed=seed)
+            seed_seconds = time.perf_counter() - start
+
+            timings = repository_benchmarks(session_factory, runs)
+            if endpoints:
+                timings.update(endpoint_benchmarks(engine, session_factory, runs))
+
+            for name, timing in timings.items():
+                log(f"[{backend}] scale={scale} {name}: median {timing['median_ms']} ms")
+                results.append({"backend": backend, "scale": scale, "benchmark": name, **timing})
+            results.append({
+                "backend": backend, "scale": scale, "benchmark": "seed",
+                "runs": 1, "rows_per_second": round(scale / seed_seconds, 1),
+            })
+    finally:
+        engine.dispose()
+
+    return results
+
+
+def compare_results(current: list[dict], baseline: list[dict], max_regression: float) -> list[dict]:
+    """Return one row per benchmark present in both runs, flagging slowdowns."""
+    baseline_by_key = {
+        (row["backend"], row["scale"], row["benchmark"]): row
+        for row in baseline
+        if "median_ms" in row
+    }
+    rows = []
+    for row in current:
+        previous = baseline_by_key.get((row["backend"], row["scale"], row["benchmark"]))
+        if previous is None or "median_ms" not in row or not previous["median_ms"]:
+            continue
+        change = (row["median_ms"] - previous["median_ms"]) / previous["median_ms"]
+        rows.append({
+            "backend": row["backend"],
+            "scale": row["scale"],
+            "benchmark": row["benchmark"],
+            "baseline_ms": previous["median_ms"],
+            "current_ms": row["median_ms"],
+            "change": round(change, 4),
+            "regression": change > max_regression,
+        })
+    return rows
@@ -0,0 +1,131 @@
+import argparse
+import random
+import statistics
+import sys
+import threading
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.seed import seed_visits, url_for
+from benchmarks.suite import backend_name, ensure_database, reset_schema, visit_payload
+from db.session import create_db_engine
+from repositories.visit_repository import VisitRepository
+
+URL_COUNT = 100
+
+
+def _percentile(samples: list[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * fraction))], 3)
+
+
+def run_throughput(database_url: str, threads: int, seconds: float, write_ratio: float,
+                   visits: int, seed: int = 42) -> dict:
+    """Run a mixed page-load/visit-recording workload from ``threads`` threads.
+
+    Engines come from ``create_db_engine``, so they use the same pools (and,
+    for SQLite, the same single-writer and read-only engines) as the app.
+    Reads are ``get_summary_by_url``, the side panel's page load; writes are
+    ``create_visit``. The target's urls/visits tables are recreated.
+    """
+    ensure_database(database_url)
+    writer = create_db_engine(database_url)
+    reader = create_db_engine(database_url, readonly=True) if backend_name(database_url) == "sqlite" else writer
+    reset_schema(writer)
+    seed_visits(writer, visits, URL_COUNT, seed=seed)
+    write_sessions = sessionmaker(bind=writer, autoflush=False)
+    read_sessions = sessionmaker(bind=reader, autoflush=False)
+
+    latencies: dict[str, list[float]] = {"read": [], "write": []}
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(index: int) -> None:
+        rng = random.Random(seed + index)
+        local: dict[str, list[float]] = {"read": [], "write": []}
+        while time.perf_counter() < deadline:
+            url = url_for(min(int(rng.paretovariate(1.2)) - 1, URL_COUNT - 1))
+            kind = "write" if rng.random() < write_ratio else "read"
+            start = time.perf_counter()
+            try:
+                if kind == "write":
+                    payload = visit_payload(url)
+                    with write_sessions() as session:
+                        VisitRepository(session).create_visit(
+                            url, payload["title"], payload["description"],
+                            payload["link_count"], payload["word_count"], payload["image_count"]
+                        )
+                else:
+                    with read_sessions() as session:
+                        VisitRepository(session).get_summary_by_url(url)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            local[kind].append((time.perf_counter() - start) * 1000)
+        with lock:
+            for key, samples in local.items():
+                latencies[key].extend(samples)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    try:
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+    finally:
+        if reader is not writer:
+            reader.dispose()
+        writer.dispose()
+
+    return {
+        "backend": backend_name(database_url),
+        "threads": threads,
+        "write_ratio": write_ratio,
+        "reads_per_second": round(len(latencies["read"]) / seconds, 1),
+        "writes_per_second": round(len(latencies["write"]) / seconds, 1),
+        "read_p50_ms": round(statistics.median(latencies["read"]), 3) if latencies["read"] else 0.0,
+        "read_p99_ms": _percentile(latencies["read"], 0.99),
+        "write_p50_ms": round(statistics.median(latencies["write"]), 3) if latencies["write"] else 0.0,
+        "write_p99_ms": _percentile(latencies["write"], 0.99),
+        "errors": len(errors),
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.throughput",
+        description=(
+            "Concurrent read/write throughput of the app's database engines. "
+            "WARNING: the urls/visits tables of every target database are dropped and recreated."
+        ),
+    )
+    parser.add_argument("--database-url", action="append", required=True, dest="database_urls",
+                        help="Scratch database (repeat to compare SQLite and PostgreSQL)")
+    parser.add_argument("--threads", type=int, action="append", dest="thread_counts",
+                        help="Concurrent clients (repeatable, default: 1, 8, 32)")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration of each run")
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="Share of operations that record a visit")
+    parser.add_argument("--visits", type=int, default=100_000, help="Visits seeded before each run")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    print(f"{'backend':<10} {'threads':>7} {'reads/s':>9} {'writes/s':>9} "
+          f"{'read p50':>9} {'read p99':>9} {'write p50':>10} {'write p99':>10} {'errors':>6}")
+    for database_url in args.database_urls:
+        for threads in args.thread_counts or [1, 8, 32]:
+            row = run_throughput(database_url, threads, args.seconds, args.write_ratio, args.visits)
+            print(f"{row['backend']:<10} {row['threads']:>7} {row['reads_per_second']:>9} "
+                  f"{row['writes_per_second']:>9} {row['read_p50_ms']:>9} {row['read_p99_ms']:>9} "
+                  f"{row['write_p50_ms']:>10} {row['write_p99_ms']:>10} {row['errors']:>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
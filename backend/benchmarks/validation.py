@@ -0,0 +1,89 @@
+import argparse
+import json
+import sys
+import uuid
+
+import numpy as np
+from pydantic import TypeAdapter
+
+from api.schemas import VisitCreate, validate_visit_batch
+from benchmarks.seed import url_for, zipf_cdf
+from benchmarks.suite import time_call
+
+MODEL_LIST_ADAPTER = TypeAdapter(list[VisitCreate])
+
+
+def model_path(body: bytes) -> list[dict]:
+    """What the batch route did before: FastAPI's json.loads plus list[VisitCreate]
+    validation, then a copy of each model into a dict."""
+    return [
+        {
+            'url': str(visit.url),
+            'client_visit_id': str(visit.client_visit_id) if visit.client_visit_id else None,
+            'datetime_visited': visit.datetime_visited,
+            'title': visit.title,
+            'description': visit.description,
+            'link_count': visit.link_count,
+            'word_count': visit.word_count,
+            'image_count': visit.image_count
+        }
+        for visit in MODEL_LIST_ADAPTER.validate_python(json.loads(body))
+    ]
+
+
+def sync_payload(size: int, url_count: int = 500, seed: int = 42) -> bytes:
+    """A sync batch shaped like the extension's queue: popular pages recur with the same title and description."""
+    rng = np.random.default_rng(seed)
+    ranks = np.searchsorted(zipf_cdf(url_count, 1.1), rng.random(size), side="right")
+    return json.dumps([
+        {
+            "url": url_for(rank) + "/",
+            "client_visit_id": str(uuid.UUID(int=int(rng.integers(0, 2**63)) << 64 | i)),
+            "datetime_visited": "2025-06-01T12:00:00Z",
+            "title": f"Page {rank} - Example   site",
+            "description": f"Description of page {rank}, long enough to look like a real meta tag. " * 2,
+            "link_count": 120,
+            "word_count": 1500,
+            "image_count": 12,
+        }
+        for i, rank in enumerate(ranks.tolist())
+    ]).encode()
+
+
+def validation_benchmarks(sizes: list[int], runs: int) -> list[dict]:
+    rows = []
+    for size in sizes:
+        body = sync_payload(size)
+        before = time_call(lambda: model_path(body), runs)
+        after = time_call(lambda: validate_visit_batch(body), runs)
+        rows.append({
+            "batch_size": size,
+            "model_ms": before["median_ms"],
+            "fast_path_ms": after["median_ms"],
+            "speedup": round(before["median_ms"] / after["median_ms"], 2),
+        })
+    return rows
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.validation",
+        description="Compare list[VisitCreate] validation with the batch fast path.",
+    )
+    parser.add_argument("--size", action="append", type=int, dest="sizes",
+                        help="Batch size (repeatable, default: 100, 1000, 5000)")
+    parser.add_argument("--runs", type=int, default=20, help="Timed runs per size")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    rows = validation_benchmarks(args.sizes or [100, 1000, 5000], args.runs)
+    print(f"{'batch':>6} {'VisitCreate ms':>15} {'fast path ms':>13} {'speedup':>8}")
+    for row in rows:
+        print(f"{row['batch_size']:>6} {row['model_ms']:>15} {row['fast_path_ms']:>13} {row['speedup']:>7}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,16 +5,23 @@ from slowapi import Limiter
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 
-from api.routes import health, visits
+from api.routes import health, internal, visits
+from api.schemas import BatchTooLargeError
 from core.config import APP_TITLE, APP_VERSION
 from core.exceptions import (
+    batch_too_large_handler,
     general_exception_handler,
+    partial_batch_handler,
     rate_limit_handler,
     validation_exception_handler,
 )
 from core.lifespan import lifespan
+from middleware.admission import AdmissionControlMiddleware
+from middleware.compression import CompressionMiddleware, RequestDecompressionMiddleware
 from middleware.logging import LoggingMiddleware
+from middleware.metrics import MetricsMiddleware
 from middleware.security import SecurityHeadersMiddleware
+from repositories.visit_repository import PartialBatchError
 
 
 def create_app() -> FastAPI:
@@ -46,19 +53,27 @@ def setup_middleware(app: FastAPI):
         ],
         allow_credentials=False,  # Not needed for chrome extensions
         allow_methods=["GET", "POST", "PUT", "DELETE"],
-        allow_headers=["Content-Type", "Authorization"],
+        allow_headers=["Content-Type", "Content-Encoding", "Authorization"],
     )
+    app.add_middleware(CompressionMiddleware)
+    app.add_middleware(RequestDecompressionMiddleware, paths=["/api/v1/visits/batch"])
+    # Streams only touch the database briefly per update, so they are not admitted
+    app.add_middleware(AdmissionControlMiddleware, paths=["/api/v1/visits"], exclude=["/api/v1/visits/stream"])
     app.add_middleware(LoggingMiddleware)
+    app.add_middleware(MetricsMiddleware)
     app.add_middleware(SecurityHeadersMiddleware)
 
 
 def setup_exception_handlers(app: FastAPI):
     app.add_exception_handler(RateLimitExceeded, rate_limit_handler)
     app.add_exception_handler(RequestValidationError, validation_exception_handler)
+    app.add_exception_handler(BatchTooLargeError, batch_too_large_handler)
+    app.add_exception_handler(PartialBatchError, partial_batch_handler)
     app.add_exception_handler(Exception, general_exception_handler)
 
 
 def setup_routes(app: FastAPI):
     app.include_router(health.router, tags=["health"])
+    app.include_router(internal.router, tags=["internal"])
     app.include_router(visits.router, prefix="/api/v1/visits", tags=["visits"])
 
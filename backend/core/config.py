@@ -1,4 +1,6 @@
 from datetime import datetime
+from functools import lru_cache
+from typing import Optional
 from decouple import config as env_config
 from pydantic import BaseModel, Field, field_validator, ValidationError
 import sys
@@ -6,6 +8,8 @@ import sys
 APP_VERSION = "1.0.0"
 APP_TITLE = "History Sidepanel API"
 start_time = datetime.now()
+POSTGRES_URL_PREFIXES = ("postgresql://", "postgresql+psycopg2://", "postgresql+psycopg://")
+SQLITE_URL_PREFIXES = ("sqlite:///", "sqlite+pysqlite:///")
 
 
 class Settings(BaseModel):
@@ -15,14 +19,204 @@ class Settings(BaseModel):
             default="postgresql://postgres:postgres@db:5432/history_db"
         )
     )
+    query_profiling: bool = Field(
+        default_factory=lambda: env_config("QUERY_PROFILING", default=False, cast=bool)
+    )
+    slow_query_ms: float = Field(
+        default_factory=lambda: env_config("SLOW_QUERY_MS", default=200.0, cast=float),
+        ge=0
+    )
+    repeated_query_threshold: int = Field(
+        default_factory=lambda: env_config("REPEATED_QUERY_THRESHOLD", default=10, cast=int),
+        ge=1
+    )
+    log_queue_size: int = Field(
+        default_factory=lambda: env_config("LOG_QUEUE_SIZE", default=10000, cast=int),
+        ge=1
+    )
+    log_success_sample_rate: float = Field(
+        default_factory=lambda: env_config("LOG_SUCCESS_SAMPLE_RATE", default=1.0, cast=float),
+        ge=0,
+        le=1
+    )
+    log_caller_info: bool = Field(
+        default_factory=lambda: env_config("LOG_CALLER_INFO", default=False, cast=bool)
+    )
+    db_pool_size: int = Field(
+        default_factory=lambda: env_config("DB_POOL_SIZE", default=5, cast=int),
+        ge=1
+    )
+    db_max_overflow: int = Field(
+        default_factory=lambda: env_config("DB_MAX_OVERFLOW", default=10, cast=int),
+        ge=0
+    )
+    sqlite_busy_timeout_ms: int = Field(
+        default_factory=lambda: env_config("SQLITE_BUSY_TIMEOUT_MS", default=5000, cast=int),
+        ge=0
+    )
+    sqlite_mmap_size_mb: int = Field(
+        default_factory=lambda: env_config("SQLITE_MMAP_SIZE_MB", default=256, cast=int),
+        ge=0
+    )
+    sqlite_cache_size_mb: int = Field(
+        default_factory=lambda: env_config("SQLITE_CACHE_SIZE_MB", default=64, cast=int),
+        ge=1
+    )
+    admission_concurrency: int = Field(
+        default_factory=lambda: env_config("ADMISSION_CONCURRENCY", default=0, cast=int),
+        ge=0
+    )
+    admission_queue_size: int = Field(
+        default_factory=lambda: env_config("ADMISSION_QUEUE_SIZE", default=50, cast=int),
+        ge=0
+    )
+    admission_queue_timeout_seconds: float = Field(
+        default_factory=lambda: env_config("ADMISSION_QUEUE_TIMEOUT_SECONDS", default=5.0, cast=float),
+        gt=0
+    )
+    thread_pool_size: int = Field(
+        default_factory=lambda: env_config("THREAD_POOL_SIZE", default=40, cast=int),
+        ge=1
+    )
+    db_pool_warmup: int = Field(
+        default_factory=lambda: env_config("DB_POOL_WARMUP", default=5, cast=int),
+        ge=0
+    )
+    max_decompressed_body_bytes: int = Field(
+        default_factory=lambda: env_config("MAX_DECOMPRESSED_BODY_BYTES", default=10 * 1024 * 1024, cast=int),
+        ge=1
+    )
+    compression_min_size: int = Field(
+        default_factory=lambda: env_config("COMPRESSION_MIN_SIZE", default=1000, cast=int),
+        ge=0
+    )
+    batch_max_items: int = Field(
+        default_factory=lambda: env_config("BATCH_MAX_ITEMS", default=5000, cast=int),
+        ge=1
+    )
+    batch_chunk_size: int = Field(
+        default_factory=lambda: env_config("BATCH_CHUNK_SIZE", default=500, cast=int),
+        ge=1
+    )
+    health_probe_interval_seconds: float = Field(
+        default_factory=lambda: env_config("HEALTH_PROBE_INTERVAL_SECONDS", default=5.0, cast=float),
+        gt=0
+    )
+    health_probe_timeout_seconds: float = Field(
+        default_factory=lambda: env_config("HEALTH_PROBE_TIMEOUT_SECONDS", default=2.0, cast=float),
+        gt=0
+    )
+    health_max_staleness_seconds: float = Field(
+        default_factory=lambda: env_config("HEALTH_MAX_STALENESS_SECONDS", default=30.0, cast=float),
+        gt=0
+    )
+    maintenance_enabled: bool = Field(
+        default_factory=lambda: env_config("MAINTENANCE_ENABLED", default=True, cast=bool)
+    )
+    maintenance_jitter: float = Field(
+        default_factory=lambda: env_config("MAINTENANCE_JITTER", default=0.1, cast=float),
+        ge=0,
+        le=1
+    )
+    maintenance_timeout_seconds: float = Field(
+        default_factory=lambda: env_config("MAINTENANCE_TIMEOUT_SECONDS", default=300.0, cast=float),
+        gt=0
+    )
+    analyze_interval_seconds: float = Field(
+        default_factory=lambda: env_config("ANALYZE_INTERVAL_SECONDS", default=3600.0, cast=float),
+        gt=0
+    )
+    prune_interval_seconds: float = Field(
+        default_factory=lambda: env_config("PRUNE_INTERVAL_SECONDS", default=900.0, cast=float),
+        gt=0
+    )
+    sketch_backfill_interval_seconds: float = Field(
+        default_factory=lambda: env_config("SKETCH_BACKFILL_INTERVAL_SECONDS", default=60.0, cast=float),
+        gt=0
+    )
+    visit_retention_days: int = Field(
+        default_factory=lambda: env_config("VISIT_RETENTION_DAYS", default=0, cast=int),
+        ge=0
+    )
+    prune_batch_size: int = Field(
+        default_factory=lambda: env_config("PRUNE_BATCH_SIZE", default=10000, cast=int),
+        ge=1
+    )
+    sse_heartbeat_seconds: float = Field(
+        default_factory=lambda: env_config("SSE_HEARTBEAT_SECONDS", default=15.0, cast=float),
+        gt=0
+    )
+    sse_max_stream_seconds: float = Field(
+        default_factory=lambda: env_config("SSE_MAX_STREAM_SECONDS", default=300.0, cast=float),
+        gt=0
+    )
+    sse_queue_size: int = Field(
+        default_factory=lambda: env_config("SSE_QUEUE_SIZE", default=100, cast=int),
+        ge=1
+    )
+    sse_max_subscribers: int = Field(
+        default_factory=lambda: env_config("SSE_MAX_SUBSCRIBERS", default=1000, cast=int),
+        ge=1
+    )
+    sse_pg_notify: bool = Field(
+        default_factory=lambda: env_config("SSE_PG_NOTIFY", default=False, cast=bool)
+    )
+    content_metrics_cache_size: int = Field(
+        default_factory=lambda: env_config("CONTENT_METRICS_CACHE_SIZE", default=1024, cast=int),
+        ge=0
+    )
+    database_replica_urls: list[str] = Field(
+        default_factory=lambda: env_config("DATABASE_REPLICA_URLS", default="")
+    )
+    replica_retry_seconds: float = Field(
+        default_factory=lambda: env_config("REPLICA_RETRY_SECONDS", default=30.0, cast=float),
+        ge=0
+    )
+    read_your_writes_seconds: float = Field(
+        default_factory=lambda: env_config("READ_YOUR_WRITES_SECONDS", default=0.0, cast=float),
+        ge=0
+    )
+    db_prepare_threshold: Optional[int] = Field(
+        default_factory=lambda: env_config("DB_PREPARE_THRESHOLD", default="5"),
+        # The environment value is a string; validate it like an explicit one
+        validate_default=True,
+        ge=0
+    )
     
     @field_validator("database_url")
     @classmethod
     def validate_database_url(cls, v: str) -> str:
         if not v or not v.strip():
             raise ValueError("DATABASE_URL cannot be empty")
-        if not v.startswith(("postgresql://", "postgresql+psycopg2://")):
-            raise ValueError("DATABASE_URL must be a valid PostgreSQL connection string")
+        if v.startswith(SQLITE_URL_PREFIXES):
+            # Workers and the read pool open their own connections, so they must share a file
+            if v.split(":///", 1)[1].split("?")[0] in ("", ":memory:"):
+                raise ValueError("DATABASE_URL must name a SQLite database file, not an in-memory database")
+            return v
+        if not v.startswith(POSTGRES_URL_PREFIXES):
+            raise ValueError("DATABASE_URL must be a valid PostgreSQL connection string or a sqlite:/// file path")
+        return v
+    
+    @field_validator("database_replica_urls", mode="before")
+    @classmethod
+    def split_replica_urls(cls, v):
+        if isinstance(v, str):
+            return [url.strip() for url in v.split(",") if url.strip()]
+        return v
+    
+    @field_validator("db_prepare_threshold", mode="before")
+    @classmethod
+    def parse_prepare_threshold(cls, v):
+        if isinstance(v, str) and v.strip().lower() in ("", "none", "off"):
+            return None
+        return v
+    
+    @field_validator("database_replica_urls")
+    @classmethod
+    def validate_replica_urls(cls, v: list[str]) -> list[str]:
+        for url in v:
+            if not url.startswith(POSTGRES_URL_PREFIXES):
+                raise ValueError("DATABASE_REPLICA_URLS must be PostgreSQL connection strings")
         return v
 
 
@@ -36,5 +230,8 @@ def load_settings() -> Settings:
         sys.exit(1)
 
 
-settings = load_settings()
+@lru_cache
+def get_settings() -> Settings:
+    """Load and validate settings on first use rather than at import time."""
+    return load_settings()
 
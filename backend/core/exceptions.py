@@ -3,10 +3,15 @@ from fastapi.exceptions import RequestValidationError
 from slowapi.errors import RateLimitExceeded
 
 from api.response import error_response
+from api.schemas import BatchTooLargeError
+from middleware.metrics import route_label
+from repositories.visit_repository import PartialBatchError
 from utils.logger import logger
+from utils.metrics import rate_limit_rejections_total
 
 
 async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
+    rate_limit_rejections_total.inc(route=route_label(request))
     logger.warning(
         "Rate limit exceeded",
         extra={
@@ -14,11 +19,14 @@ async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
             "client_ip": request.client.host if request.client else None
         }
     )
-    return error_response(
+    response = error_response(
         message="Too many requests. Please try again later.",
         status_code=429,
         error_codes=["rate_limit_exceeded"]
     )
+    # Waiting out the whole window is always enough for a fixed-window limit
+    response.headers["Retry-After"] = str(exc.limit.limit.get_expiry())
+    return response
 
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -47,6 +55,48 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+async def batch_too_large_handler(request: Request, exc: BatchTooLargeError):
+    logger.warning(
+        "Batch too large",
+        extra={
+            "path": request.url.path,
+            "count": exc.count,
+            "max_items": exc.max_items
+        }
+    )
+    return error_response(
+        message=f"Batch exceeds the maximum of {exc.max_items} visits; split it into smaller requests",
+        status_code=413,
+        error_codes=["batch_too_large"],
+        data={"max_items": exc.max_items}
+    )
+
+
+async def partial_batch_handler(request: Request, exc: PartialBatchError):
+    logger.error(
+        "Batch partially committed",
+        extra={
+            "path": request.url.path,
+            "processed": exc.processed,
+            "total": exc.total,
+            "error": str(exc.__cause__)
+        },
+        exc_info=exc.__cause__
+    )
+    # Committed visits carry their client ids, so retrying the whole batch is safe
+    return error_response(
+        message=f"Saved {exc.processed} of {exc.total} visits before an error; retry to save the rest",
+        status_code=500,
+        error_codes=["batch_partially_committed"],
+        data={
+            "created_count": exc.inserted,
+            "duplicate_count": exc.duplicates,
+            "processed_count": exc.processed,
+            "total_count": exc.total
+        }
+    )
+
+
 async def general_exception_handler(request: Request, exc: Exception):
     logger.error(
         "Unhandled exception",
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from db.session import get_read_engine
+from utils.logger import logger
+
+
+class ProbeResult:
+    """Outcome of one database probe and the pool's state at that moment."""
+
+    def __init__(self, connected: bool, latency_ms: float, pool: Optional[dict],
+                 error: Optional[str] = None):
+        self.connected = connected
+        self.latency_ms = latency_ms
+        self.pool = pool
+        self.error = error
+        self.checked_at = time.monotonic()
+
+    def age(self) -> float:
+        return time.monotonic() - self.checked_at
+
+
+def pool_stats(engine: Engine) -> Optional[dict]:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return None
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # Negative while the pool has not opened all of its pool_size connections yet
+        "overflow": max(pool.overflow(), 0),
+    }
+
+
+class HealthProber:
+    """Probes the database every ``interval`` seconds and keeps the latest result.
+
+    Health endpoints read ``latest`` instead of checking out a connection, so
+    however often load balancers poll, each worker costs the pool one
+    ``SELECT 1`` per interval. A probe that takes longer than ``timeout``
+    counts as a failure; its thread cannot be cancelled, so later refreshes
+    wait on it rather than starting another until it returns.
+    """
+
+    def __init__(self, engine_factory: Callable[[], Engine], interval: float = 5.0,
+                 timeout: float = 2.0):
+        self.engine_factory = engine_factory
+        self.interval = interval
+        self.timeout = timeout
+        self.latest: Optional[ProbeResult] = None
+        self._task: Optional[asyncio.Task] = None
+        self._probe: Optional[asyncio.Future] = None
+        self._stopping = False
+
+    def probe(self) -> ProbeResult:
+        engine = self.engine_factory()
+        start = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except Exception as e:
+            return ProbeResult(False, (time.perf_counter() - start) * 1000, pool_stats(engine), str(e))
+        return ProbeResult(True, (time.perf_counter() - start) * 1000, pool_stats(engine))
+
+    async def refresh(self) -> ProbeResult:
+        # While the database is unreachable a probe blocks in connect for up
+        # to pool_timeout; one such thread is enough
+        if self._probe is None or self._probe.done():
+            self._probe = asyncio.ensure_future(asyncio.to_thread(self.probe))
+        try:
+            result = await asyncio.wait_for(asyncio.shield(self._probe), self.timeout)
+        except asyncio.TimeoutError:
+            result = ProbeResult(False, self.timeout * 1000, None, "probe timed out")
+        # Only changes are logged, not every probe
+        if not result.connected and (self.latest is None or self.latest.connected):
+            logger.error("Database health check failed", extra={"error": result.error})
+        elif result.connected and self.latest is not None and not self.latest.connected:
+            logger.info("Database health check recovered", extra={"latency_ms": round(result.latency_ms, 2)})
+        self.latest = result
+        return result
+
+    async def start(self) -> None:
+        # The first result is in place before the app takes traffic
+        self._stopping = False
+        # A probe left over from an earlier event loop can never be awaited here
+        self._probe = None
+        await self.refresh()
+        self._task = asyncio.create_task(self._loop(), name="health-prober")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while not self._stopping:
+            await asyncio.sleep(self.interval)
+            await self.refresh()
+
+
+# The read engine is the primary, except in SQLite mode, where probing the
+# single-connection writer would queue behind writes and take the write lock
+health_prober = HealthProber(get_read_engine)
@@ -1,9 +1,15 @@
+import asyncio
 from contextlib import asynccontextmanager
 
+import anyio.to_thread
 from fastapi import FastAPI
-from sqlalchemy import text
 
-from core.config import APP_VERSION
+from core.config import APP_VERSION, get_settings
+from core.health import health_prober
+from core.scheduler import maintenance_scheduler
+from db.session import dispose_engine, get_engine, get_read_engine, warm_up_pool
+from services.content_metrics import content_metrics_cache
+from services.events import PgNotifyListener, broadcaster, notify_events
 from utils.logger import logger
 
 
@@ -11,18 +17,44 @@ from utils.logger import logger
 async def lifespan(app: FastAPI):
     logger.info("Application starting", extra={"version": APP_VERSION})
     
-    from db.session import engine
+    settings = get_settings()
+    # Sync routes and dependencies run on this pool
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.thread_pool_size
     try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        warm_up_pool(get_engine(), min(settings.db_pool_warmup, settings.db_pool_size))
+        if get_read_engine() is not get_engine():
+            warm_up_pool(get_read_engine(), min(settings.db_pool_warmup, settings.db_pool_size))
         logger.info("Database connection pool established")
     except Exception as e:
         logger.error("Failed to establish database connection pool", extra={"error": str(e)})
         raise
     
+    health_prober.interval = settings.health_probe_interval_seconds
+    health_prober.timeout = settings.health_probe_timeout_seconds
+    await health_prober.start()
+    
+    scheduler = maintenance_scheduler(get_engine, settings)
+    await scheduler.start()
+    
+    content_metrics_cache.maxsize = settings.content_metrics_cache_size
+    broadcaster.bind(asyncio.get_running_loop())
+    broadcaster.queue_size = settings.sse_queue_size
+    broadcaster.max_subscribers = settings.sse_max_subscribers
+    listener = None
+    if settings.sse_pg_notify and get_engine().dialect.name == "postgresql":
+        # Fan visit events out to every worker's streams, not just the one that took the write
+        listener = PgNotifyListener(get_engine(), broadcaster.deliver_threadsafe)
+        listener.start()
+        broadcaster.notifier = lambda events: notify_events(get_engine(), events)
+    
     yield
     
+    broadcaster.close()
+    broadcaster.notifier = None
+    if listener is not None:
+        listener.stop()
+    await scheduler.stop()
+    await health_prober.stop()
     logger.info("Disposing database connection pool")
-    engine.dispose()
+    dispose_engine()
     logger.info("Application shutting down")
-
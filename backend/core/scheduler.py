@@ -0,0 +1,165 @@
+import asyncio
+import random
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+
+from core.config import Settings
+from db.maintenance import analyze_tables, backfill_sketches, prune_visits
+from models.visit import MaintenanceRun
+from utils.logger import logger
+from utils.metrics import maintenance_job_duration_seconds, maintenance_job_runs_total
+
+# URLs whose sketches are rebuilt per backfill run
+SKETCH_BACKFILL_BATCH = 500
+
+LAST_RUN = select(MaintenanceRun.finished_at).where(MaintenanceRun.job == bindparam("job"))
+
+
+class Job:
+    """A periodic maintenance task, run as ``func(conn)`` inside one transaction.
+
+    Runs are spread by ``jitter`` (a fraction of ``interval``) and cut off
+    after ``timeout`` seconds, which on PostgreSQL is also applied as the
+    transaction's statement_timeout so the database stops working too.
+    """
+
+    def __init__(self, name: str, func: Callable[[Connection], object], interval: float,
+                 timeout: float, jitter: float = 0.1):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.timeout = timeout
+        self.jitter = jitter
+        # pg_try_advisory_xact_lock takes a bigint; the job name maps to a stable key
+        self.lock_key = zlib.crc32(f"maintenance:{name}".encode())
+
+
+class Scheduler:
+    """Runs registered jobs on the event loop, each in a worker thread.
+
+    Every worker process runs a scheduler. On PostgreSQL a job takes a
+    transaction-scoped advisory lock and checks ``maintenance_runs``; a job
+    that completed less than half an interval ago is skipped, so roughly one
+    worker runs it per interval.
+    """
+
+    def __init__(self, engine_factory: Callable[[], Engine], rng: Optional[random.Random] = None):
+        self.engine_factory = engine_factory
+        self.jobs: list[Job] = []
+        self._rng = rng or random.Random()
+        self._tasks: list[asyncio.Task] = []
+        self._stopping = False
+
+    def add(self, job: Job) -> Job:
+        self.jobs.append(job)
+        return job
+
+    def next_delay(self, job: Job) -> float:
+        spread = job.interval * job.jitter
+        return max(0.0, job.interval + self._rng.uniform(-spread, spread))
+
+    async def start(self) -> None:
+        self._stopping = False
+        for job in self.jobs:
+            # First runs land anywhere in the jitter window so workers that
+            # started together do not all contend for the same lock
+            first = self._rng.uniform(0, job.interval * job.jitter)
+            self._tasks.append(asyncio.create_task(self._loop(job, first), name=f"maintenance:{job.name}"))
+        if self.jobs:
+            logger.info("Maintenance scheduler started", extra={"jobs": [job.name for job in self.jobs]})
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _loop(self, job: Job, delay: float) -> None:
+        # wait_for can swallow a cancel that races with the job finishing
+        # (Python < 3.12), so the loop also checks the stop flag
+        while not self._stopping:
+            await asyncio.sleep(delay)
+            await self.run_job(job)
+            delay = self.next_delay(job)
+
+    async def run_job(self, job: Job) -> str:
+        """Run ``job`` once and return its outcome: ok, skipped, timeout or error."""
+        start = time.perf_counter()
+        try:
+            ran = await asyncio.wait_for(asyncio.to_thread(self._run, job), job.timeout)
+            outcome = "ok" if ran else "skipped"
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+        except Exception as e:
+            outcome = "error"
+            logger.error("Maintenance job failed", extra={"job": job.name, "error": str(e)})
+        duration = time.perf_counter() - start
+
+        maintenance_job_runs_total.inc(job=job.name, outcome=outcome)
+        if outcome != "skipped":
+            maintenance_job_duration_seconds.observe(duration, job=job.name)
+            logger.info(
+                "Maintenance job finished",
+                extra={"job": job.name, "outcome": outcome, "duration_ms": round(duration * 1000, 2)}
+            )
+        return outcome
+
+    def _run(self, job: Job) -> bool:
+        engine = self.engine_factory()
+        with engine.connect() as conn, conn.begin():
+            is_postgres = conn.dialect.name == "postgresql"
+            if is_postgres:
+                if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": job.lock_key}).scalar():
+                    return False
+                conn.execute(text(f"SET LOCAL statement_timeout = {int(job.timeout * 1000)}"))
+
+            now = datetime.now(timezone.utc)
+            last_run = conn.execute(LAST_RUN, {"job": job.name}).scalar()
+            if last_run is not None:
+                if last_run.tzinfo is None:
+                    last_run = last_run.replace(tzinfo=timezone.utc)
+                # Another worker already ran it during this interval
+                if now - last_run < timedelta(seconds=job.interval / 2):
+                    return False
+
+            job.func(conn)
+
+            insert = postgresql.insert if is_postgres else sqlite.insert
+            stmt = insert(MaintenanceRun).values(job=job.name, finished_at=datetime.now(timezone.utc))
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=[MaintenanceRun.job], set_={"finished_at": stmt.excluded.finished_at}
+            ))
+        return True
+
+
+def maintenance_scheduler(engine_factory: Callable[[], Engine], settings: Settings) -> Scheduler:
+    """Build the scheduler with the configured maintenance jobs."""
+    scheduler = Scheduler(engine_factory)
+    if not settings.maintenance_enabled:
+        return scheduler
+
+    timeout, jitter = settings.maintenance_timeout_seconds, settings.maintenance_jitter
+    scheduler.add(Job("analyze", analyze_tables, settings.analyze_interval_seconds, timeout, jitter))
+    scheduler.add(Job(
+        "backfill_sketches",
+        lambda conn: backfill_sketches(conn, SKETCH_BACKFILL_BATCH),
+        settings.sketch_backfill_interval_seconds,
+        timeout,
+        jitter
+    ))
+    if settings.visit_retention_days:
+        scheduler.add(Job(
+            "prune_visits",
+            lambda conn: prune_visits(conn, settings.visit_retention_days, settings.prune_batch_size),
+            settings.prune_interval_seconds,
+            timeout,
+            jitter
+        ))
+    return scheduler
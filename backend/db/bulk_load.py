@@ -0,0 +1,138 @@
+import io
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Iterable, Sequence
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def format_copy_value(value: Any) -> str:
+    """Render a value for PostgreSQL's COPY text format."""
+    if value is None:
+        return "\\N"
+    if value.__class__ is str:
+        # translate() is slow; most values need no escaping at all
+        if "\\" in value or "\t" in value or "\n" in value or "\r" in value:
+            return value.translate(_COPY_ESCAPES)
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def format_timestamps(epoch_us: np.ndarray, dialect: str) -> list[str]:
+    """Render UTC epoch microseconds as stored ``DateTime(timezone=True)`` values."""
+    values = np.datetime_as_string(epoch_us.astype("datetime64[us]"), unit="us")
+    if dialect == "postgresql":
+        return [value + "+00:00" for value in values.tolist()]
+    # Matches the storage format of SQLAlchemy's SQLite DateTime type
+    return [value.replace("T", " ") for value in values.tolist()]
+
+
+def _copy_buffer(rows: Iterable[Sequence[Any]]) -> io.StringIO:
+    buffer = io.StringIO()
+    buffer.writelines("\t".join(map(format_copy_value, row)) + "\n" for row in rows)
+    buffer.seek(0)
+    return buffer
+
+
+def _copy_from(conn: Connection, table: str, columns: Sequence[str], buffer: io.StringIO) -> None:
+    statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    cursor = conn.connection.cursor()
+    try:
+        if conn.dialect.driver == "psycopg":
+            # psycopg 3 has no copy_expert; COPY goes through a Copy object instead
+            with cursor.copy(statement) as copy:
+                copy.write(buffer.getvalue())
+        else:
+            cursor.copy_expert(statement, buffer)
+    finally:
+        cursor.close()
+
+
+def copy_text(conn: Connection, table: str, columns: Sequence[str], data: str) -> None:
+    """COPY already formatted, newline-terminated text rows into a PostgreSQL table."""
+    _copy_from(conn, table, columns, io.StringIO(data))
+
+
+def load_rows(conn: Connection, table: str, columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> int:
+    """Bulk-insert ``rows`` inside the caller's transaction.
+
+    PostgreSQL uses ``COPY ... FROM STDIN``; other dialects fall back to a
+    single DBAPI ``executemany``. Values must already be in their stored form
+    (no ORM defaults are applied).
+    """
+    if not rows:
+        return 0
+
+    if conn.dialect.name == "postgresql":
+        _copy_from(conn, table, columns, _copy_buffer(rows))
+        return len(rows)
+
+    column_list = ", ".join(columns)
+    marker = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+    placeholders = ", ".join(marker for _ in columns)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.executemany(f"INSERT INTO {table} ({column_list}) VALUES ({placeholders})", rows)
+    finally:
+        cursor.close()
+    return len(rows)
+
+
+def _secondary_index_ddl(conn: Connection, table: str) -> tuple[list[str], list[str]]:
+    """Return (drop, create) statements for non-unique indexes and foreign keys of ``table``."""
+    drops, creates = [], []
+    if conn.dialect.name == "postgresql":
+        indexes = conn.execute(text(
+            "SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid) FROM pg_index "
+            "WHERE indrelid = CAST(:table AS regclass) AND NOT indisunique"
+        ), {"table": table}).all()
+        foreign_keys = conn.execute(text(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'"
+        ), {"table": table}).all()
+        for name, definition in foreign_keys:
+            drops.append(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')
+            creates.append(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+    elif conn.dialect.name == "sqlite":
+        indexes = conn.execute(text(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :table "
+            "AND sql IS NOT NULL AND sql NOT LIKE 'CREATE UNIQUE%'"
+        ), {"table": table}).all()
+    else:
+        indexes = []
+
+    for name, definition in indexes:
+        drops.append(f"DROP INDEX {name}")
+        creates.append(definition)
+    return drops, creates
+
+
+@contextmanager
+def deferred_indexes(engine: Engine, table: str):
+    """Drop secondary indexes and foreign keys of an *empty* table while bulk loading.
+
+    Building indexes once after the load is several times faster than
+    maintaining them (and checking foreign keys) row by row. Unique indexes
+    are kept because they enforce correctness. Does nothing if ``table``
+    already has rows.
+    """
+    with engine.begin() as conn:
+        if conn.execute(text(f"SELECT 1 FROM {table} LIMIT 1")).first() is not None:
+            drops, creates = [], []
+        else:
+            drops, creates = _secondary_index_ddl(conn, table)
+            for statement in drops:
+                conn.execute(text(statement))
+    try:
+        yield
+    finally:
+        if creates:
+            with engine.begin() as conn:
+                for statement in creates:
+                    conn.execute(text(statement))
@@ -0,0 +1,82 @@
+import re
+import time
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utils.logger import logger
+from utils.request_context import current_request_stats
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request_stats()
+    if stats is not None:
+        stats.db_queries += 1
+
+
+def normalize_statement(statement: str) -> str:
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def redact_parameters(parameters: Any, executemany: bool = False) -> Any:
+    """Replace bound values with their type names so slow-query logs never leak data."""
+    if executemany:
+        return f"<{len(parameters)} parameter sets>"
+    if isinstance(parameters, dict):
+        return {key: _placeholder(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_placeholder(value) for value in parameters]
+    return parameters
+
+
+def _placeholder(value: Any) -> Optional[str]:
+    return None if value is None else f"<{type(value).__name__}>"
+
+
+class QueryProfiler:
+    """Opt-in per-statement timing, attributed to the current request.
+
+    Statements slower than ``slow_query_ms`` are logged with redacted
+    parameters; per-request tallies are reported by ``LoggingMiddleware``.
+    """
+
+    def __init__(self, slow_query_ms: float):
+        self.slow_query_ms = slow_query_ms
+
+    def attach(self, engine: Engine) -> None:
+        if not event.contains(engine, "before_cursor_execute", self.before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+        statement = normalize_statement(statement)
+
+        slow = duration_ms >= self.slow_query_ms
+        stats = current_request_stats()
+        if stats is not None:
+            stats.record_statement(statement, duration_ms, slow)
+
+        if slow:
+            logger.warning(
+                "Slow query",
+                extra={
+                    "statement": statement,
+                    "parameters": redact_parameters(parameters, executemany),
+                    "duration_ms": round(duration_ms, 2),
+                }
+            )
+
+
+def instrument_engine(engine: Engine, profiler: Optional[QueryProfiler] = None) -> Engine:
+    if not event.contains(engine, "after_cursor_execute", _count_query):
+        event.listen(engine, "after_cursor_execute", _count_query)
+    if profiler is not None:
+        profiler.attach(engine)
+    return engine
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Date, bindparam, cast, delete, exists, func, select, text, update
+from sqlalchemy.engine import Connection
+
+from db.sketches import merge_url_sketches
+from models.visit import Url, UrlSketch, Visit
+
+ANALYZED_TABLES = ("visits", "urls")
+
+EXPIRED_VISITS = (
+    delete(Visit)
+    .where(Visit.id.in_(
+        select(Visit.id)
+        .where(Visit.datetime_visited < bindparam("cutoff"))
+        .order_by(Visit.id)
+        .limit(bindparam("limit"))
+        .scalar_subquery()
+    ))
+)
+
+ORPHANED_URL_IDS = (
+    select(Url.id)
+    .where(~exists().where(Visit.url_id == Url.id))
+    .limit(bindparam("limit"))
+)
+
+DELETE_URLS = delete(Url).where(Url.id.in_(bindparam("url_ids", expanding=True)))
+
+# Sketch rows are removed explicitly because SQLite does not enforce the cascade by default
+DELETE_SKETCHES = delete(UrlSketch).where(UrlSketch.url_id.in_(bindparam("url_ids", expanding=True)))
+
+PENDING_SKETCH_URL_IDS = (
+    select(UrlSketch.url_id)
+    .where(UrlSketch.backfill_pending)
+    .order_by(UrlSketch.url_id)
+    .limit(bindparam("limit"))
+)
+
+SKETCHES_BACKFILLED = (
+    update(UrlSketch)
+    .where(UrlSketch.url_id.in_(bindparam("url_ids", expanding=True)))
+    .values(backfill_pending=False)
+)
+
+
+def analyze_tables(conn: Connection) -> None:
+    """Refresh planner statistics so plans follow the data as visits grow."""
+    for table in ANALYZED_TABLES:
+        conn.execute(text(f"ANALYZE {table}"))
+
+
+def prune_visits(conn: Connection, retention_days: int, limit: int) -> dict:
+    """Delete up to ``limit`` visits older than ``retention_days`` and URLs left without visits.
+
+    Deletes are bounded so one run never holds long locks; a large backlog
+    is worked off over several runs.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    visits = conn.execute(EXPIRED_VISITS, {"cutoff": cutoff, "limit": limit}).rowcount
+    if not visits:
+        # URLs only lose their last visit through pruning, so skip the anti-join
+        return {"visits": 0, "urls": 0}
+    url_ids = conn.execute(ORPHANED_URL_IDS, {"limit": limit}).scalars().all()
+    if url_ids:
+        conn.execute(DELETE_SKETCHES, {"url_ids": url_ids})
+        conn.execute(DELETE_URLS, {"url_ids": url_ids})
+    return {"visits": visits, "urls": len(url_ids)}
+
+
+def backfill_sketches(conn: Connection, limit: int) -> int:
+    """Build visit-day sketches for up to ``limit`` URLs whose visits predate sketches.
+
+    Only visit days can be rebuilt; client keys were never stored, so
+    those sketches start empty. Returns the number of URLs processed.
+    """
+    url_ids = conn.execute(PENDING_SKETCH_URL_IDS, {"limit": limit}).scalars().all()
+    if not url_ids:
+        return 0
+
+    if conn.dialect.name == "postgresql":
+        day = cast(func.timezone("UTC", Visit.datetime_visited), Date)
+    else:
+        day = func.date(Visit.datetime_visited)
+    days: dict[int, set] = {url_id: set() for url_id in url_ids}
+    for url_id, visited_on in conn.execute(
+        select(Visit.url_id, day).where(Visit.url_id.in_(url_ids)).distinct()
+    ):
+        days[url_id].add(str(visited_on))
+
+    merge_url_sketches(conn, {url_id: (url_days, set()) for url_id, url_days in days.items()})
+    conn.execute(SKETCHES_BACKFILLED, {"url_ids": url_ids})
+    return len(url_ids)
@@ -0,0 +1,69 @@
+import itertools
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy.engine import Engine
+
+MAX_TRACKED_WRITERS = 10000
+
+
+class ReplicaRouter:
+    """Chooses read replicas round-robin, skipping ones that recently failed.
+
+    A replica marked down is retried after ``retry_seconds``. Clients that
+    wrote within ``read_your_writes_seconds`` are sent to the primary so they
+    see their own writes despite replication lag (tracked per process).
+    """
+
+    def __init__(self, replicas: list[Engine], retry_seconds: float = 30.0,
+                 read_your_writes_seconds: float = 0.0, clock: Callable[[], float] = time.monotonic):
+        self.replicas = list(replicas)
+        self.retry_seconds = retry_seconds
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self._clock = clock
+        self._down_until: dict[int, float] = {}
+        self._cursor = itertools.count()
+        self._recent_writes: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def candidates(self, client_key: Optional[str] = None) -> list[Engine]:
+        """Replicas to try in order; an empty list means "use the primary"."""
+        if not self.replicas or self.requires_primary(client_key):
+            return []
+        now = self._clock()
+        start = next(self._cursor) % len(self.replicas)
+        ordered = self.replicas[start:] + self.replicas[:start]
+        return [engine for engine in ordered if self._down_until.get(id(engine), 0) <= now]
+
+    def mark_down(self, engine: Engine) -> None:
+        self._down_until[id(engine)] = self._clock() + self.retry_seconds
+
+    def healthy_count(self) -> int:
+        now = self._clock()
+        return sum(1 for engine in self.replicas if self._down_until.get(id(engine), 0) <= now)
+
+    def record_write(self, client_key: Optional[str]) -> None:
+        if not self.replicas or not self.read_your_writes_seconds or client_key is None:
+            return
+        now = self._clock()
+        self._recent_writes[client_key] = now
+        if len(self._recent_writes) > MAX_TRACKED_WRITERS:
+            self._prune(now)
+
+    def requires_primary(self, client_key: Optional[str]) -> bool:
+        if not self.read_your_writes_seconds or client_key is None:
+            return False
+        written_at = self._recent_writes.get(client_key)
+        return written_at is not None and self._clock() - written_at < self.read_your_writes_seconds
+
+    def _prune(self, now: float) -> None:
+        with self._lock:
+            cutoff = now - self.read_your_writes_seconds
+            for key, written_at in list(self._recent_writes.items()):
+                if written_at < cutoff:
+                    self._recent_writes.pop(key, None)
+
+    def dispose(self) -> None:
+        for engine in self.replicas:
+            engine.dispose()
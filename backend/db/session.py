@@ -1,39 +1,174 @@
+from typing import Optional
+
+from fastapi import Request
+from slowapi.util import get_remote_address
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.exc import OperationalError, DBAPIError
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from core.config import settings
+from core.config import Settings, get_settings
+from db.instrumentation import QueryProfiler, instrument_engine
+from db.replicas import ReplicaRouter
+from db.sqlite import create_sqlite_engine
 from utils.logger import logger
+from utils.metrics import db_read_routing_total
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(min=2, max=10),
-    retry=retry_if_exception_type((OperationalError, DBAPIError)),
-    reraise=True
-)
-def create_db_engine():
+_engine: Optional[Engine] = None
+_read_engine: Optional[Engine] = None
+_replica_router: Optional[ReplicaRouter] = None
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+
+def create_db_engine(database_url: Optional[str] = None, readonly: bool = False) -> Engine:
+    # create_engine() does not connect; the pool is filled by warm_up_pool()
+    settings = get_settings()
     logger.info("Creating database engine")
+    url = make_url(database_url or settings.database_url)
+    profiler = QueryProfiler(settings.slow_query_ms) if settings.query_profiling else None
+    if url.get_backend_name() == "sqlite":
+        return instrument_engine(create_sqlite_engine(url, settings, readonly), profiler)
     
     engine = create_engine(
-        settings.database_url,
+        url,
         pool_pre_ping=True,
-        pool_recycle=3600
+        pool_recycle=3600,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        connect_args=driver_connect_args(url.get_driver_name(), settings)
     )
     
-    with engine.connect() as conn:
-        conn.execute(text("SELECT 1"))
-        logger.info("Database connection verified")
-    
+    return instrument_engine(engine, profiler)
+
+
+def driver_connect_args(driver: str, settings: Settings) -> dict:
+    # psycopg 3 prepares a statement server-side once it has run prepare_threshold
+    # times on a connection; psycopg2 has no server-side prepared statements.
+    if driver == "psycopg":
+        return {"prepare_threshold": settings.db_prepare_threshold}
+    return {}
+
+
+def configure_engine(engine: Engine) -> Engine:
+    global _engine, _read_engine
+    if _read_engine is not None and _read_engine is not _engine:
+        _read_engine.dispose()
+    _engine = engine
+    _read_engine = None
+    SessionLocal.configure(bind=engine)
     return engine
 
-engine = create_db_engine()
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def get_engine() -> Engine:
+    if _engine is None:
+        configure_engine(create_db_engine())
+    return _engine
+
+
+def get_read_engine() -> Engine:
+    """Engine for reads that are not sent to a replica.
+
+    That is the primary, except for a SQLite database file: its writer has a
+    single connection, so reads get their own pool of read-only connections.
+    """
+    global _read_engine
+    engine = get_engine()
+    if _read_engine is None:
+        if engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:"):
+            _read_engine = create_db_engine(engine.url.render_as_string(hide_password=False), readonly=True)
+        else:
+            _read_engine = engine
+    return _read_engine
+
+
+def configure_replicas(router: Optional[ReplicaRouter]) -> Optional[ReplicaRouter]:
+    global _replica_router
+    _replica_router = router
+    return router
+
+
+def get_replica_router() -> ReplicaRouter:
+    if _replica_router is None:
+        settings = get_settings()
+        configure_replicas(ReplicaRouter(
+            [create_db_engine(url) for url in settings.database_replica_urls],
+            retry_seconds=settings.replica_retry_seconds,
+            read_your_writes_seconds=settings.read_your_writes_seconds
+        ))
+    return _replica_router
+
+
+def dispose_engine() -> None:
+    global _engine, _read_engine, _replica_router
+    if _read_engine is not None and _read_engine is not _engine:
+        _read_engine.dispose()
+    _read_engine = None
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
+    if _replica_router is not None:
+        _replica_router.dispose()
+        _replica_router = None
+
+
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(min=2, max=10),
+    retry=retry_if_exception_type((OperationalError, DBAPIError)),
+    reraise=True
+)
+def warm_up_pool(engine: Engine, connections: int) -> None:
+    """Verify connectivity and pre-open ``connections`` pooled connections."""
+    if isinstance(engine.pool, QueuePool):
+        # Never wait on a pool smaller than requested (the SQLite writer has one connection)
+        connections = min(connections, engine.pool.size())
+    opened = [engine.connect() for _ in range(max(1, connections))]
+    try:
+        opened[0].execute(text("SELECT 1"))
+        logger.info("Database connection verified", extra={"warm_connections": len(opened)})
+    finally:
+        for conn in opened:
+            conn.close()
 
 
 def get_db():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+
+def _open_read_session(client_key: Optional[str]):
+    router = get_replica_router()
+    for engine in router.candidates(client_key):
+        db = SessionLocal(bind=engine)
+        try:
+            # Check out a connection now so a dead replica falls back instead of failing the request
+            db.connection()
+            db_read_routing_total.inc(target="replica")
+            return db
+        except (OperationalError, DBAPIError) as e:
+            db.close()
+            router.mark_down(engine)
+            logger.warning("Read replica unavailable", extra={"replica": engine.url.host, "error": str(e)})
+    
+    db_read_routing_total.inc(target="primary")
+    return SessionLocal(bind=get_read_engine())
+
+
+def get_read_db(request: Request):
+    """Session for read-only endpoints: a healthy replica if configured, else the primary."""
+    db = _open_read_session(get_remote_address(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def track_client_write(request: Request):
+    # Runs after the route succeeds; starts the client's read-your-writes window
+    yield
+    get_replica_router().record_write(get_remote_address(request))
@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+from typing import Union
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from models.visit import Url, UrlSketch
+from utils.hll import HyperLogLog
+
+SKETCHES_BY_URL = (
+    select(UrlSketch.visit_days, UrlSketch.clients, UrlSketch.backfill_pending)
+    .join(Url, Url.id == UrlSketch.url_id)
+    .where(Url.url == bindparam("url"))
+)
+
+# Rows are locked in url_id order so concurrent merges cannot deadlock
+SKETCHES_FOR_UPDATE = (
+    select(UrlSketch.url_id, UrlSketch.visit_days, UrlSketch.clients)
+    .where(UrlSketch.url_id.in_(bindparam("url_ids", expanding=True)))
+    .order_by(UrlSketch.url_id)
+    .with_for_update()
+)
+
+UPDATE_SKETCH = (
+    update(UrlSketch.__table__)
+    .where(UrlSketch.url_id == bindparam("b_url_id"))
+    .values(visit_days=bindparam("b_visit_days"), clients=bindparam("b_clients"))
+)
+
+
+def visit_day(visited_at: datetime) -> str:
+    """The UTC calendar day a visit counts towards in the visit_days sketch."""
+    if visited_at.tzinfo is not None:
+        visited_at = visited_at.astimezone(timezone.utc)
+    return visited_at.date().isoformat()
+
+
+def merge_url_sketches(db: Union[Session, Connection], additions: dict[int, tuple[set, set]]) -> int:
+    """Fold new visit days and client keys into each URL's sketches.
+
+    ``additions`` maps url_id to ``(days, client_keys)``. Runs inside the
+    caller's transaction and rewrites only sketches that changed (a day or
+    client already counted rarely moves a register). Returns the number of
+    rows written.
+    """
+    if not additions:
+        return 0
+
+    url_ids = sorted(additions)
+    dialect = db.get_bind().dialect.name if isinstance(db, Session) else db.dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    db.execute(
+        insert(UrlSketch.__table__).on_conflict_do_nothing(index_elements=["url_id"]),
+        [{"url_id": url_id} for url_id in url_ids]
+    )
+
+    changed = []
+    for url_id, stored_days, stored_clients in db.execute(SKETCHES_FOR_UPDATE, {"url_ids": url_ids}):
+        days, clients = additions[url_id]
+        new_days = _merged(stored_days, days)
+        new_clients = _merged(stored_clients, clients)
+        if new_days != stored_days or new_clients != stored_clients:
+            changed.append({"b_url_id": url_id, "b_visit_days": new_days, "b_clients": new_clients})
+    if changed:
+        db.execute(UPDATE_SKETCH, changed)
+    return len(changed)
+
+
+def _merged(stored: bytes | None, values: set) -> bytes | None:
+    if not values:
+        return stored
+    sketch = HyperLogLog.from_bytes(stored)
+    before = bytes(sketch.registers)
+    sketch.update(values)
+    if stored is not None and sketch.registers == before:
+        return stored
+    return sketch.to_bytes()
+
+
+def estimate(stored: bytes | None) -> int | None:
+    return HyperLogLog.from_bytes(stored).count() if stored is not None else None
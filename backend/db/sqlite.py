@@ -0,0 +1,49 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine
+
+from core.config import Settings
+
+
+def create_sqlite_engine(url: URL, settings: Settings, readonly: bool = False) -> Engine:
+    """Engine for a SQLite database file in WAL mode.
+
+    SQLite allows one writer at a time, so the write engine has a single
+    pooled connection: concurrent write transactions queue for it in this
+    process instead of failing with ``database is locked``. They begin with
+    ``BEGIN IMMEDIATE``, which takes the write lock up front and waits up to
+    ``SQLITE_BUSY_TIMEOUT_MS`` for other processes. The read-only engine
+    gets ``DB_POOL_SIZE + DB_MAX_OVERFLOW`` connections; in WAL mode they
+    read alongside the writer without blocking it.
+    """
+    engine = create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=settings.db_pool_size if readonly else 1,
+        max_overflow=settings.db_max_overflow if readonly else 0,
+        connect_args={"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000}
+    )
+
+    @event.listens_for(engine, "connect")
+    def configure_connection(dbapi_connection, connection_record):
+        # pysqlite's own transaction handling would defer BEGIN until the first
+        # write; transactions are started by the "begin" hook below instead
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA journal_mode = WAL")
+            # Durable at every checkpoint; a power loss can only lose the last commits
+            cursor.execute("PRAGMA synchronous = NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}")
+            cursor.execute(f"PRAGMA mmap_size = {settings.sqlite_mmap_size_mb * 1024 * 1024}")
+            # A negative cache_size is in KiB rather than pages
+            cursor.execute(f"PRAGMA cache_size = -{settings.sqlite_cache_size_mb * 1024}")
+            if readonly:
+                cursor.execute("PRAGMA query_only = ON")
+        finally:
+            cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def begin(conn):
+        conn.exec_driver_sql("BEGIN" if readonly else "BEGIN IMMEDIATE")
+
+    return engine
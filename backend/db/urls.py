@@ -0,0 +1,36 @@
+from typing import Iterable, Union
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from models.visit import Url
+
+URL_IDS_BY_VALUES = select(Url.url, Url.id).where(Url.url.in_(bindparam("urls", expanding=True)))
+
+
+def dialect_insert(db: Union[Session, Connection]):
+    """``insert`` of ``db``'s dialect, which has ``on_conflict_do_*``."""
+    dialect = db.get_bind().dialect.name if isinstance(db, Session) else db.dialect.name
+    return postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+
+def get_or_create_url_ids(db: Union[Session, Connection], urls: Iterable[str]) -> dict[str, int]:
+    """Resolve many URLs with one lookup plus one insert for the missing ones.
+
+    Runs inside the caller's transaction. Missing URLs are inserted in
+    sorted order, so concurrent writers (the API and the importer) take the
+    urls.url index locks in the same order and cannot deadlock.
+    """
+    urls = set(urls)
+    url_ids = dict(db.execute(URL_IDS_BY_VALUES, {"urls": list(urls)}).tuples().all())
+    missing = sorted(url for url in urls if url not in url_ids)
+    if missing:
+        # Another writer may insert the same URL concurrently; keep whichever row won
+        db.execute(
+            dialect_insert(db)(Url).on_conflict_do_nothing(index_elements=[Url.url]),
+            [{"url": url} for url in missing]
+        )
+        url_ids.update(db.execute(URL_IDS_BY_VALUES, {"urls": missing}).tuples().all())
+    return url_ids
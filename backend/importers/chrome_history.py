@@ -0,0 +1,263 @@
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+from decouple import config as env_config
+from pydantic import ValidationError
+from sqlalchemy import bindparam, select
+from sqlalchemy.engine import Connection, Engine
+
+from api.schemas import VisitCreate
+from db.bulk_load import copy_text, deferred_indexes, format_copy_value, format_timestamps, load_rows
+from db.maintenance import backfill_sketches
+from db.urls import dialect_insert, get_or_create_url_ids
+from db.session import create_db_engine
+from models.visit import ImportCheckpoint, UrlSketch
+
+CHUNK_SIZE = 50_000
+# URLs whose visit-day sketches are rebuilt per transaction after the load
+SKETCH_BACKFILL_BATCH = 1000
+VISIT_COLUMNS = ("url_id", "title", "description", "datetime_visited", "link_count", "word_count", "image_count")
+# Chrome stores times as microseconds since 1601-01-01 UTC (the WebKit epoch);
+# this is the Unix epoch's value on that scale
+WEBKIT_EPOCH_OFFSET_US = 11_644_473_600_000_000
+# Visits this far past our clock are treated as corrupt and skipped
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+# VisitCreate rejects longer titles; Chrome's are truncated to fit instead
+TITLE_MAX_LENGTH = 500
+
+CHROME_URLS = "SELECT id, url, title FROM urls"
+CHROME_VISITS = "SELECT id, url, visit_time FROM visits WHERE id > ? ORDER BY id"
+
+CHECKPOINT_BY_SOURCE = (
+    select(ImportCheckpoint.last_visit_id, ImportCheckpoint.imported_visits)
+    .where(ImportCheckpoint.source == bindparam("source"))
+)
+
+
+@contextmanager
+def open_snapshot(path: str) -> Iterator[sqlite3.Connection]:
+    """Open a private, read-only copy of a Chrome ``History`` file.
+
+    Chrome keeps the file locked while the browser runs, so it is copied to
+    a temporary directory first, together with its write-ahead log if there
+    is one (committed changes may not have been checkpointed yet).
+    """
+    with tempfile.TemporaryDirectory(prefix="chrome-history-") as directory:
+        snapshot = Path(directory) / "History"
+        shutil.copyfile(path, snapshot)
+        if os.path.exists(f"{path}-wal"):
+            shutil.copyfile(f"{path}-wal", f"{snapshot}-wal")
+        history = sqlite3.connect(f"{snapshot.as_uri()}?mode=ro", uri=True)
+        try:
+            yield history
+        finally:
+            history.close()
+
+
+class ChromeUrls:
+    """Chrome's ``urls`` table normalized like ``VisitCreate``, indexed by Chrome url id.
+
+    Each URL is validated once rather than once per visit. URLs that
+    ``VisitCreate`` rejects (``chrome://``, ``file://``, ...) are marked
+    invalid and their visits skipped. Our url ids are resolved lazily, as
+    chunks reference them.
+    """
+
+    def __init__(self, history: sqlite3.Connection):
+        urls, titles = {}, {}
+        for chrome_id, url, title in history.execute(CHROME_URLS):
+            try:
+                visit = VisitCreate(url=url, title=title[:TITLE_MAX_LENGTH] if title else None)
+            except ValidationError:
+                continue
+            urls[chrome_id] = visit.url
+            titles[chrome_id] = visit.title
+
+        size = max(urls, default=0) + 1
+        self.urls = np.full(size, None, dtype=object)
+        self.titles = np.full(size, None, dtype=object)
+        self.valid = np.zeros(size, dtype=bool)
+        # -1 until the URL has been resolved to an id in our urls table
+        self.ids = np.full(size, -1, dtype=np.int64)
+        for chrome_id, url in urls.items():
+            self.urls[chrome_id] = url
+            self.titles[chrome_id] = titles[chrome_id]
+            self.valid[chrome_id] = True
+        self.copy_titles = np.array([format_copy_value(title) for title in self.titles.tolist()], dtype=object)
+
+    def is_valid(self, chrome_ids: np.ndarray) -> np.ndarray:
+        # Visits can reference URLs missing from the urls table
+        in_range = chrome_ids < len(self.valid)
+        return in_range & self.valid[np.where(in_range, chrome_ids, 0)]
+
+    def resolve(self, conn: Connection, chrome_ids: np.ndarray) -> np.ndarray:
+        """Our url ids for valid ``chrome_ids``, inserting URLs we do not have yet."""
+        missing = np.unique(chrome_ids[self.ids[chrome_ids] < 0])
+        if len(missing):
+            by_url = get_or_create_url_ids(conn, self.urls[missing].tolist())
+            self.ids[missing] = [by_url[url] for url in self.urls[missing].tolist()]
+        return self.ids[chrome_ids]
+
+
+def _mark_sketches_pending(conn: Connection, url_ids: np.ndarray) -> None:
+    # Merging every chunk's visit days into the sketches would rewrite popular
+    # URLs' sketches once per chunk; the backfill job rebuilds each one once
+    table = UrlSketch.__table__
+    stmt = dialect_insert(conn)(table)
+    conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[table.c.url_id],
+            set_={"backfill_pending": stmt.excluded.backfill_pending},
+            where=table.c.backfill_pending.is_(False),
+        ),
+        [{"url_id": url_id, "backfill_pending": True} for url_id in np.unique(url_ids).tolist()]
+    )
+
+
+def _load_visits(conn: Connection, chrome_urls: ChromeUrls, chrome_ids: np.ndarray,
+                 url_ids: np.ndarray, epoch_us: np.ndarray) -> None:
+    dialect = conn.dialect.name
+    stamps = format_timestamps(epoch_us, dialect)
+    if dialect == "postgresql":
+        # Page counts are unknown for imported visits and stored as 0, the API default
+        copy_text(conn, "visits", VISIT_COLUMNS, "".join(
+            f"{url_id}\t{title}\t\\N\t{stamp}\t0\t0\t0\n"
+            for url_id, title, stamp in zip(url_ids.tolist(), chrome_urls.copy_titles[chrome_ids].tolist(), stamps)
+        ))
+    else:
+        load_rows(conn, "visits", VISIT_COLUMNS, [
+            (url_id, title, None, stamp, 0, 0, 0)
+            for url_id, title, stamp in zip(url_ids.tolist(), chrome_urls.titles[chrome_ids].tolist(), stamps)
+        ])
+
+
+def _save_checkpoint(conn: Connection, source: str, last_visit_id: int, imported_visits: int) -> None:
+    stmt = dialect_insert(conn)(ImportCheckpoint).values(
+        source=source, last_visit_id=last_visit_id, imported_visits=imported_visits,
+        updated_at=datetime.now(timezone.utc)
+    )
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=[ImportCheckpoint.source],
+        set_={
+            "last_visit_id": stmt.excluded.last_visit_id,
+            "imported_visits": stmt.excluded.imported_visits,
+            "updated_at": stmt.excluded.updated_at,
+        }
+    ))
+
+
+def import_chrome_history(engine: Engine, history_path: str, source: Optional[str] = None,
+                          chunk_size: int = CHUNK_SIZE, defer_indexes: bool = False,
+                          progress: Optional[Callable[[dict], None]] = None) -> dict:
+    """Import the visits of a Chrome ``History`` file into urls/visits.
+
+    Visits are read in id order and loaded ``chunk_size`` at a time (``COPY``
+    on PostgreSQL), each chunk in one transaction together with the
+    ``import_checkpoints`` row for ``source`` (the file's absolute path by
+    default). An interrupted import therefore resumes after the last
+    committed chunk, and running it again later only adds
+    visits Chrome has recorded since. Visits with invalid URLs or times in
+    the future are skipped. ``defer_indexes`` drops the visits indexes
+    while loading into an empty table; only use it while nothing else uses
+    the database.
+
+    Touched URLs are flagged for the sketch backfill in the same
+    transactions, and their visit-day sketches are rebuilt once at the end
+    (or by the scheduled backfill job if the import is interrupted).
+
+    Returns the totals for this run; ``progress`` gets them after every chunk.
+    """
+    source = source or os.path.abspath(history_path)
+    with engine.connect() as conn:
+        checkpoint = conn.execute(CHECKPOINT_BY_SOURCE, {"source": source}).first()
+    last_visit_id, imported_total = checkpoint or (0, 0)
+    totals = {"source": source, "imported": 0, "skipped": 0, "last_visit_id": last_visit_id, "sketches": 0}
+    latest_us = int((datetime.now(timezone.utc) + MAX_CLOCK_SKEW).timestamp() * 1_000_000)
+
+    with open_snapshot(history_path) as history:
+        chrome_urls = ChromeUrls(history)
+        cursor = history.execute(CHROME_VISITS, (last_visit_id,))
+        with deferred_indexes(engine, "visits") if defer_indexes else nullcontext():
+            while rows := cursor.fetchmany(chunk_size):
+                visit_ids, chrome_ids, visit_times = np.array(rows, dtype=np.int64).T
+                epoch_us = visit_times - WEBKIT_EPOCH_OFFSET_US
+                keep = chrome_urls.is_valid(chrome_ids) & (visit_times > 0) & (epoch_us <= latest_us)
+                chrome_ids, epoch_us = chrome_ids[keep], epoch_us[keep]
+
+                with engine.begin() as conn:
+                    if len(chrome_ids):
+                        url_ids = chrome_urls.resolve(conn, chrome_ids)
+                        _load_visits(conn, chrome_urls, chrome_ids, url_ids, epoch_us)
+                        _mark_sketches_pending(conn, url_ids)
+                    imported_total += len(chrome_ids)
+                    _save_checkpoint(conn, source, int(visit_ids[-1]), imported_total)
+
+                totals["imported"] += len(chrome_ids)
+                totals["skipped"] += len(rows) - len(chrome_ids)
+                totals["last_visit_id"] = int(visit_ids[-1])
+                if progress is not None:
+                    progress(totals)
+
+    # Also finishes the sketches of an earlier, interrupted run
+    while True:
+        with engine.begin() as conn:
+            rebuilt = backfill_sketches(conn, SKETCH_BACKFILL_BATCH)
+        if not rebuilt:
+            return totals
+        totals["sketches"] += rebuilt
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m importers.chrome_history",
+        description="Import browsing history from a Chrome profile's History file.",
+    )
+    parser.add_argument("history", help="Path to Chrome's History file (e.g. ~/.config/google-chrome/Default/History)")
+    parser.add_argument("--database-url", default=env_config("DATABASE_URL", default=None),
+                        help="Target database (default: $DATABASE_URL)")
+    parser.add_argument("--source", help="Checkpoint name for this profile (default: the file's absolute path)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Visits per transaction")
+    parser.add_argument("--defer-indexes", action="store_true",
+                        help="Rebuild visits indexes after loading into an empty table (offline imports only)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if not args.database_url:
+        print("No database URL given (use --database-url or set DATABASE_URL)", file=sys.stderr)
+        return 2
+    if not os.path.isfile(args.history):
+        print(f"No such file: {args.history}", file=sys.stderr)
+        return 2
+
+    def report(totals: dict) -> None:
+        print(f"Imported {totals['imported']:,} visits (skipped {totals['skipped']:,}, "
+              f"last visit id {totals['last_visit_id']})", flush=True)
+
+    engine = create_db_engine(args.database_url)
+    try:
+        start = time.perf_counter()
+        totals = import_chrome_history(engine, args.history, args.source, args.chunk_size,
+                                       args.defer_indexes, progress=report)
+        elapsed = time.perf_counter() - start
+    finally:
+        engine.dispose()
+
+    print(f"Done: {totals['imported']:,} visits imported and {totals['sketches']:,} URL sketches rebuilt "
+          f"in {elapsed:.2f}s ({totals['imported'] / elapsed:,.0f} visits/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import asyncio
+import time
+from collections import deque
+from typing import Iterable, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from api.response import error_response
+from core.config import get_settings
+from utils.logger import logger
+from utils.metrics import (
+    admission_active,
+    admission_queued,
+    admission_rejections_total,
+    admission_wait_seconds,
+)
+
+READ = "read"
+WRITE = "write"
+READ_METHODS = frozenset({"GET", "HEAD"})
+RETRY_AFTER_SECONDS = 1
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionLimiter:
+    """Admits at most ``limit`` requests at a time; up to ``queue_size`` more wait.
+
+    A freed slot goes to the oldest waiting read before any write, so page
+    loads stay fast while large batches queue behind them. A request that
+    cannot be queued, or waits longer than ``timeout`` seconds, is rejected
+    with ``Overloaded`` instead of piling up on the connection pool.
+    """
+
+    def __init__(self, limit: int, queue_size: int, timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: dict[str, deque[asyncio.Future]] = {READ: deque(), WRITE: deque()}
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    async def acquire(self, priority: str) -> None:
+        # Queued requests are served first, so a new one never jumps the line
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+            return
+        if self.queued >= self.queue_size:
+            raise Overloaded("queue_full")
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters[priority].append(waiter)
+        expiry = loop.call_later(self.timeout, self._expire, priority, waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # The client went away just as a slot was handed over; pass it on
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                self.release()
+            else:
+                self._discard(priority, waiter)
+            raise
+        finally:
+            expiry.cancel()
+
+    def release(self) -> None:
+        for priority in (READ, WRITE):
+            waiters = self._waiters[priority]
+            while waiters:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    # The slot moves straight to the waiter; active is unchanged
+                    waiter.set_result(None)
+                    return
+        self.active -= 1
+
+    def _expire(self, priority: str, waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            self._discard(priority, waiter)
+            waiter.set_exception(Overloaded("timeout"))
+
+    def _discard(self, priority: str, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters[priority].remove(waiter)
+        except ValueError:
+            pass
+
+
+class AdmissionControlMiddleware:
+    """Load shedding for database-bound routes.
+
+    Requests under ``paths`` (except ``exclude``) need an admission slot.
+    Concurrency defaults to ``DB_POOL_SIZE + DB_MAX_OVERFLOW``, so requests
+    that would only block waiting for a pooled connection wait here instead,
+    in a bounded queue, and excess load gets a fast 503 with ``Retry-After``.
+    """
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str], exclude: Iterable[str] = (),
+                 limiter: Optional[AdmissionLimiter] = None):
+        self.app = app
+        self.paths = tuple(paths)
+        self.exclude = tuple(exclude)
+        if limiter is None:
+            settings = get_settings()
+            limiter = AdmissionLimiter(
+                settings.admission_concurrency or settings.db_pool_size + settings.db_max_overflow,
+                settings.admission_queue_size,
+                settings.admission_queue_timeout_seconds
+            )
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope.get("path", "")
+        if (scope["type"] != "http" or not path.startswith(self.paths)
+                or path.startswith(self.exclude)):
+            await self.app(scope, receive, send)
+            return
+
+        priority = READ if scope["method"] in READ_METHODS else WRITE
+        start = time.perf_counter()
+        admission_queued.inc(priority=priority)
+        try:
+            await self.limiter.acquire(priority)
+        except Overloaded as e:
+            admission_rejections_total.inc(priority=priority, reason=e.reason)
+            logger.warning(
+                "Request shed",
+                extra={"path": path, "priority": priority, "reason": e.reason,
+                       "active": self.limiter.active, "queued": self.limiter.queued}
+            )
+            response = error_response(
+                message="Server is busy, retry shortly",
+                status_code=503,
+                error_codes=["overloaded"]
+            )
+            response.headers["Retry-After"] = str(RETRY_AFTER_SECONDS)
+            await response(scope, receive, send)
+            return
+        finally:
+            admission_queued.dec(priority=priority)
+        admission_wait_seconds.observe(time.perf_counter() - start, priority=priority)
+
+        admission_active.inc(priority=priority)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_active.dec(priority=priority)
+            self.limiter.release()
@@ -0,0 +1,225 @@
+import io
+import zlib
+from typing import Iterable, Optional
+
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.response import error_response
+from core.config import get_settings
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstd support is optional
+    zstandard = None
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+class _GzipDecoder:
+    def __init__(self):
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def feed(self, chunk: bytes, limit: int) -> bytes:
+        # Ask for one byte more than allowed so an oversized body is detected
+        # without inflating the rest of it
+        out = self._decompressor.decompress(chunk, limit + 1)
+        if len(out) > limit:
+            raise BodyTooLarge()
+        return out
+
+    def finish(self, limit: int) -> bytes:
+        if not self._decompressor.eof:
+            raise zlib.error("truncated gzip stream")
+        return b""
+
+
+class _ZstdDecoder:
+    """zstd frames can expand by orders of magnitude within a few bytes, so the
+    compressed input is collected first and read back through a bounded reader."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, chunk: bytes, limit: int) -> bytes:
+        self._buffer += chunk
+        if len(self._buffer) > limit:
+            raise BodyTooLarge()
+        return b""
+
+    def finish(self, limit: int) -> bytes:
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(bytes(self._buffer)))
+        out = reader.read(limit + 1)
+        if len(out) > limit:
+            raise BodyTooLarge()
+        if self._buffer and not out:
+            # The reader returns nothing, rather than failing, on a truncated frame
+            raise zstandard.ZstdError("truncated zstd frame")
+        return out
+
+
+DECODERS = {"gzip": _GzipDecoder}
+DECODE_ERRORS: tuple = (zlib.error,)
+if zstandard is not None:
+    DECODERS["zstd"] = _ZstdDecoder
+    DECODE_ERRORS += (zstandard.ZstdError,)
+
+
+class RequestDecompressionMiddleware:
+    """Decode ``Content-Encoding: gzip|zstd`` request bodies on selected paths.
+
+    The body is inflated chunk by chunk as it arrives and rejected with 413 as
+    soon as it exceeds ``max_size`` decompressed bytes (default
+    ``MAX_DECOMPRESSED_BODY_BYTES``), so a small zip bomb cannot exhaust
+    memory. Other paths are passed through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, paths: Iterable[str], max_size: Optional[int] = None):
+        # Middleware is built on the first ASGI call, so settings are still read lazily
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_size = max_size if max_size is not None else get_settings().max_decompressed_body_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = Headers(scope=scope).get("content-encoding", "identity").strip().lower()
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        decoder_class = DECODERS.get(encoding)
+        if decoder_class is None:
+            response = error_response(
+                message=f"Unsupported Content-Encoding: {encoding}",
+                status_code=415,
+                error_codes=["unsupported_content_encoding"]
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            body = await self._decode(decoder_class(), receive)
+        except BodyTooLarge:
+            response = error_response(
+                message=f"Decompressed request body exceeds {self.max_size} bytes",
+                status_code=413,
+                error_codes=["request_too_large"]
+            )
+            await response(scope, receive, send)
+            return
+        except DECODE_ERRORS:
+            response = error_response(
+                message=f"Request body is not valid {encoding} data",
+                status_code=400,
+                error_codes=["invalid_content_encoding"]
+            )
+            await response(scope, receive, send)
+            return
+
+        headers = [
+            (name, value) for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+        headers.append((b"content-length", str(len(body)).encode()))
+        scope = dict(scope, headers=headers)
+
+        sent = False
+
+        async def replay() -> Message:
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        await self.app(scope, replay, send)
+
+    async def _decode(self, decoder, receive: Receive) -> bytes:
+        parts, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunk = decoder.feed(message.get("body", b""), self.max_size - size)
+            parts.append(chunk)
+            size += len(chunk)
+            if not message.get("more_body", False):
+                break
+        parts.append(decoder.finish(self.max_size - size))
+        return b"".join(parts)
+
+
+class ZstdResponder(IdentityResponder):
+    content_encoding = "zstd"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, level: int = ZSTD_LEVEL):
+        super().__init__(app, minimum_size)
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        out = self.compressor.compress(body)
+        if more_body:
+            # Emit a complete block per chunk so streamed responses are not held back
+            return out + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return out + self.compressor.flush()
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick zstd or gzip from an ``Accept-Encoding`` header, honouring q-values."""
+    preferences = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        preferences[name.strip().lower()] = quality
+
+    supported = ("zstd", "gzip") if zstandard is not None else ("gzip",)
+    wildcard = preferences.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in supported:
+        quality = preferences.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """Compress responses of at least ``minimum_size`` bytes (default
+    ``COMPRESSION_MIN_SIZE``) with zstd or gzip.
+
+    Works on the ASGI message stream, so streamed responses are compressed
+    chunk by chunk. Responses that already carry a ``Content-Encoding`` and
+    event streams are left alone.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = minimum_size if minimum_size is not None else get_settings().compression_min_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding == "zstd":
+            responder = ZstdResponder(self.app, self.minimum_size)
+        elif encoding == "gzip":
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=GZIP_LEVEL)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
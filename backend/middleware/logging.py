@@ -1,27 +1,67 @@
+import random
 import time
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
+from core.config import get_settings
 from utils.logger import logger
+from utils.request_context import current_request_stats
 
 
 class LoggingMiddleware(BaseHTTPMiddleware):
+    """Logs each request, keeping only a ``LOG_SUCCESS_SAMPLE_RATE`` share of
+    successful ones. Errors are always logged, and so are requests with a
+    statement slower than ``SLOW_QUERY_MS`` while query profiling is on."""
+
+    def __init__(self, app, sample_rate: float | None = None):
+        super().__init__(app)
+        self.sample_rate = get_settings().log_success_sample_rate if sample_rate is None else sample_rate
+
+    def is_sampled(self, status_code: int, stats) -> bool:
+        return (self.sample_rate < 1 and status_code < 400
+                and not (stats is not None and stats.has_slow_statement))
+
     async def dispatch(self, request: Request, call_next):
         start_time = time.time()
         
         response = await call_next(request)
         
         duration = (time.time() - start_time) * 1000
+        stats = current_request_stats()
+        sampled = self.is_sampled(response.status_code, stats)
+        if sampled and random.random() >= self.sample_rate:
+            return response
+        
+        extra = {
+            "method": request.method,
+            "path": request.url.path,
+            "status_code": response.status_code,
+            "duration_ms": round(duration, 2),
+            "client_ip": request.client.host if request.client else None,
+        }
+        if sampled:
+            # Lets log queries weight sampled lines back up to request counts
+            extra["sample_rate"] = self.sample_rate
         
-        logger.info(
-            "Request processed",
-            extra={
-                "method": request.method,
-                "path": request.url.path,
-                "status_code": response.status_code,
-                "duration_ms": round(duration, 2),
-                "client_ip": request.client.host if request.client else None,
-            }
-        )
+        if stats is not None:
+            extra["db_queries"] = stats.db_queries
+            if stats.statements:
+                extra["db_time_ms"] = round(stats.db_time_ms, 2)
+                extra["db_statements"] = stats.slowest_statements()
+        
+        logger.info("Request processed", extra=extra)
+        
+        if stats is not None and stats.statements:
+            settings = get_settings()
+            repeated = stats.repeated_statements(settings.repeated_query_threshold)
+            if repeated:
+                logger.warning(
+                    "Repeated query pattern detected",
+                    extra={
+                        "method": request.method,
+                        "path": request.url.path,
+                        "threshold": settings.repeated_query_threshold,
+                        "statements": repeated,
+                    }
+                )
         
         return response
-
@@ -0,0 +1,39 @@
+import time
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from utils.metrics import (
+    db_queries_per_request,
+    http_request_duration_seconds,
+    http_requests_in_flight,
+    http_requests_total,
+)
+from utils.request_context import begin_request_stats, end_request_stats
+
+
+def route_label(request: Request) -> str:
+    # Use the route template, not the raw path, to keep label cardinality bounded
+    route = request.scope.get("route")
+    return getattr(route, "path", "<unmatched>")
+
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        method = request.method
+        stats, token = begin_request_stats()
+        http_requests_in_flight.inc(method=method)
+        start_time = time.perf_counter()
+        status_code = 500
+
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            duration = time.perf_counter() - start_time
+            route = route_label(request)
+            http_requests_in_flight.dec(method=method)
+            http_requests_total.inc(method=method, route=route, status=status_code)
+            http_request_duration_seconds.observe(duration, method=method, route=route, status=status_code)
+            db_queries_per_request.observe(stats.db_queries, method=method, route=route)
+            end_request_stats(token)
@@ -1,5 +1,6 @@
 from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, String, DateTime, Index, ForeignKey
+from typing import NamedTuple, Optional
+from sqlalchemy import false, BigInteger, Boolean, Column, Integer, String, DateTime, Index, ForeignKey, LargeBinary, UniqueConstraint
 from sqlalchemy.orm import DeclarativeBase, relationship
 
 
@@ -10,7 +11,7 @@ class Base(DeclarativeBase):
 class Url(Base):
     __tablename__ = "urls"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     url = Column(String, nullable=False, unique=True, index=True)
     
     visits = relationship("Visit", back_populates="url_ref")
@@ -19,8 +20,10 @@ class Url(Base):
 class Visit(Base):
     __tablename__ = "visits"
 
-    id = Column(Integer, primary_key=True, index=True)
-    url_id = Column(Integer, ForeignKey("urls.id"), nullable=False, index=True)
+    id = Column(Integer, primary_key=True)
+    # Covered (foreign key checks included) by idx_url_id_datetime's leading column
+    url_id = Column(Integer, ForeignKey("urls.id"), nullable=False)
+    client_visit_id = Column(String(36), nullable=True)
     title = Column(String, nullable=True)
     description = Column(String, nullable=True)
     datetime_visited = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
@@ -35,6 +38,54 @@ class Visit(Base):
         return self.url_ref.url
 
     __table_args__ = (
-        Index("idx_url_id_datetime", "url_id", "datetime_visited"),
+        # Every per-URL read: history pages newest first, change feeds and
+        # content metrics oldest first (a backward scan). The counters are
+        # included so the metrics queries never touch the heap on PostgreSQL.
+        Index(
+            "idx_url_id_datetime", url_id, datetime_visited.desc(), id.desc(),
+            postgresql_include=["link_count", "word_count", "image_count"]
+        ),
+        UniqueConstraint("client_visit_id", name="uq_visits_client_visit_id"),
     )
 
+
+class UrlSketch(Base):
+    """Per-URL HyperLogLog sketches (see utils.hll), merged on every ingest."""
+    __tablename__ = "url_sketches"
+
+    url_id = Column(Integer, ForeignKey("urls.id", ondelete="CASCADE"), primary_key=True)
+    visit_days = Column(LargeBinary, nullable=True)
+    clients = Column(LargeBinary, nullable=True)
+    # Set for URLs that had visits before sketches existed, until the backfill job has run
+    backfill_pending = Column(Boolean, nullable=False, default=False, server_default=false())
+
+
+class MaintenanceRun(Base):
+    """When each background maintenance job last completed (shared by all workers)."""
+    __tablename__ = "maintenance_runs"
+
+    job = Column(String(64), primary_key=True)
+    finished_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class ImportCheckpoint(Base):
+    """How far each imported history source has been loaded (see importers.chrome_history)."""
+    __tablename__ = "import_checkpoints"
+
+    source = Column(String, primary_key=True)
+    # Highest visit id of the source that has been committed (imported or skipped)
+    last_visit_id = Column(BigInteger, nullable=False)
+    imported_visits = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class VisitRow(NamedTuple):
+    """A validated visit ready for bulk insertion (URL not yet resolved to an id)."""
+    url: str
+    client_visit_id: Optional[str] = None
+    datetime_visited: Optional[datetime] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    link_count: int = 0
+    word_count: int = 0
+    image_count: int = 0
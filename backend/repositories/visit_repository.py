@@ -1,91 +1,415 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy import bindparam, func, or_, select, text, true
+from sqlalchemy.engine import Row
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.exc import SQLAlchemyError
 
-from models.visit import Visit, Url
+from db.sketches import SKETCHES_BY_URL, estimate, merge_url_sketches, visit_day
+from db.urls import dialect_insert, get_or_create_url_ids
+from models.visit import Visit, Url, UrlSketch, VisitRow
+from utils.hll import RELATIVE_ERROR
+
+class PartialBatchError(Exception):
+    """A chunked batch insert failed after some chunks were committed."""
+
+    def __init__(self, inserted: int, duplicates: int, processed: int, total: int):
+        super().__init__(f"Batch insert failed after committing {processed} of {total} visits")
+        self.inserted = inserted
+        self.duplicates = duplicates
+        self.processed = processed
+        self.total = total
+
+
+# Hot-path statements are built once at import. Their cache key is memoized on
+# the object, so every call hits SQLAlchemy's compiled cache without rebuilding
+# or re-walking a Query. Values are supplied as bound parameters.
+
+# create_visit writes the visit and resolves its URL in one statement, and
+# RETURNING yields everything VisitResponse needs, so nothing is read back.
+# These are text() because SQLAlchemy never caches the compiled form of its
+# dialect INSERTs (ON CONFLICT), and compiling the CTE took longer than
+# running it. Parameters and result columns are typed as usual.
+_VISIT_PARAMS = [
+    bindparam(column.key, type_=column.type)
+    for column in (Url.url, Visit.client_visit_id, Visit.title, Visit.description,
+                   Visit.datetime_visited, Visit.link_count, Visit.word_count, Visit.image_count)
+]
+_CREATED_VISIT_COLUMNS = (
+    Visit.id, Visit.url_id, Url.url, Visit.title, Visit.description,
+    Visit.datetime_visited, Visit.link_count, Visit.word_count, Visit.image_count
+)
+_INSERT_VISIT = """
+INSERT INTO visits (url_id, client_visit_id, title, description, datetime_visited,
+                    link_count, word_count, image_count)
+VALUES (({url_id}), :client_visit_id, :title, :description, :datetime_visited,
+        :link_count, :word_count, :image_count)
+ON CONFLICT (client_visit_id) DO NOTHING
+RETURNING id, url_id, CAST(:url AS VARCHAR) AS url, title, description, datetime_visited,
+          link_count, word_count, image_count
+"""
+
+# PostgreSQL upserts the URL in a CTE. The insert only runs when the lookup
+# finds nothing, so known URLs are never rewritten. DO UPDATE rather than DO
+# NOTHING because it returns the id even when a concurrent first visit
+# committed the URL after this statement's snapshot was taken.
+INSERT_VISIT_WITH_URL = text("""
+WITH existing_url AS (
+    SELECT id FROM urls WHERE url = :url
+), inserted_url AS (
+    INSERT INTO urls (url)
+    SELECT CAST(:url AS VARCHAR) WHERE NOT EXISTS (SELECT 1 FROM existing_url)
+    ON CONFLICT (url) DO UPDATE SET url = EXCLUDED.url
+    RETURNING id
+)""" + _INSERT_VISIT.format(
+    url_id="SELECT id FROM existing_url UNION ALL SELECT id FROM inserted_url"
+)).bindparams(*_VISIT_PARAMS).columns(*_CREATED_VISIT_COLUMNS)
+
+# SQLite has no INSERT in a CTE, so the URL goes first; SQLite serializes
+# writers, so nothing can slip in between the two statements
+INSERT_URL_IF_MISSING = text("INSERT INTO urls (url) VALUES (:url) ON CONFLICT (url) DO NOTHING")
+INSERT_VISIT_FOR_URL = text(
+    _INSERT_VISIT.format(url_id="SELECT id FROM urls WHERE url = :url")
+).bindparams(*_VISIT_PARAMS).columns(*_CREATED_VISIT_COLUMNS)
+
+# A retried visit returns the row stored the first time
+CREATED_VISIT_BY_CLIENT_ID = (
+    select(*_CREATED_VISIT_COLUMNS)
+    .join(Visit.url_ref)
+    .where(Visit.client_visit_id == bindparam("client_visit_id"))
+)
+
+# count(*) rather than count(id) lets PostgreSQL answer from idx_url_id_datetime alone
+VISIT_COUNT_BY_URL = (
+    select(func.count())
+    .select_from(Visit)
+    .join(Visit.url_ref)
+    .where(Url.url == bindparam("url"))
+)
+
+# The URL's id as a scalar subquery. Filtering visits on it, rather than on
+# a join to urls, leaves PostgreSQL no row estimate to get wrong: through the
+# join it assumes every URL has the average number of visits and, for a
+# popular one, sorts all of them instead of reading the first page off
+# idx_url_id_datetime.
+URL_ID_BY_VALUE = select(Url.id).where(Url.url == bindparam("url")).scalar_subquery()
+
+# The join to urls only populates Visit.url_ref, replacing the separate URL
+# lookup and the joined eager load. Visits recorded in the same instant are
+# ordered by id, as idx_url_id_datetime stores them, so offset pages neither
+# repeat nor skip a visit.
+VISITS_BY_URL = (
+    select(Visit)
+    .join(Visit.url_ref)
+    .options(contains_eager(Visit.url_ref))
+    .where(Visit.url_id == URL_ID_BY_VALUE)
+    .order_by(Visit.datetime_visited.desc(), Visit.id.desc())
+    .limit(bindparam("limit"))
+    .offset(bindparam("offset"))
+)
+
+# Plain column tuples for the columnar history format (no ORM identity map work)
+VISIT_ROWS_BY_URL = (
+    select(
+        Visit.id, Visit.datetime_visited, Visit.title, Visit.description,
+        Visit.link_count, Visit.word_count, Visit.image_count
+    )
+    .where(Visit.url_id == URL_ID_BY_VALUE)
+    .order_by(Visit.datetime_visited.desc(), Visit.id.desc())
+    .limit(bindparam("limit"))
+    .offset(bindparam("offset"))
+)
+
+# A client's watermark is the newest visit it holds; its datetime_visited is
+# the lower bound of the seek below
+VISIT_WATERMARK = (
+    select(Visit.datetime_visited)
+    .join(Visit.url_ref)
+    .where(Visit.id == bindparam("since_id"), Url.url == bindparam("url"))
+)
+
+# Keyset scan of idx_url_id_datetime from the watermark forward; the id
+# comparison only breaks ties between visits with the same timestamp
+VISITS_AFTER = (
+    select(Visit)
+    .join(Visit.url_ref)
+    .options(contains_eager(Visit.url_ref))
+    .where(
+        Visit.url_id == URL_ID_BY_VALUE,
+        Visit.datetime_visited >= bindparam("since"),
+        or_(Visit.datetime_visited > bindparam("since"), Visit.id > bindparam("since_id"))
+    )
+    .order_by(Visit.datetime_visited, Visit.id)
+    .limit(bindparam("limit"))
+)
+
+# Everything the side panel shows for a page, in one statement. The CTE
+# resolves the URL and counts its visits once; the page filters on the
+# resolved id as a scalar so PostgreSQL reads it straight off
+# idx_url_id_datetime instead of sorting every visit of the URL. The page is
+# outer-joined, so a URL without visits still returns its single row.
+# Columns after the sketch fields match VISIT_ROWS_BY_URL.
+SUMMARY_URL = (
+    select(
+        Url.id,
+        select(func.count()).select_from(Visit).where(Visit.url_id == Url.id)
+        .scalar_subquery().label("total")
+    )
+    .where(Url.url == bindparam("url"))
+    .cte("summary_url")
+)
+
+SUMMARY_PAGE = (
+    select(
+        Visit.id, Visit.datetime_visited, Visit.title, Visit.description,
+        Visit.link_count, Visit.word_count, Visit.image_count
+    )
+    .where(Visit.url_id == select(SUMMARY_URL.c.id).scalar_subquery())
+    .order_by(Visit.datetime_visited.desc(), Visit.id.desc())
+    .limit(bindparam("limit"))
+    .subquery("summary_page")
+)
+
+SUMMARY_BY_URL = (
+    select(
+        SUMMARY_URL.c.total, UrlSketch.visit_days, UrlSketch.clients, UrlSketch.backfill_pending,
+        *SUMMARY_PAGE.c
+    )
+    .select_from(SUMMARY_URL)
+    .outerjoin(UrlSketch, UrlSketch.url_id == SUMMARY_URL.c.id)
+    .outerjoin(SUMMARY_PAGE, true())
+    .order_by(SUMMARY_PAGE.c.datetime_visited.desc(), SUMMARY_PAGE.c.id.desc())
+)
+
+# A URL's content version: any visit recorded or pruned moves the count or an
+# end of the date range. All three come from idx_url_id_datetime alone.
+CONTENT_VERSION = (
+    select(func.count(), func.min(Visit.datetime_visited), func.max(Visit.datetime_visited))
+    .where(Visit.url_id == URL_ID_BY_VALUE)
+)
+
+# The content columns oldest first as one row of three arrays: psycopg2 parses
+# an array far faster than it builds a tuple per visit
+CONTENT_ARRAYS = select(*(
+    func.array_agg(aggregate_order_by(column, Visit.datetime_visited, Visit.id))
+    for column in (Visit.word_count, Visit.link_count, Visit.image_count)
+)).where(Visit.url_id == URL_ID_BY_VALUE)
+
+CONTENT_ROWS = (
+    select(Visit.word_count, Visit.link_count, Visit.image_count)
+    .where(Visit.url_id == URL_ID_BY_VALUE)
+    .order_by(Visit.datetime_visited, Visit.id)
+)
+
+
+def _metrics(total_visits: int, sketch) -> dict:
+    metrics = {
+        "total_visits": total_visits,
+        "distinct_days": 0,
+        "distinct_clients": 0,
+        "distinct_error": RELATIVE_ERROR
+    }
+    if not total_visits:
+        return metrics
+    # backfill_pending is only NULL when an outer join found no sketch row
+    if sketch is None or sketch.backfill_pending is None:
+        metrics["distinct_days"] = metrics["distinct_clients"] = None
+        return metrics
+    metrics["distinct_days"] = None if sketch.backfill_pending else estimate(sketch.visit_days)
+    metrics["distinct_clients"] = estimate(sketch.clients)
+    return metrics
 
 
 class VisitRepository:
     def __init__(self, db: Session):
         self.db = db
 
-    def _get_or_create_url(self, url: str) -> Url:
-        url_obj = self.db.query(Url).filter(Url.url == url).first()
-        if not url_obj:
-            url_obj = Url(url=url)
-            self.db.add(url_obj)
-            self.db.flush()
-        return url_obj
-
     def create_visit(self, url: str, title: Optional[str], description: Optional[str], 
-                     link_count: int, word_count: int, image_count: int) -> Visit:
-        url_obj = self._get_or_create_url(url)
-        
-        visit = Visit(
-            url_id=url_obj.id,
-            title=title,
-            description=description,
-            link_count=link_count,
-            word_count=word_count,
-            image_count=image_count
-        )
-        self.db.add(visit)
+                     link_count: int, word_count: int, image_count: int,
+                     client_visit_id: Optional[str] = None,
+                     datetime_visited: Optional[datetime] = None,
+                     client_key: Optional[str] = None) -> tuple[Row, bool]:
+        """Record a visit, creating its URL if needed.
+
+        Returns ``(visit, created)``; the row has VisitResponse's fields plus
+        ``url_id``. A visit whose client_visit_id is already stored is not
+        inserted again: the stored one is returned with ``created`` False.
+        """
+        params = {
+            "url": url,
+            "client_visit_id": client_visit_id,
+            "title": title,
+            "description": description,
+            "datetime_visited": datetime_visited or datetime.now(timezone.utc),
+            "link_count": link_count,
+            "word_count": word_count,
+            "image_count": image_count
+        }
+        if self.db.get_bind().dialect.name == "postgresql":
+            visit = self.db.execute(INSERT_VISIT_WITH_URL, params).first()
+        else:
+            self.db.execute(INSERT_URL_IF_MISSING, {"url": url})
+            visit = self.db.execute(INSERT_VISIT_FOR_URL, params).first()
+
+        if visit is None:
+            visit = self.db.execute(CREATED_VISIT_BY_CLIENT_ID, {"client_visit_id": client_visit_id}).one()
+            self.db.rollback()
+            return visit, False
+
+        merge_url_sketches(self.db, {
+            visit.url_id: ({visit_day(params["datetime_visited"])}, {client_key} if client_key else set())
+        })
         self.db.commit()
-        self.db.refresh(visit)
-        return visit
+        return visit, True
 
     def get_visits_by_url(self, url: str, page: int = 1, page_size: int = 10) -> tuple[List[Visit], int]:
-        url_obj = self.db.query(Url).filter(Url.url == url).first()
-        if not url_obj:
+        total = self.db.execute(VISIT_COUNT_BY_URL, {"url": url}).scalar()
+        if not total:
             return [], 0
         
-        query = self.db.query(Visit).filter(Visit.url_id == url_obj.id)
-        total = query.count()
+        offset = (page - 1) * page_size
+        visits = self.db.execute(
+            VISITS_BY_URL, {"url": url, "limit": page_size, "offset": offset}
+        ).scalars().all()
+        
+        return visits, total
+
+    def get_visit_rows_by_url(self, url: str, page: int = 1, page_size: int = 10) -> tuple[list[tuple], int]:
+        """Like get_visits_by_url, but rows are (id, datetime_visited, title,
+        description, link_count, word_count, image_count) tuples."""
+        total = self.db.execute(VISIT_COUNT_BY_URL, {"url": url}).scalar()
+        if not total:
+            return [], 0
         
         offset = (page - 1) * page_size
-        visits = query.order_by(desc(Visit.datetime_visited)).offset(offset).limit(page_size).all()
+        rows = self.db.execute(
+            VISIT_ROWS_BY_URL, {"url": url, "limit": page_size, "offset": offset}
+        ).tuples().all()
         
+        return rows, total
+
+    def get_visits_after(self, url: str, since_id: int, limit: int) -> Optional[tuple[List[Visit], int]]:
+        """Visits of ``url`` ordered after visit ``since_id``, oldest first, and the URL's total.
+
+        Returns None when ``since_id`` is not a visit of ``url`` (pruned, or
+        never existed), in which case the caller has to reload from scratch.
+        """
+        since = self.db.execute(VISIT_WATERMARK, {"since_id": since_id, "url": url}).scalar()
+        if since is None:
+            return None
+        visits = self.db.execute(
+            VISITS_AFTER, {"url": url, "since": since, "since_id": since_id, "limit": limit}
+        ).scalars().all()
+        total = self.db.execute(VISIT_COUNT_BY_URL, {"url": url}).scalar()
         return visits, total
 
     def get_latest_visit_by_url(self, url: str) -> Optional[Visit]:
-        url_obj = self.db.query(Url).filter(Url.url == url).first()
-        if not url_obj:
-            return None
-        
-        return self.db.query(Visit).filter(Visit.url_id == url_obj.id).order_by(desc(Visit.datetime_visited)).first()
+        return self.db.execute(
+            VISITS_BY_URL, {"url": url, "limit": 1, "offset": 0}
+        ).scalars().first()
 
     def get_metrics_by_url(self, url: str) -> dict:
-        url_obj = self.db.query(Url).filter(Url.url == url).first()
-        if not url_obj:
-            return {"total_visits": 0}
-        
-        stats = self.db.query(
-            func.count(Visit.id).label("total_visits")
-        ).filter(Visit.url_id == url_obj.id).first()
+        total_visits = self.db.execute(VISIT_COUNT_BY_URL, {"url": url}).scalar()
+        if not total_visits:
+            return _metrics(0, None)
+        # Approximate distinct counts come from the URL's HyperLogLog sketches,
+        # so this costs the same however many visits the URL has
+        return _metrics(total_visits, self.db.execute(SKETCHES_BY_URL, {"url": url}).first())
 
-        return {
-            "total_visits": stats.total_visits or 0
-        }
+    def get_summary_by_url(self, url: str, limit: int = 10) -> tuple[list[tuple], dict]:
+        """The newest ``limit`` visits of ``url`` as (id, datetime_visited, title,
+        description, link_count, word_count, image_count) tuples, and the
+        URL's metrics (as get_metrics_by_url), read with a single statement."""
+        rows = self.db.execute(SUMMARY_BY_URL, {"url": url, "limit": limit}).all()
+        if not rows:
+            return [], _metrics(0, None)
+        visits = [tuple(row[4:]) for row in rows if row.id is not None]
+        return visits, _metrics(rows[0].total, rows[0])
+
+    def get_content_version(self, url: str) -> tuple:
+        """(visit count, first visited, last visited) for ``url``; changes whenever its visits do."""
+        return tuple(self.db.execute(CONTENT_VERSION, {"url": url}).one())
+
+    def get_content_columns(self, url: str) -> tuple[list[int], list[int], list[int]]:
+        """Word, link and image counts of every visit of ``url``, oldest first, one list per column."""
+        if self.db.get_bind().dialect.name == "postgresql":
+            return tuple(column or [] for column in self.db.execute(CONTENT_ARRAYS, {"url": url}).one())
+        rows = self.db.execute(CONTENT_ROWS, {"url": url}).all()
+        return tuple(map(list, zip(*rows))) if rows else ([], [], [])
 
-    def bulk_create_visits(self, visits_data: List[dict]) -> int:
-        url_map = {}
-        for data in visits_data:
-            url = data['url']
-            if url not in url_map:
-                url_map[url] = self._get_or_create_url(url)
+    def bulk_insert_visits(self, rows: Sequence[VisitRow], chunk_size: Optional[int] = None,
+                           client_key: Optional[str] = None) -> tuple[int, int]:
+        """Insert visits, skipping any whose client_visit_id is already stored.
+
+        Rows are committed in transactions of at most ``chunk_size`` visits
+        (all at once by default), so lock time and the parameter lists held
+        in memory stay bounded. Returns ``(inserted, duplicates)``. Visits
+        without a client id are always inserted. If a later chunk fails,
+        PartialBatchError reports what the earlier chunks committed.
+
+        Each chunk also merges its visit days, and ``client_key`` (the
+        sender, when known), into the URLs' sketches. Sketches ignore
+        repeats, so duplicates and retries do not inflate them.
+        """
+        if not rows:
+            return 0, 0
         
-        visits = [
-            Visit(
-                url_id=url_map[data['url']].id,
-                title=data.get('title'),
-                description=data.get('description'),
-                link_count=data.get('link_count', 0),
-                word_count=data.get('word_count', 0),
-                image_count=data.get('image_count', 0)
-            )
-            for data in visits_data
+        chunk_size = chunk_size or len(rows)
+        inserted = 0
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            try:
+                inserted += self._insert_chunk(chunk, client_key)
+                self.db.commit()
+            except SQLAlchemyError as e:
+                self.db.rollback()
+                if start == 0:
+                    raise
+                raise PartialBatchError(inserted, start - inserted, start, len(rows)) from e
+        return inserted, len(rows) - inserted
+
+    def _insert_chunk(self, rows: Sequence[VisitRow], client_key: Optional[str] = None) -> int:
+        url_ids = get_or_create_url_ids(self.db, {row.url for row in rows})
+        now = datetime.now(timezone.utc)
+        clients = {client_key} if client_key else set()
+        additions = {}
+        for row in rows:
+            days, _ = additions.setdefault(url_ids[row.url], (set(), clients))
+            days.add(visit_day(row.datetime_visited or now))
+        merge_url_sketches(self.db, additions)
+        params = [
+            {
+                "url_id": url_ids[row.url],
+                "client_visit_id": row.client_visit_id,
+                "title": row.title,
+                "description": row.description,
+                "datetime_visited": row.datetime_visited or now,
+                "link_count": row.link_count,
+                "word_count": row.word_count,
+                "image_count": row.image_count
+            }
+            for row in rows
         ]
-        self.db.bulk_save_objects(visits)
-        self.db.commit()
-        return len(visits)
+        stmt = (
+            dialect_insert(self.db)(Visit)
+            .on_conflict_do_nothing(index_elements=[Visit.client_visit_id])
+            .returning(Visit.id)
+        )
+        return len(self.db.execute(stmt, params).all())
 
+    def bulk_create_visits(self, visits_data: List[dict], chunk_size: Optional[int] = None,
+                           client_key: Optional[str] = None) -> tuple[int, int]:
+        return self.bulk_insert_visits([
+            VisitRow(
+                data['url'],
+                data.get('client_visit_id'),
+                data.get('datetime_visited'),
+                data.get('title'),
+                data.get('description'),
+                data.get('link_count', 0),
+                data.get('word_count', 0),
+                data.get('image_count', 0)
+            )
+            for data in visits_data
+        ], chunk_size, client_key)
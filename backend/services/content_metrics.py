@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Sequence
+
+import numpy as np
+
+from utils.metrics import content_metrics_cache_total
+
+CONTENT_COLUMNS = ("word_count", "link_count", "image_count")
+PERCENTILES = (25, 50, 75, 90, 99)
+
+
+def content_statistics(columns: Sequence[Sequence[int]]) -> dict:
+    """Summarize each content column of a URL's visits (oldest first).
+
+    All columns are stacked into one array and reduced along the visit axis,
+    so the cost is a handful of NumPy passes however many visits there are.
+    ``change`` compares the latest visit with the first; ``change_pct`` is
+    None when the first value was 0.
+    """
+    values = np.array(columns, dtype=np.int64).reshape(len(CONTENT_COLUMNS), -1)
+    if values.shape[1] == 0:
+        return {name: None for name in CONTENT_COLUMNS}
+
+    percentiles = np.percentile(values, PERCENTILES, axis=1)
+    first, latest = values[:, 0], values[:, -1]
+    change = latest - first
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change_pct = np.where(first != 0, change * 100.0 / first, np.nan)
+    stats = {
+        "min": values.min(axis=1).tolist(),
+        "max": values.max(axis=1).tolist(),
+        "mean": values.mean(axis=1).tolist(),
+        **{f"p{p}": percentiles[i].tolist() for i, p in enumerate(PERCENTILES)},
+        "first": first.tolist(),
+        "latest": latest.tolist(),
+        "change": change.tolist(),
+        "change_pct": [None if np.isnan(pct) else pct for pct in change_pct.tolist()],
+    }
+    return {name: {key: column[i] for key, column in stats.items()} for i, name in enumerate(CONTENT_COLUMNS)}
+
+
+class ContentMetricsCache:
+    """LRU of computed content metrics per URL, each tagged with the version
+    of the URL's visits it was computed from.
+
+    An entry is only returned while the version still matches, so a write
+    never needs to invalidate anything; the next read simply recomputes.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[Hashable, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url: str, version: Hashable) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None or entry[0] != version:
+                content_metrics_cache_total.inc(result="miss")
+                return None
+            self._entries.move_to_end(url)
+        content_metrics_cache_total.inc(result="hit")
+        return entry[1]
+
+    def put(self, url: str, version: Hashable, metrics: dict) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[url] = (version, metrics)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+content_metrics_cache = ContentMetricsCache()
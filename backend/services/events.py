@@ -0,0 +1,281 @@
+import asyncio
+import json
+import select
+import threading
+import time
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from utils.logger import logger
+from utils.metrics import sse_events_dropped_total, sse_subscribers
+
+NOTIFY_CHANNEL = "visit_events"
+# Drivers PgNotifyListener knows how to receive notifications with
+LISTEN_DRIVERS = ("psycopg2", "psycopg")
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_PAYLOAD = 7500
+# How long a URL's metrics are shared between its streams when no burst
+# arrives in between (writes on other workers are not seen without NOTIFY)
+METRICS_SHARE_SECONDS = 1.0
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class Subscription:
+    """One stream's bounded event queue for a single URL.
+
+    A consumer that falls ``maxsize`` events behind has its backlog replaced
+    by a single ``resync`` event, so a slow client costs bounded memory and
+    learns to re-fetch instead of silently missing updates.
+    """
+
+    def __init__(self, url: str, maxsize: int):
+        self.url = url
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    def put(self, event: Optional[dict]) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            sse_events_dropped_total.inc(self.queue.qsize())
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync", "url": self.url} if event is not None else None)
+
+
+class Broadcaster:
+    """Fans visit events out to the SSE streams open on this worker.
+
+    ``publish`` may be called from any thread (sync routes run in the
+    thread pool); delivery happens on the event loop bound at startup. With
+    a ``notifier`` set, events are sent through it instead (PostgreSQL
+    NOTIFY) and come back to every worker, this one included, via
+    ``deliver_threadsafe``.
+
+    Streams of one URL wake together after a burst, and ``load_metrics``
+    lets them share a single metrics read instead of one each.
+    """
+
+    def __init__(self, queue_size: int = 100, max_subscribers: int = 1000):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.notifier: Optional[Callable[[list[dict]], None]] = None
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._count = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Per URL: bursts delivered so far, and the metrics read for the latest one
+        self._bursts: dict[str, int] = {}
+        self._metrics: dict[str, tuple[int, float, asyncio.Future]] = {}
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def subscribe(self, url: str) -> Subscription:
+        if self._count >= self.max_subscribers:
+            raise TooManySubscribers()
+        subscription = Subscription(url, self.queue_size)
+        self._subscribers.setdefault(url, set()).add(subscription)
+        self._count += 1
+        sse_subscribers.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.url)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.url]
+            self._bursts.pop(subscription.url, None)
+            self._metrics.pop(subscription.url, None)
+        self._count -= 1
+        sse_subscribers.dec()
+
+    def publish(self, events: list[dict]) -> None:
+        if not events:
+            return
+        if self.notifier is not None:
+            try:
+                self.notifier(events)
+                return
+            except Exception as e:
+                # Other workers miss these events, but streams here still get them
+                logger.warning("Visit event NOTIFY failed", extra={"error": str(e)})
+        self.deliver_threadsafe(events)
+
+    def deliver_threadsafe(self, events: list[dict]) -> None:
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.deliver, events)
+
+    def deliver(self, events: list[dict]) -> None:
+        for url in {event["url"] for event in events} & self._subscribers.keys():
+            self._bursts[url] = self._bursts.get(url, 0) + 1
+        for event in events:
+            for subscription in self._subscribers.get(event["url"], ()):
+                subscription.put(event)
+
+    async def load_metrics(self, url: str, load: Callable[[], Awaitable[dict]]) -> dict:
+        """``url``'s metrics, read with ``load`` at most once per delivered burst.
+
+        The first stream to ask starts the read and the others await the same
+        result. It is reused until the next burst for ``url``, or for
+        ``METRICS_SHARE_SECONDS``; a failed read is not reused.
+        """
+        burst = self._bursts.get(url, 0)
+        now = time.monotonic()
+        entry = self._metrics.get(url)
+        if entry is None or entry[0] != burst or (entry[2].done() and now - entry[1] > METRICS_SHARE_SECONDS):
+            future = asyncio.ensure_future(load())
+            future.add_done_callback(lambda done: self._forget_failed(url, done))
+            entry = self._metrics[url] = (burst, now, future)
+        # A stream closing mid-read must not cancel the read for the others
+        return await asyncio.shield(entry[2])
+
+    def _forget_failed(self, url: str, future: asyncio.Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            entry = self._metrics.get(url)
+            if entry is not None and entry[2] is future:
+                del self._metrics[url]
+
+    def close(self) -> None:
+        """End every open stream (on shutdown)."""
+        for subscribers in list(self._subscribers.values()):
+            for subscription in list(subscribers):
+                subscription.put(None)
+
+
+def format_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+
+
+async def event_stream(broadcaster: Broadcaster, subscription: Subscription,
+                       load_metrics: Callable[[], Awaitable[dict]], heartbeat: float,
+                       max_seconds: float) -> AsyncIterator[str]:
+    """Yield SSE frames for one subscription until it is closed or expires.
+
+    Current metrics are sent on connect (so a reconnecting client catches
+    up), and events that arrive together are sent as one burst followed by a
+    single ``metrics`` frame, read once for all of the URL's streams. Idle streams get a comment line every ``heartbeat``
+    seconds so proxies keep them open. After ``max_seconds`` the stream ends
+    and EventSource reconnects, which spreads long-lived clients over workers.
+    """
+    deadline = time.monotonic() + max_seconds
+    try:
+        yield "retry: 5000\n\n"
+        yield format_event("metrics", await broadcaster.load_metrics(subscription.url, load_metrics))
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+
+            events = [event]
+            while not subscription.queue.empty():
+                events.append(subscription.queue.get_nowait())
+            for event in events:
+                if event is None:
+                    return
+                yield format_event(event["type"], event)
+            yield format_event("metrics", await broadcaster.load_metrics(subscription.url, load_metrics))
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+def notify_events(engine: Engine, events: list[dict]) -> None:
+    """Send events to every worker with NOTIFY, packing as many per payload as fit."""
+    payloads, batch, size = [], [], 2
+    for event in events:
+        encoded = json.dumps(event, separators=(',', ':'), default=str)
+        if len(encoded) > MAX_NOTIFY_PAYLOAD and "visit" in event:
+            # Listeners re-fetch history when a visit is missing from the event
+            encoded = json.dumps({**event, "visit": None}, separators=(',', ':'), default=str)
+        if batch and size + len(encoded) + 1 > MAX_NOTIFY_PAYLOAD:
+            payloads.append("[" + ",".join(batch) + "]")
+            batch, size = [], 2
+        batch.append(encoded)
+        size += len(encoded) + 1
+    payloads.append("[" + ",".join(batch) + "]")
+
+    with engine.begin() as conn:
+        for payload in payloads:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": NOTIFY_CHANNEL, "payload": payload})
+
+
+class PgNotifyListener:
+    """LISTENs on a dedicated psycopg2 or psycopg 3 connection in a background thread.
+
+    Each notification is handed to ``on_events`` (from the listener thread).
+    The connection is detached from the pool so it never counts against
+    ``DB_POOL_SIZE``, and is re-opened with backoff if it drops.
+    """
+
+    def __init__(self, engine: Engine, on_events: Callable[[list[dict]], None],
+                 channel: str = NOTIFY_CHANNEL, poll_seconds: float = 1.0):
+        if engine.dialect.driver not in LISTEN_DRIVERS:
+            raise ValueError(
+                f"SSE_PG_NOTIFY needs the psycopg2 or psycopg driver, not {engine.dialect.driver!r}"
+            )
+        self.engine = engine
+        self.on_events = on_events
+        self.channel = channel
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="visit-events-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_seconds * 5)
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                self._listen()
+                backoff = 1.0
+            except Exception as e:
+                logger.warning("Visit event listener disconnected", extra={"error": str(e)})
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def _listen(self) -> None:
+        raw = self.engine.raw_connection()
+        conn = raw.driver_connection
+        raw.detach()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.channel}")
+            logger.info("Listening for visit events", extra={"channel": self.channel})
+            receive = self._receive_psycopg if self.engine.dialect.driver == "psycopg" else self._receive_psycopg2
+            while not self._stop.is_set():
+                for notification in receive(conn):
+                    self.on_events(json.loads(notification.payload))
+        finally:
+            raw.close()
+
+    def _receive_psycopg(self, conn) -> Iterator:
+        # psycopg 3 waits for notifications itself and stops after the timeout
+        return conn.notifies(timeout=self.poll_seconds)
+
+    def _receive_psycopg2(self, conn) -> Iterator:
+        if select.select([conn], [], [], self.poll_seconds) == ([], [], []):
+            return
+        conn.poll()
+        while conn.notifies:
+            yield conn.notifies.pop(0)
+
+
+broadcaster = Broadcaster()
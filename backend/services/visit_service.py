@@ -1,6 +1,9 @@
+from datetime import datetime
 from typing import List, Optional
+from sqlalchemy.engine import Row
 from repositories.visit_repository import VisitRepository
-from models.visit import Visit
+from models.visit import Visit, VisitRow
+from services.content_metrics import content_metrics_cache, content_statistics
 
 
 class VisitService:
@@ -8,15 +11,50 @@ class VisitService:
         self.repository = repository
 
     def record_visit(self, url: str, title: Optional[str], description: Optional[str],
-                     link_count: int, word_count: int, image_count: int) -> Visit:
-        return self.repository.create_visit(url, title, description, link_count, word_count, image_count)
+                     link_count: int, word_count: int, image_count: int,
+                     client_visit_id: Optional[str] = None,
+                     datetime_visited: Optional[datetime] = None,
+                     client_key: Optional[str] = None) -> tuple[Row, bool]:
+        return self.repository.create_visit(
+            url, title, description, link_count, word_count, image_count,
+            client_visit_id, datetime_visited, client_key
+        )
 
     def get_history(self, url: str, page: int = 1, page_size: int = 10) -> tuple[List[Visit], int]:
         return self.repository.get_visits_by_url(url, page, page_size)
 
+    def get_history_rows(self, url: str, page: int = 1, page_size: int = 10) -> tuple[list[tuple], int]:
+        return self.repository.get_visit_rows_by_url(url, page, page_size)
+
+    def get_history_changes(self, url: str, since_id: int,
+                            limit: int = 100) -> Optional[tuple[List[Visit], int]]:
+        return self.repository.get_visits_after(url, since_id, limit)
+
     def get_page_metrics(self, url: str) -> dict:
         return self.repository.get_metrics_by_url(url)
 
-    def batch_record_visits(self, visits_data: List[dict]) -> int:
+    def get_content_metrics(self, url: str) -> dict:
+        """Content statistics over every visit of ``url``, recomputed only when its visits changed."""
+        version = self.repository.get_content_version(url)
+        metrics = content_metrics_cache.get(url, version)
+        if metrics is None:
+            total_visits, first_visit, last_visit = version
+            columns = self.repository.get_content_columns(url) if total_visits else ([], [], [])
+            metrics = {
+                "total_visits": len(columns[0]),
+                "first_visit": first_visit,
+                "last_visit": last_visit,
+                **content_statistics(columns)
+            }
+            content_metrics_cache.put(url, version, metrics)
+        return metrics
+
+    def get_page_summary(self, url: str, page_size: int = 10) -> tuple[list[tuple], dict]:
+        return self.repository.get_summary_by_url(url, page_size)
+
+    def batch_record_visits(self, visits_data: List[dict]) -> tuple[int, int]:
         return self.repository.bulk_create_visits(visits_data)
 
+    def batch_record_rows(self, rows: List[VisitRow], chunk_size: Optional[int] = None,
+                          client_key: Optional[str] = None) -> tuple[int, int]:
+        return self.repository.bulk_insert_visits(rows, chunk_size, client_key)
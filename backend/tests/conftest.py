@@ -1,16 +1,25 @@
+import asyncio
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from api.routes.visits import limiter
 from core.app import create_app
-from db.session import get_db
+from db.instrumentation import instrument_engine
+from db.session import configure_engine, dispose_engine, get_db, get_read_db
 from models.visit import Base
+from services.content_metrics import content_metrics_cache
 
 TEST_DATABASE_URL = "sqlite:///:memory:"
 
 
+def run(coro):
+    return asyncio.run(coro)
+
+
 @pytest.fixture(scope="function")
 def db_engine():
     engine = create_engine(
@@ -18,6 +27,7 @@ def db_engine():
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
+    instrument_engine(engine)
     Base.metadata.create_all(bind=engine)
     yield engine
     Base.metadata.drop_all(bind=engine)
@@ -28,6 +38,8 @@ def db_engine():
 def db_session(db_engine):
     TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
     session = TestingSessionLocal()
+    # Cached content metrics are keyed by URL, which tests reuse across databases
+    content_metrics_cache.clear()
     try:
         yield session
     finally:
@@ -36,19 +48,30 @@ def db_session(db_engine):
 
 @pytest.fixture(scope="function")
 def client(db_session):
+    # The app's own engine backs the lifespan warm-up and /health; it is disposed on shutdown
+    configure_engine(create_engine(
+        TEST_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    ))
+    
     def override_get_db():
         try:
             yield db_session
         finally:
             pass
     
+    # Route limits are counted per process; start every test with fresh windows
+    limiter.reset()
     app = create_app()
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     
     with TestClient(app) as test_client:
         yield test_client
     
     app.dependency_overrides.clear()
+    dispose_engine()
 
 
 @pytest.fixture
@@ -1,6 +1,11 @@
+import asyncio
 from unittest.mock import patch
 from sqlalchemy.exc import OperationalError
 
+from core.config import get_settings
+from core.health import health_prober
+from db.session import get_engine
+
 
 class TestHealthEndpoints:
     def test_root_endpoint(self, client):
@@ -37,8 +42,11 @@ class TestHealthEndpoints:
         assert "database" in health_data
     
     def test_health_check_database_failure(self, client):
-        with patch('db.session.engine.connect') as mock_connect:
+        with patch.object(get_engine(), 'connect') as mock_connect:
             mock_connect.side_effect = OperationalError("Connection failed", None, None)
+            # Served from the last probe until the next one runs
+            assert client.get("/health").status_code == 200
+            asyncio.run(health_prober.refresh())
             
             response = client.get("/health")
             
@@ -48,4 +56,37 @@ class TestHealthEndpoints:
             assert data["message"] == "Service unhealthy"
             assert data["data"]["status"] == "unhealthy"
             assert data["data"]["database"] == "disconnected"
+            assert "Connection failed" in data["data"]["probe"]["error"]
+    
+    def test_health_check_uses_no_connections(self, client):
+        with patch.object(get_engine(), 'connect') as mock_connect:
+            for _ in range(5):
+                assert client.get("/health").status_code == 200
+                assert client.get("/health/ready").status_code == 200
+        
+        mock_connect.assert_not_called()
+    
+    def test_stale_probe_is_unhealthy(self, client):
+        with patch.object(get_settings(), "health_max_staleness_seconds", 0.0):
+            response = client.get("/health")
+            ready = client.get("/health/ready")
+        
+        assert response.status_code == 503
+        assert response.json()["data"]["database"] == "connected"
+        assert response.json()["data"]["probe"]["stale"] is True
+        assert ready.status_code == 503
+    
+    def test_readiness(self, client):
+        response = client.get("/health/ready")
+        
+        assert response.status_code == 200
+        assert response.json()["data"] == {"status": "healthy", "database": "connected"}
+    
+    def test_liveness_ignores_database(self, client):
+        with patch.object(health_prober, "latest", None):
+            assert client.get("/health/ready").status_code == 503
+            response = client.get("/health/live")
+        
+        assert response.status_code == 200
+        assert response.json()["data"]["status"] == "alive"
 
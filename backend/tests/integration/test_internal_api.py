@@ -0,0 +1,138 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from fastapi import Depends
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from core.exceptions import rate_limit_handler
+from db.instrumentation import QueryProfiler
+from db.session import get_db
+from utils.metrics import (
+    db_queries_per_request,
+    http_requests_in_flight,
+    http_requests_total,
+    rate_limit_rejections_total,
+)
+
+
+class TestPrometheusMetrics:
+    def test_metrics_endpoint_format(self, client):
+        response = client.get("/internal/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE http_requests_total counter" in response.text
+        assert "# TYPE http_request_duration_seconds histogram" in response.text
+        assert "# TYPE http_requests_in_flight gauge" in response.text
+
+    def test_requests_counted_by_route_template(self, client):
+        key = ("GET", "/api/v1/visits/history", "200")
+        before = http_requests_total.collect().get(key, 0)
+
+        client.get("/api/v1/visits/history?url=https://example.com")
+        client.get("/api/v1/visits/history?url=https://example.org")
+
+        assert http_requests_total.collect()[key] == before + 2
+        response = client.get("/internal/metrics")
+        assert (
+            'http_request_duration_seconds_bucket{method="GET",route="/api/v1/visits/history",status="200",le="+Inf"}'
+            in response.text
+        )
+
+    def test_unmatched_routes_share_label(self, client):
+        client.get("/does-not-exist")
+
+        assert ("GET", "<unmatched>", "404") in http_requests_total.collect()
+
+    def test_in_flight_gauge_returns_to_zero(self, client):
+        client.get("/")
+
+        assert http_requests_in_flight.collect()[("GET",)] == 0
+
+    def test_db_queries_recorded_per_request(self, client, sample_visit_data):
+        key = ("POST", "/api/v1/visits")
+        before = db_queries_per_request.collect().get(key, ([0] * 10, 0.0))[1]
+
+        client.post("/api/v1/visits", json=sample_visit_data)
+
+        counts, total = db_queries_per_request.collect()[key]
+        assert total > before
+
+    def test_rate_limit_rejections_counted(self):
+        request = MagicMock()
+        request.scope = {"route": MagicMock(path="/api/v1/visits")}
+        before = rate_limit_rejections_total.collect().get(("/api/v1/visits",), 0)
+
+        exc = MagicMock()
+        exc.limit.limit.get_expiry.return_value = 60
+        response = asyncio.run(rate_limit_handler(request, exc))
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "60"
+        assert rate_limit_rejections_total.collect()[("/api/v1/visits",)] == before + 1
+
+
+class TestQueryProfilingLogs:
+    def test_request_log_includes_db_stats(self, client, db_engine, sample_visit_data):
+        QueryProfiler(slow_query_ms=10000).attach(db_engine)
+
+        with patch("middleware.logging.logger") as mock_logger:
+            client.get(f"/api/v1/visits/history?url={sample_visit_data['url']}")
+
+        extra = mock_logger.info.call_args.kwargs["extra"]
+        assert extra["db_queries"] >= 1
+        assert "db_time_ms" in extra
+        assert extra["db_statements"][0]["count"] >= 1
+
+    def test_repeated_statements_flagged(self, client, db_engine):
+        QueryProfiler(slow_query_ms=10000).attach(db_engine)
+
+        def n_plus_one(db: Session = Depends(get_db)):
+            for i in range(5):
+                db.execute(text("SELECT :i"), {"i": i})
+            return {}
+
+        client.app.add_api_route("/test/n-plus-one", n_plus_one)
+        with patch("middleware.logging.logger") as mock_logger, \
+                patch.object(get_settings(), "repeated_query_threshold", 3):
+            client.get("/test/n-plus-one")
+
+        mock_logger.warning.assert_called_once()
+        extra = mock_logger.warning.call_args.kwargs["extra"]
+        assert extra["path"] == "/test/n-plus-one"
+        assert any(item["count"] >= 5 for item in extra["statements"])
+
+    def test_batch_resolves_urls_without_n_plus_one(self, client, db_engine):
+        QueryProfiler(slow_query_ms=10000).attach(db_engine)
+        batch = [{"url": f"https://example{i}.com"} for i in range(20)]
+
+        with patch("middleware.logging.logger") as mock_logger:
+            client.post("/api/v1/visits/batch", json=batch)
+
+        mock_logger.warning.assert_not_called()
+        # URLs, sketches and visits each take a fixed number of statements, whatever the batch size
+        assert mock_logger.info.call_args.kwargs["extra"]["db_queries"] <= 8
+
+    def test_create_visit_is_not_read_back(self, client, db_engine, sample_visit_data):
+        QueryProfiler(slow_query_ms=10000).attach(db_engine)
+
+        with patch("middleware.logging.logger") as mock_logger:
+            response = client.post("/api/v1/visits", json=sample_visit_data)
+
+        assert response.json()["data"]["url"] == "https://example.com"
+        extra = mock_logger.info.call_args.kwargs["extra"]
+        statements = [item["statement"] for item in extra["db_statements"]]
+        # URL and visit inserts (one CTE on PostgreSQL) plus the sketch merge; no SELECT of the visit
+        assert extra["db_queries"] == 5
+        assert not any(statement.startswith("SELECT visits") for statement in statements)
+
+    def test_summary_is_a_single_statement(self, client, db_engine, sample_visit_data):
+        client.post("/api/v1/visits", json=sample_visit_data)
+        QueryProfiler(slow_query_ms=10000).attach(db_engine)
+
+        with patch("middleware.logging.logger") as mock_logger:
+            client.get("/api/v1/visits/summary", params={"url": sample_visit_data["url"]})
+
+        assert mock_logger.info.call_args.kwargs["extra"]["db_queries"] == 1
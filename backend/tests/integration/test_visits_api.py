@@ -1,3 +1,15 @@
+import gzip
+import json
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from core.config import get_settings
+from repositories.visit_repository import VisitRepository
+
+
 class TestCreateVisit:
     def test_create_visit_success(self, client, sample_visit_data):
         response = client.post("/api/v1/visits", json=sample_visit_data)
@@ -46,6 +58,48 @@ class TestCreateVisit:
 
 
 class TestBatchCreateVisits:
+    def test_batch_retry_is_idempotent(self, client, sample_visits_batch):
+        batch = [
+            {**visit, "client_visit_id": f"00000000-0000-4000-8000-00000000000{i}",
+             "datetime_visited": "2025-06-01T12:00:00Z"}
+            for i, visit in enumerate(sample_visits_batch)
+        ]
+        
+        first = client.post("/api/v1/visits/batch", json=batch).json()["data"]
+        retry = client.post("/api/v1/visits/batch", json=batch).json()["data"]
+        
+        assert first == {"created_count": 2, "duplicate_count": 0}
+        assert retry == {"created_count": 0, "duplicate_count": 2}
+        history = client.get("/api/v1/visits/history", params={"url": batch[0]["url"]}).json()["data"]
+        assert history["total"] == 1
+        assert history["items"][0]["datetime_visited"].startswith("2025-06-01T12:00:00")
+    
+    def test_batch_rate_limit_sends_retry_after(self, client, sample_visit_data):
+        for _ in range(10):
+            assert client.post("/api/v1/visits/batch", json=[sample_visit_data]).status_code == 201
+        
+        response = client.post("/api/v1/visits/batch", json=[sample_visit_data])
+        
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "60"
+    
+    def test_batch_clamps_future_visit_time(self, client, sample_visit_data):
+        before = datetime.now(timezone.utc)
+        response = client.post(
+            "/api/v1/visits/batch",
+            json=[
+                {**sample_visit_data, "datetime_visited": "2999-01-01T00:00:00Z"},
+                {**sample_visit_data, "datetime_visited": "2025-01-01T00:00:00Z"},
+            ]
+        )
+        
+        assert response.status_code == 201
+        assert response.json()["data"]["created_count"] == 2
+        items = client.get("/api/v1/visits/history", params={"url": sample_visit_data["url"]}).json()["data"]["items"]
+        stored = sorted(datetime.fromisoformat(item["datetime_visited"]) for item in items)
+        assert stored[0] == datetime(2025, 1, 1, tzinfo=timezone.utc)
+        assert before <= stored[1] <= datetime.now(timezone.utc)
+    
     def test_batch_create_success(self, client, sample_visits_batch):
         response = client.post("/api/v1/visits/batch", json=sample_visits_batch)
         
@@ -60,6 +114,7 @@ class TestBatchCreateVisits:
         assert response.status_code == 201
         data = response.json()
         assert data["data"]["created_count"] == 0
+        assert data["data"]["duplicate_count"] == 0
     
     def test_batch_create_single_item(self, client, sample_visit_data):
         response = client.post("/api/v1/visits/batch", json=[sample_visit_data])
@@ -67,6 +122,58 @@ class TestBatchCreateVisits:
         assert response.status_code == 201
         data = response.json()
         assert data["data"]["created_count"] == 1
+    
+    def test_batch_over_item_limit_rejected(self, client, sample_visit_data):
+        with patch.object(get_settings(), "batch_max_items", 3):
+            response = client.post("/api/v1/visits/batch", json=[sample_visit_data] * 4)
+            at_limit = client.post("/api/v1/visits/batch", json=[sample_visit_data] * 3)
+        
+        assert response.status_code == 413
+        data = response.json()
+        assert data["success"] is False
+        assert data["error_codes"] == ["batch_too_large"]
+        assert data["data"] == {"max_items": 3}
+        assert at_limit.status_code == 201
+    
+    def test_batch_committed_in_chunks(self, client, sample_visit_data):
+        batch = [{**sample_visit_data, "url": f"https://example.com/{i}"} for i in range(5)]
+        
+        with patch.object(get_settings(), "batch_chunk_size", 2), \
+                patch.object(VisitRepository, "_insert_chunk", autospec=True,
+                             side_effect=VisitRepository._insert_chunk) as insert_chunk:
+            response = client.post("/api/v1/visits/batch", json=batch)
+        
+        assert response.status_code == 201
+        assert response.json()["data"]["created_count"] == 5
+        assert [len(call.args[1]) for call in insert_chunk.call_args_list] == [2, 2, 1]
+    
+    def test_batch_failure_reports_partial_progress(self, client, sample_visit_data):
+        batch = [
+            {**sample_visit_data, "url": f"https://example.com/{i}",
+             "client_visit_id": f"00000000-0000-4000-8000-00000000000{i}"}
+            for i in range(5)
+        ]
+        original = VisitRepository._insert_chunk
+        calls = []
+        
+        def fail_second_chunk(repo, rows, client_key=None):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise OperationalError("INSERT", {}, Exception("connection lost"))
+            return original(repo, rows, client_key)
+        
+        with patch.object(get_settings(), "batch_chunk_size", 2), \
+                patch.object(VisitRepository, "_insert_chunk", fail_second_chunk):
+            response = client.post("/api/v1/visits/batch", json=batch)
+        
+        assert response.status_code == 500
+        data = response.json()
+        assert data["error_codes"] == ["batch_partially_committed"]
+        assert data["data"] == {
+            "created_count": 2, "duplicate_count": 0, "processed_count": 2, "total_count": 5
+        }
+        retry = client.post("/api/v1/visits/batch", json=batch).json()["data"]
+        assert retry == {"created_count": 3, "duplicate_count": 2}
 
 
 class TestGetVisitHistory:
@@ -121,6 +228,174 @@ class TestGetVisitHistory:
         assert len(data["data"]["items"]) == 0
 
 
+class TestPageSummary:
+    def test_summary_matches_separate_endpoints(self, client, sample_visit_data):
+        for i in range(3):
+            client.post("/api/v1/visits", json={**sample_visit_data, "title": f"Visit {i}",
+                                                "datetime_visited": f"2025-06-0{i + 1}T12:00:00Z"})
+        params = {"url": sample_visit_data["url"]}
+        
+        response = client.get("/api/v1/visits/summary", params={**params, "page_size": 2})
+        
+        assert response.status_code == 200
+        data = response.json()["data"]
+        history = client.get("/api/v1/visits/history", params={**params, "page_size": 2}).json()["data"]
+        metrics = client.get("/api/v1/visits/metrics", params=params).json()["data"]
+        assert data["history"] == history
+        assert data["metrics"] == metrics
+        assert data["latest_visit"] == history["items"][0]
+        assert data["latest_visit"]["title"] == "Visit 2"
+        assert data["url"] == sample_visit_data["url"]
+    
+    def test_summary_unknown_url(self, client):
+        data = client.get("/api/v1/visits/summary", params={"url": "https://nonexistent.com"}).json()["data"]
+        
+        assert data["latest_visit"] is None
+        assert data["metrics"]["total_visits"] == 0
+        assert data["history"] == {"items": [], "total": 0, "page": 1, "page_size": 10, "has_more": False}
+
+
+class TestContentMetrics:
+    def test_content_metrics(self, client, sample_visit_data):
+        for day, words in ((1, 100), (2, 300), (3, 200)):
+            client.post("/api/v1/visits", json={**sample_visit_data, "word_count": words,
+                                                "datetime_visited": f"2025-06-0{day}T12:00:00Z"})
+        
+        response = client.get("/api/v1/visits/metrics/content", params={"url": sample_visit_data["url"]})
+        
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["url"] == sample_visit_data["url"]
+        assert data["total_visits"] == 3
+        assert data["first_visit"] == "2025-06-01T12:00:00+00:00"
+        assert data["last_visit"] == "2025-06-03T12:00:00+00:00"
+        words = data["word_count"]
+        assert (words["min"], words["max"], words["p50"], words["mean"]) == (100, 300, 200.0, 200.0)
+        assert (words["first"], words["latest"], words["change"], words["change_pct"]) == (100, 200, 100, 100.0)
+        assert data["link_count"]["change"] == 0
+    
+    def test_content_metrics_reflect_new_visits(self, client, sample_visit_data):
+        params = {"url": sample_visit_data["url"]}
+        client.post("/api/v1/visits", json={**sample_visit_data, "word_count": 100})
+        assert client.get("/api/v1/visits/metrics/content", params=params).json()["data"]["word_count"]["max"] == 100
+        
+        client.post("/api/v1/visits", json={**sample_visit_data, "word_count": 500})
+        
+        data = client.get("/api/v1/visits/metrics/content", params=params).json()["data"]
+        assert data["total_visits"] == 2
+        assert data["word_count"]["max"] == 500
+    
+    def test_content_metrics_unknown_url(self, client):
+        response = client.get("/api/v1/visits/metrics/content", params={"url": "https://nonexistent.com"})
+        
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["total_visits"] == 0
+        assert data["first_visit"] is None
+        assert data["word_count"] is None
+
+
+class TestHistoryChanges:
+    def test_returns_visits_after_watermark(self, client, sample_visit_data):
+        ids = [
+            client.post("/api/v1/visits", json={**sample_visit_data, "title": f"Visit {i}"}).json()["data"]["id"]
+            for i in range(4)
+        ]
+        
+        response = client.get(
+            "/api/v1/visits/history/changes",
+            params={"url": sample_visit_data["url"], "since_id": ids[1]}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert [item["id"] for item in data["items"]] == ids[2:]
+        assert data["items"][0]["title"] == "Visit 2"
+        assert data["total"] == 4
+        assert data["since_id"] == ids[3]
+        assert data["has_more"] is False
+        assert data["reset"] is False
+    
+    def test_limit_pages_through_changes(self, client, sample_visit_data):
+        ids = [client.post("/api/v1/visits", json=sample_visit_data).json()["data"]["id"] for _ in range(4)]
+        params = {"url": sample_visit_data["url"], "since_id": ids[0], "limit": 2}
+        
+        first = client.get("/api/v1/visits/history/changes", params=params).json()["data"]
+        rest = client.get(
+            "/api/v1/visits/history/changes", params={**params, "since_id": first["since_id"]}
+        ).json()["data"]
+        
+        assert [item["id"] for item in first["items"]] == ids[1:3]
+        assert first["has_more"] is True
+        assert [item["id"] for item in rest["items"]] == ids[3:]
+        assert rest["has_more"] is False
+    
+    def test_no_changes_keeps_watermark(self, client, sample_visit_data):
+        visit_id = client.post("/api/v1/visits", json=sample_visit_data).json()["data"]["id"]
+        
+        data = client.get(
+            "/api/v1/visits/history/changes",
+            params={"url": sample_visit_data["url"], "since_id": visit_id}
+        ).json()["data"]
+        
+        assert data == {"items": [], "total": 1, "since_id": visit_id, "has_more": False, "reset": False}
+    
+    def test_unknown_watermark_requests_reset(self, client, sample_visit_data):
+        visit_id = client.post("/api/v1/visits", json=sample_visit_data).json()["data"]["id"]
+        
+        data = client.get(
+            "/api/v1/visits/history/changes",
+            params={"url": "https://other.com", "since_id": visit_id}
+        ).json()["data"]
+        
+        assert data["reset"] is True
+        assert data["items"] == []
+    
+    @pytest.mark.parametrize("params", [{"url": "https://example.com"}, {"url": "https://example.com", "since_id": 0}])
+    def test_invalid_watermark(self, client, params):
+        response = client.get("/api/v1/visits/history/changes", params=params)
+        
+        assert response.status_code == 422
+
+
+class TestColumnarHistory:
+    def test_columnar_matches_items(self, client, sample_visit_data):
+        for i in range(3):
+            client.post("/api/v1/visits", json={**sample_visit_data, "title": f"Visit {i}"})
+        params = {"url": sample_visit_data["url"], "page_size": 2}
+        
+        items = client.get("/api/v1/visits/history", params=params).json()["data"]
+        columnar = client.get("/api/v1/visits/history", params={**params, "format": "columnar"}).json()["data"]
+        
+        assert columnar["url"] == sample_visit_data["url"]
+        assert (columnar["total"], columnar["has_more"]) == (3, True)
+        for field, values in columnar["columns"].items():
+            assert values == [item[field] for item in items["items"]]
+    
+    def test_columnar_epoch_millis(self, client, sample_visit_data):
+        client.post("/api/v1/visits", json={**sample_visit_data, "datetime_visited": "2025-06-01T12:00:00Z"})
+        
+        response = client.get("/api/v1/visits/history", params={
+            "url": sample_visit_data["url"], "format": "columnar", "timestamps": "epoch_ms"
+        })
+        
+        assert response.json()["data"]["columns"]["datetime_visited"] == [1748779200000]
+    
+    def test_columnar_empty(self, client):
+        response = client.get("/api/v1/visits/history", params={
+            "url": "https://nonexistent.com", "format": "columnar"
+        })
+        
+        data = response.json()["data"]
+        assert data["total"] == 0
+        assert data["columns"]["id"] == []
+    
+    def test_unknown_format_rejected(self, client):
+        response = client.get("/api/v1/visits/history", params={"url": "https://example.com", "format": "xml"})
+        
+        assert response.status_code == 422
+
+
 class TestGetPageMetrics:
     def test_get_metrics_success(self, client, sample_visit_data):
         client.post("/api/v1/visits", json=sample_visit_data)
@@ -134,6 +409,20 @@ class TestGetPageMetrics:
         assert data["success"] is True
         assert data["data"]["total_visits"] == 3
     
+    def test_get_metrics_distinct_counts(self, client, sample_visit_data):
+        batch = [
+            {**sample_visit_data, "datetime_visited": f"2025-06-0{day}T12:00:00Z"} for day in (1, 1, 2)
+        ]
+        client.post("/api/v1/visits/batch", json=batch)
+        client.post("/api/v1/visits", json=sample_visit_data)
+        
+        data = client.get("/api/v1/visits/metrics", params={"url": sample_visit_data["url"]}).json()["data"]
+        
+        assert data["total_visits"] == 4
+        assert data["distinct_days"] == 3
+        assert data["distinct_clients"] == 1
+        assert data["distinct_error"] == 0.0325
+    
     def test_get_metrics_no_visits(self, client):
         response = client.get("/api/v1/visits/metrics?url=https://nonexistent.com")
         
@@ -147,6 +436,74 @@ class TestGetPageMetrics:
         assert response.status_code == 422
 
 
+class TestVisitStream:
+    def read_stream(self, client, url: str) -> str:
+        settings = get_settings()
+        with patch.object(settings, "sse_heartbeat_seconds", 0.05), \
+                patch.object(settings, "sse_max_stream_seconds", 0.12):
+            with client.stream("GET", "/api/v1/visits/stream", params={"url": url}) as response:
+                assert response.status_code == 200
+                assert response.headers["content-type"].startswith("text/event-stream")
+                assert response.headers["x-accel-buffering"] == "no"
+                assert "content-encoding" not in response.headers
+                return response.read().decode()
+    
+    def test_stream_sends_metrics_and_heartbeats(self, client, sample_visit_data):
+        client.post("/api/v1/visits", json=sample_visit_data)
+        
+        body = self.read_stream(client, sample_visit_data["url"])
+        
+        frames = body.split("\n\n")
+        assert frames[0] == "retry: 5000"
+        assert frames[1].startswith("event: metrics\ndata: ")
+        assert json.loads(frames[1].split("data: ", 1)[1])["total_visits"] == 1
+        assert ": heartbeat" in frames[2:]
+    
+    def test_stream_rejected_when_full(self, client):
+        # SSE_MAX_SUBSCRIBERS is applied to the broadcaster at startup
+        with patch("api.routes.visits.broadcaster.max_subscribers", 0):
+            response = client.get("/api/v1/visits/stream", params={"url": "https://example.com"})
+        
+        assert response.status_code == 503
+        assert response.json()["error_codes"] == ["too_many_streams"]
+    
+    def test_create_publishes_visit(self, client, sample_visit_data):
+        with patch("api.routes.visits.broadcaster.publish") as publish:
+            response = client.post("/api/v1/visits", json=sample_visit_data)
+        
+        [event] = publish.call_args.args[0]
+        assert event["type"] == "visits"
+        assert event["count"] == 1
+        assert event["visit"] == response.json()["data"]
+        assert event["url"] == response.json()["data"]["url"]
+    
+    def test_retried_create_not_published(self, client, sample_visit_data):
+        visit = {**sample_visit_data, "client_visit_id": "00000000-0000-4000-8000-000000000001"}
+        with patch("api.routes.visits.broadcaster.publish") as publish:
+            first = client.post("/api/v1/visits", json=visit)
+            retry = client.post("/api/v1/visits", json=visit)
+        
+        assert retry.status_code == 201
+        assert retry.json()["data"] == first.json()["data"]
+        assert retry.json()["message"] == "Visit already recorded"
+        assert publish.call_count == 1
+    
+    def test_batch_publishes_count_per_url(self, client, sample_visits_batch):
+        batch = [
+            {**visit, "client_visit_id": f"00000000-0000-4000-8000-00000000000{i}"}
+            for i, visit in enumerate(sample_visits_batch + [sample_visits_batch[0]])
+        ]
+        with patch("api.routes.visits.broadcaster.publish") as publish:
+            client.post("/api/v1/visits/batch", json=batch)
+            client.post("/api/v1/visits/batch", json=batch)
+        
+        events = publish.call_args_list[0].args[0]
+        assert sorted((event["url"], event["count"]) for event in events) == [
+            ("https://example.com", 2), ("https://example.org", 1)
+        ]
+        # The retried batch created nothing, so nothing is published
+        assert publish.call_count == 1
+
 class TestSecurityHeaders:
     def test_security_headers_present(self, client):
         response = client.get("/")
@@ -157,3 +514,47 @@ class TestSecurityHeaders:
         assert "referrer-policy" in response.headers
         assert "x-xss-protection" in response.headers
 
+
+
+class TestCompression:
+    def test_gzip_batch_accepted(self, client, sample_visits_batch):
+        body = gzip.compress(json.dumps(sample_visits_batch).encode())
+        response = client.post(
+            "/api/v1/visits/batch",
+            content=body,
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        )
+        
+        assert response.status_code == 201
+        assert response.json()["data"]["created_count"] == 2
+    
+    def test_oversized_batch_rejected(self, client):
+        body = gzip.compress(b"[" + b" " * (11 * 1024 * 1024) + b"]")
+        response = client.post(
+            "/api/v1/visits/batch",
+            content=body,
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        )
+        
+        assert response.status_code == 413
+        assert response.json()["error_codes"] == ["request_too_large"]
+    
+    @pytest.mark.parametrize("accept, expected", [("zstd, gzip", "zstd"), ("gzip", "gzip")])
+    def test_large_history_compressed(self, client, sample_visit_data, accept, expected):
+        batch = [{**sample_visit_data, "description": "Long repeated description " * 20}] * 20
+        client.post("/api/v1/visits/batch", json=batch)
+        
+        response = client.get(
+            "/api/v1/visits/history",
+            params={"url": sample_visit_data["url"], "page_size": 20},
+            headers={"Accept-Encoding": accept}
+        )
+        
+        assert response.headers["content-encoding"] == expected
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert len(response.json()["data"]["items"]) == 20
+    
+    def test_small_response_not_compressed(self, client):
+        response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+        
+        assert "content-encoding" not in response.headers
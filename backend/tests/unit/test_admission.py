@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from middleware.admission import READ, WRITE, AdmissionControlMiddleware, AdmissionLimiter, Overloaded
+from tests.conftest import run
+from utils.metrics import admission_rejections_total
+
+
+class TestAdmissionLimiter:
+    def test_admits_up_to_limit_without_waiting(self):
+        async def scenario():
+            limiter = AdmissionLimiter(limit=2, queue_size=0, timeout=1)
+            await limiter.acquire(READ)
+            await limiter.acquire(WRITE)
+
+            with pytest.raises(Overloaded) as exc:
+                await limiter.acquire(READ)
+            assert exc.value.reason == "queue_full"
+            assert limiter.active == 2
+
+            limiter.release()
+            limiter.release()
+            assert limiter.active == 0
+
+        run(scenario())
+
+    def test_reads_are_admitted_before_writes(self):
+        async def scenario():
+            limiter = AdmissionLimiter(limit=1, queue_size=10, timeout=1)
+            await limiter.acquire(WRITE)
+            order = []
+
+            async def request(name, priority):
+                await limiter.acquire(priority)
+                order.append(name)
+                await asyncio.sleep(0)
+                limiter.release()
+
+            tasks = [
+                asyncio.create_task(request("write", WRITE)),
+                asyncio.create_task(request("read-1", READ)),
+                asyncio.create_task(request("read-2", READ)),
+            ]
+            await asyncio.sleep(0)
+            assert limiter.queued == 3
+
+            limiter.release()
+            await asyncio.gather(*tasks)
+
+            assert order == ["read-1", "read-2", "write"]
+            assert limiter.active == 0
+            assert limiter.queued == 0
+
+        run(scenario())
+
+    def test_wait_times_out(self):
+        async def scenario():
+            limiter = AdmissionLimiter(limit=1, queue_size=10, timeout=0.01)
+            await limiter.acquire(READ)
+
+            with pytest.raises(Overloaded) as exc:
+                await limiter.acquire(READ)
+
+            assert exc.value.reason == "timeout"
+            assert limiter.queued == 0
+            limiter.release()
+            assert limiter.active == 0
+
+        run(scenario())
+
+    def test_cancelled_waiter_leaves_queue(self):
+        async def scenario():
+            limiter = AdmissionLimiter(limit=1, queue_size=10, timeout=1)
+            await limiter.acquire(READ)
+            task = asyncio.create_task(limiter.acquire(READ))
+            await asyncio.sleep(0)
+
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+            assert limiter.queued == 0
+            limiter.release()
+            assert limiter.active == 0
+
+        run(scenario())
+
+    def test_slot_handed_to_cancelled_waiter_is_passed_on(self):
+        async def scenario():
+            limiter = AdmissionLimiter(limit=1, queue_size=10, timeout=1)
+            await limiter.acquire(READ)
+            first = asyncio.create_task(limiter.acquire(READ))
+            second = asyncio.create_task(limiter.acquire(READ))
+            await asyncio.sleep(0)
+
+            # The slot is handed to the first waiter, which is cancelled before it runs
+            limiter.release()
+            first.cancel()
+            await asyncio.gather(first, return_exceptions=True)
+            await asyncio.wait_for(second, 1)
+
+            assert limiter.active == 1
+            limiter.release()
+            assert limiter.active == 0
+
+        run(scenario())
+
+
+class TestAdmissionControlMiddleware:
+    def client(self, limiter: AdmissionLimiter) -> TestClient:
+        app = FastAPI()
+
+        @app.get("/api/items")
+        def items():
+            return {"ok": True}
+
+        @app.get("/api/items/stream")
+        def stream():
+            return {"ok": True}
+
+        @app.get("/health")
+        def health():
+            return {"ok": True}
+
+        app.add_middleware(AdmissionControlMiddleware, paths=["/api/items"],
+                           exclude=["/api/items/stream"], limiter=limiter)
+        return TestClient(app)
+
+    def test_admitted_request_releases_slot(self):
+        limiter = AdmissionLimiter(limit=1, queue_size=0, timeout=1)
+
+        responses = [self.client(limiter).get("/api/items") for _ in range(3)]
+
+        assert [response.status_code for response in responses] == [200, 200, 200]
+        assert limiter.active == 0
+
+    def test_overload_returns_503_with_retry_after(self):
+        limiter = AdmissionLimiter(limit=0, queue_size=0, timeout=1)
+        rejected = admission_rejections_total.collect().get(("read", "queue_full"), 0)
+
+        response = self.client(limiter).get("/api/items")
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert response.json()["error_codes"] == ["overloaded"]
+        assert admission_rejections_total.collect()[("read", "queue_full")] == rejected + 1
+
+    def test_excluded_and_other_paths_bypass_limiter(self):
+        client = self.client(AdmissionLimiter(limit=0, queue_size=0, timeout=1))
+
+        assert client.get("/api/items/stream").status_code == 200
+        assert client.get("/health").status_code == 200
@@ -0,0 +1,111 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, text
+
+from benchmarks.indexes import run_index_benchmarks
+from benchmarks.seed import seed_visits, url_for
+from benchmarks.statements import statement_benchmarks
+from benchmarks.suite import compare_results, run_suite
+from benchmarks.throughput import run_throughput
+from models.visit import Base
+
+
+class TestBenchmarkSuite:
+    def test_run_suite_smoke(self, tmp_path):
+        results = run_suite(
+            f"sqlite:///{tmp_path / 'bench.db'}", scales=[300], runs=2, skew=1.1, seed=1,
+            log=lambda message: None
+        )
+
+        names = {row["benchmark"] for row in results}
+        assert "get_visits_by_url[page=last]" in names
+        assert "bulk_create_visits[n=1000]" in names
+        assert all(row["backend"] == "sqlite" and row["scale"] == 300 for row in results)
+        assert all(row["median_ms"] > 0 for row in results if row["benchmark"] != "seed")
+
+    def test_run_throughput_smoke(self, tmp_path):
+        row = run_throughput(f"sqlite:///{tmp_path / 'throughput.db'}", threads=3, seconds=0.3,
+                             write_ratio=0.5, visits=300)
+
+        assert row["backend"] == "sqlite"
+        assert row["errors"] == 0
+        assert row["reads_per_second"] > 0 and row["writes_per_second"] > 0
+
+    def test_compare_results_flags_regressions(self):
+        baseline = [
+            {"backend": "sqlite", "scale": 10, "benchmark": "a", "median_ms": 1.0},
+            {"backend": "sqlite", "scale": 10, "benchmark": "b", "median_ms": 1.0},
+        ]
+        current = [
+            {"backend": "sqlite", "scale": 10, "benchmark": "a", "median_ms": 1.5},
+            {"backend": "sqlite", "scale": 10, "benchmark": "b", "median_ms": 0.9},
+            {"backend": "sqlite", "scale": 10, "benchmark": "new", "median_ms": 2.0},
+        ]
+
+        rows = compare_results(current, baseline, max_regression=0.2)
+
+        assert [(row["benchmark"], row["regression"]) for row in rows] == [("a", True), ("b", False)]
+
+
+class TestSeedVisits:
+    def test_url_for_is_stable(self):
+        assert url_for(0) == "https://www.site0.example/news/0"
+        assert url_for(1001) == "https://www.site4.example/blog/1001"
+
+    def test_seed_is_deterministic_and_skewed(self, tmp_path):
+        end = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        snapshots = []
+        for name in ("a", "b"):
+            engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+            Base.metadata.create_all(bind=engine)
+            seed_visits(engine, 3000, 50, seed=7, end=end, chunk_size=700)
+            with engine.connect() as conn:
+                snapshots.append(conn.execute(text(
+                    "SELECT url_id, title, datetime_visited, word_count FROM visits ORDER BY id"
+                )).all())
+                hottest = conn.execute(text(
+                    "SELECT urls.url FROM visits JOIN urls ON urls.id = visits.url_id "
+                    "GROUP BY urls.url ORDER BY count(*) DESC LIMIT 1"
+                )).scalar()
+            engine.dispose()
+
+        assert len(snapshots[0]) == 3000
+        assert snapshots[0] == snapshots[1]
+        assert hottest == url_for(0)
+        timestamps = [row[2] for row in snapshots[0]]
+        assert timestamps == sorted(timestamps)
+
+
+class TestStatementBenchmarks:
+    def test_legacy_and_cached_paths_agree(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'statements.db'}")
+        Base.metadata.create_all(bind=engine)
+        seed_visits(engine, 100, 5, seed=3)
+
+        rows = statement_benchmarks(engine, runs=3)
+        engine.dispose()
+
+        assert [row["benchmark"] for row in rows] == [
+            "get_visits_by_url", "get_latest_visit_by_url", "get_metrics_by_url"
+        ]
+        assert all(row["legacy_us"] > 0 and row["cached_us"] > 0 for row in rows)
+
+
+class TestIndexBenchmarks:
+    def test_layouts_are_measured_on_the_same_data(self, tmp_path):
+        database_url = f"sqlite:///{tmp_path / 'indexes.db'}"
+
+        results = run_index_benchmarks(database_url, visits=500, runs=2, append_batches=1,
+                                       layouts=["legacy", "covering"])
+
+        assert set(results) == {"legacy", "covering"}
+        assert all(value > 0 for layout in results.values() for value in layout.values())
+        engine = create_engine(database_url)
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM visits")).scalar() == 500
+            indexes = set(conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+            )).scalars())
+        engine.dispose()
+        assert "ix_visits_url_id" not in indexes
+        assert "idx_url_id_datetime" in indexes
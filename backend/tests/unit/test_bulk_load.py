@@ -0,0 +1,112 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import psycopg
+import psycopg2.extensions
+import pytest
+from sqlalchemy import text
+
+from db.bulk_load import _copy_buffer, copy_text, deferred_indexes, format_copy_value, load_rows
+
+
+def postgresql_connection(driver, cursor_class):
+    conn = MagicMock()
+    conn.dialect.name = "postgresql"
+    conn.dialect.driver = driver
+    conn.connection.cursor.return_value = MagicMock(spec=cursor_class)
+    return conn
+
+
+def index_names(engine):
+    with engine.connect() as conn:
+        return set(conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'visits' AND sql IS NOT NULL"
+        )).scalars())
+
+
+class TestCopyFormatting:
+    def test_format_copy_value(self):
+        assert format_copy_value(None) == "\\N"
+        assert format_copy_value("plain") == "plain"
+        assert format_copy_value("a\tb\nc\\d\r") == "a\\tb\\nc\\\\d\\r"
+        assert format_copy_value(42) == "42"
+        assert format_copy_value(datetime(2025, 1, 1, tzinfo=timezone.utc)) == "2025-01-01T00:00:00+00:00"
+
+    def test_copy_buffer(self):
+        buffer = _copy_buffer([(1, "a", None), (2, "b\tc", 3)])
+        assert buffer.read() == "1\ta\t\\N\n2\tb\\tc\t3\n"
+
+
+class TestLoadRows:
+    def test_load_rows_executemany(self, db_engine):
+        with db_engine.begin() as conn:
+            load_rows(conn, "urls", ("url",), [("https://a.com",), ("https://b.com",)])
+            count = load_rows(conn, "visits", ("url_id", "datetime_visited", "title"), [
+                (1, "2025-01-01 00:00:00.000000", "A"),
+                (2, "2025-01-02 00:00:00.000000", None),
+            ])
+
+        assert count == 2
+        with db_engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM visits")).scalar() == 2
+
+    def test_load_rows_empty(self, db_engine):
+        with db_engine.begin() as conn:
+            assert load_rows(conn, "visits", ("url_id",), []) == 0
+
+
+class TestCopy:
+    def test_psycopg2_uses_copy_expert(self):
+        conn = postgresql_connection("psycopg2", psycopg2.extensions.cursor)
+        cursor = conn.connection.cursor.return_value
+
+        load_rows(conn, "urls", ("url",), [("https://a.com",)])
+
+        statement, buffer = cursor.copy_expert.call_args.args
+        assert statement == "COPY urls (url) FROM STDIN"
+        assert buffer.read() == "https://a.com\n"
+        cursor.close.assert_called_once()
+
+    @pytest.mark.parametrize("load", [
+        lambda conn: load_rows(conn, "visits", ("url_id", "title"), [(1, "a\tb"), (2, None)]),
+        lambda conn: copy_text(conn, "visits", ("url_id", "title"), "1\ta\\tb\n2\t\\N\n"),
+    ])
+    def test_psycopg3_writes_through_copy(self, load):
+        conn = postgresql_connection("psycopg", psycopg.Cursor)
+        cursor = conn.connection.cursor.return_value
+
+        load(conn)
+
+        cursor.copy.assert_called_once_with("COPY visits (url_id, title) FROM STDIN")
+        cursor.copy.return_value.__enter__.return_value.write.assert_called_once_with("1\ta\\tb\n2\t\\N\n")
+        cursor.close.assert_called_once()
+
+
+class TestDeferredIndexes:
+    def test_indexes_dropped_and_restored_on_empty_table(self, db_engine):
+        before = index_names(db_engine)
+
+        with deferred_indexes(db_engine, "visits"):
+            assert index_names(db_engine) == set()
+
+        assert index_names(db_engine) == before
+
+    def test_indexes_restored_after_error(self, db_engine):
+        before = index_names(db_engine)
+
+        try:
+            with deferred_indexes(db_engine, "visits"):
+                raise RuntimeError("load failed")
+        except RuntimeError:
+            pass
+
+        assert index_names(db_engine) == before
+
+    def test_non_empty_table_untouched(self, db_engine):
+        with db_engine.begin() as conn:
+            load_rows(conn, "urls", ("url",), [("https://a.com",)])
+            load_rows(conn, "visits", ("url_id", "datetime_visited"), [(1, "2025-01-01 00:00:00.000000")])
+        before = index_names(db_engine)
+
+        with deferred_indexes(db_engine, "visits"):
+            assert index_names(db_engine) == before
@@ -0,0 +1,230 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import numpy as np
+import psycopg
+import pytest
+from sqlalchemy import create_engine, select, text
+
+from db.bulk_load import format_timestamps
+from importers.chrome_history import (
+    WEBKIT_EPOCH_OFFSET_US,
+    ChromeUrls,
+    _load_visits,
+    import_chrome_history,
+    main,
+    open_snapshot,
+)
+from models.visit import Base, ImportCheckpoint, Url, UrlSketch, Visit
+from repositories.visit_repository import VisitRepository
+
+# A subset of the columns Chrome's History database has
+CHROME_SCHEMA = """
+CREATE TABLE urls(id INTEGER PRIMARY KEY AUTOINCREMENT, url LONGVARCHAR, title LONGVARCHAR,
+                  visit_count INTEGER DEFAULT 0 NOT NULL, typed_count INTEGER DEFAULT 0 NOT NULL,
+                  last_visit_time INTEGER NOT NULL, hidden INTEGER DEFAULT 0 NOT NULL);
+CREATE TABLE visits(id INTEGER PRIMARY KEY AUTOINCREMENT, url INTEGER NOT NULL, visit_time INTEGER NOT NULL,
+                    from_visit INTEGER, transition INTEGER DEFAULT 0 NOT NULL, segment_id INTEGER,
+                    visit_duration INTEGER DEFAULT 0 NOT NULL);
+"""
+
+DAY = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def webkit(dt: datetime) -> int:
+    return int(dt.timestamp() * 1_000_000) + WEBKIT_EPOCH_OFFSET_US
+
+
+def write_history(path, urls, visits):
+    """``urls`` are (id, url, title) and ``visits`` (url id, datetime) rows."""
+    history = sqlite3.connect(path)
+    history.executescript(CHROME_SCHEMA)
+    history.executemany("INSERT INTO urls (id, url, title, last_visit_time) VALUES (?, ?, ?, 0)", urls)
+    add_visits(history, visits)
+    history.close()
+
+
+def add_visits(history, visits):
+    history.executemany("INSERT INTO visits (url, visit_time) VALUES (?, ?)",
+                        [(url_id, webkit(dt)) for url_id, dt in visits])
+    history.commit()
+
+
+@pytest.fixture
+def history_path(tmp_path):
+    path = str(tmp_path / "History")
+    write_history(path, [
+        (1, "https://example.com/page/", "Example <b>Page</b>"),
+        (2, "https://example.com/page#section", None),
+        (3, "chrome://settings", "Settings"),
+        (4, "https://docs.example.com/", "x" * 600),
+    ], [
+        (1, DAY),
+        (2, DAY + timedelta(hours=1)),
+        (3, DAY + timedelta(hours=2)),
+        (4, DAY + timedelta(days=1)),
+        (1, datetime.now(timezone.utc) + timedelta(days=1)),
+        (99, DAY),
+    ])
+    return path
+
+
+def stored_visits(engine):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(Url.url, Visit.title, Visit.datetime_visited, Visit.word_count)
+            .join(Visit.url_ref).order_by(Visit.id)
+        ).all()
+
+
+class TestWebkitTime:
+    def test_offset_is_the_unix_epoch_on_the_webkit_scale(self):
+        webkit_epoch = datetime(1601, 1, 1, tzinfo=timezone.utc)
+        unix_epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+        assert WEBKIT_EPOCH_OFFSET_US == (unix_epoch - webkit_epoch) // timedelta(microseconds=1)
+
+    def test_converted_times_are_stored_as_utc(self):
+        epoch_us = np.array([webkit(DAY)], dtype=np.int64) - WEBKIT_EPOCH_OFFSET_US
+
+        assert format_timestamps(epoch_us, "postgresql") == ["2025-03-01T12:00:00.000000+00:00"]
+        assert format_timestamps(epoch_us, "sqlite") == ["2025-03-01 12:00:00.000000"]
+
+
+class TestImportChromeHistory:
+    def test_imports_visits_normalized_like_visit_create(self, db_engine, history_path):
+        totals = import_chrome_history(db_engine, history_path)
+
+        assert totals["imported"] == 3
+        # chrome://, a visit in the future and one with no URL row
+        assert totals["skipped"] == 3
+        assert totals["last_visit_id"] == 6
+        rows = stored_visits(db_engine)
+        assert [(url, visited.replace(tzinfo=timezone.utc)) for url, _, visited, _ in rows] == [
+            ("https://example.com/page", DAY),
+            ("https://example.com/page", DAY + timedelta(hours=1)),
+            ("https://docs.example.com", DAY + timedelta(days=1)),
+        ]
+        assert rows[0].title == "Example &lt;b&gt;Page&lt;/b&gt;"
+        assert rows[1].title is None
+        assert rows[2].title == "x" * 500
+        assert rows[0].word_count == 0
+
+    def test_rebuilds_url_sketches(self, db_engine, db_session, history_path):
+        totals = import_chrome_history(db_engine, history_path)
+
+        assert totals["sketches"] == 2
+        metrics = VisitRepository(db_session).get_metrics_by_url("https://example.com/page")
+        assert metrics["total_visits"] == 2
+        assert metrics["distinct_days"] == 1
+
+    def test_resumes_from_checkpoint(self, db_engine, history_path):
+        import_chrome_history(db_engine, history_path, source="laptop")
+
+        again = import_chrome_history(db_engine, history_path, source="laptop")
+        assert again["imported"] == again["skipped"] == 0
+        assert len(stored_visits(db_engine)) == 3
+
+        history = sqlite3.connect(history_path)
+        add_visits(history, [(4, DAY + timedelta(days=2))])
+        history.close()
+        later = import_chrome_history(db_engine, history_path, source="laptop")
+
+        assert later == {"source": "laptop", "imported": 1, "skipped": 0, "last_visit_id": 7, "sketches": 1}
+        with db_engine.connect() as conn:
+            checkpoint = conn.execute(select(ImportCheckpoint)).one()
+        assert (checkpoint.source, checkpoint.last_visit_id, checkpoint.imported_visits) == ("laptop", 7, 4)
+
+    def test_interrupted_import_continues_after_last_chunk(self, db_engine, history_path):
+        def interrupt(totals):
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            import_chrome_history(db_engine, history_path, chunk_size=2, progress=interrupt)
+        assert len(stored_visits(db_engine)) == 2
+        with db_engine.connect() as conn:
+            # Left for the backfill job (or the next run) to rebuild
+            assert conn.execute(select(UrlSketch.backfill_pending)).scalars().all() == [True]
+
+        seen = []
+        totals = import_chrome_history(db_engine, history_path, chunk_size=2, progress=lambda t: seen.append(dict(t)))
+
+        assert [t["last_visit_id"] for t in seen] == [4, 6]
+        assert totals["imported"] == 1
+        assert totals["sketches"] == 2
+        assert len(stored_visits(db_engine)) == 3
+
+    def test_reuses_existing_urls(self, db_engine, history_path):
+        with db_engine.begin() as conn:
+            conn.execute(Url.__table__.insert(), {"url": "https://example.com/page"})
+
+        import_chrome_history(db_engine, history_path)
+
+        with db_engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM urls")).scalar() == 2
+
+    def test_deferred_indexes_are_rebuilt(self, db_engine, history_path):
+        import_chrome_history(db_engine, history_path, defer_indexes=True)
+
+        with db_engine.connect() as conn:
+            indexes = set(conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'visits'"
+            )).scalars())
+        assert "idx_url_id_datetime" in indexes
+        assert len(stored_visits(db_engine)) == 3
+
+
+    def test_postgresql_chunks_copied_with_psycopg3(self, history_path):
+        conn = MagicMock()
+        conn.dialect.name = "postgresql"
+        conn.dialect.driver = "psycopg"
+        cursor = conn.connection.cursor.return_value = MagicMock(spec=psycopg.Cursor)
+        with open_snapshot(history_path) as history:
+            chrome_urls = ChromeUrls(history)
+        epoch_us = np.array([webkit(DAY)], dtype=np.int64) - WEBKIT_EPOCH_OFFSET_US
+
+        _load_visits(conn, chrome_urls, np.array([1]), np.array([7]), epoch_us)
+
+        cursor.copy.assert_called_once()
+        cursor.copy.return_value.__enter__.return_value.write.assert_called_once_with(
+            "7\tExample &lt;b&gt;Page&lt;/b&gt;\t\\N\t2025-03-01T12:00:00.000000+00:00\t0\t0\t0\n"
+        )
+
+
+class TestSnapshot:
+    def test_reads_uncheckpointed_wal_without_touching_the_original(self, tmp_path):
+        path = str(tmp_path / "History")
+        writer = sqlite3.connect(path)
+        writer.execute("PRAGMA journal_mode = WAL")
+        writer.execute("PRAGMA wal_autocheckpoint = 0")
+        writer.executescript(CHROME_SCHEMA)
+        writer.execute("INSERT INTO urls (url, title, last_visit_time) VALUES ('https://a.com', 'A', 0)")
+        writer.commit()
+
+        with open_snapshot(path) as history:
+            assert history.execute("SELECT url FROM urls").fetchall() == [("https://a.com",)]
+            with pytest.raises(sqlite3.OperationalError):
+                history.execute("DELETE FROM urls")
+
+        assert writer.execute("SELECT count(*) FROM urls").fetchone() == (1,)
+        writer.close()
+
+
+class TestCli:
+    def test_main_imports_into_database_url(self, tmp_path, history_path, capsys):
+        database = tmp_path / "history.db"
+        engine = create_engine(f"sqlite:///{database}")
+        Base.metadata.create_all(bind=engine)
+        engine.dispose()
+
+        assert main([history_path, "--database-url", f"sqlite:///{database}", "--source", "cli"]) == 0
+
+        assert "Done: 3 visits imported and 2 URL sketches rebuilt" in capsys.readouterr().out
+        engine = create_engine(f"sqlite:///{database}")
+        assert len(stored_visits(engine)) == 3
+        engine.dispose()
+
+    def test_main_requires_database_and_file(self, tmp_path, capsys):
+        assert main([str(tmp_path / "History"), "--database-url", ""]) == 2
+        assert main([str(tmp_path / "History"), "--database-url", "sqlite:////tmp/x.db"]) == 2
+        assert "No such file" in capsys.readouterr().err
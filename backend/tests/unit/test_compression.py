@@ -0,0 +1,137 @@
+import asyncio
+import gzip
+
+import pytest
+import zstandard
+
+from middleware.compression import RequestDecompressionMiddleware, negotiate_encoding
+
+
+def capture_app(store):
+    async def app(scope, receive, send):
+        message = await receive()
+        store.append((scope, message["body"]))
+    return app
+
+
+def run_middleware(middleware, body_chunks, headers):
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(body_chunks) - 1}
+        for i, chunk in enumerate(body_chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "path": "/upload", "method": "POST", "headers": headers}
+    asyncio.run(middleware(scope, receive, send))
+    return sent
+
+
+class TestNegotiateEncoding:
+    @pytest.mark.parametrize("header, expected", [
+        ("gzip, deflate, br, zstd", "zstd"),
+        ("gzip", "gzip"),
+        ("zstd;q=0.5, gzip", "gzip"),
+        ("zstd;q=0, gzip;q=0", None),
+        ("*", "zstd"),
+        ("deflate", None),
+        ("", None),
+        ("gzip;q=bogus, zstd", "zstd"),
+    ])
+    def test_preference(self, header, expected):
+        assert negotiate_encoding(header) == expected
+
+
+class TestRequestDecompressionMiddleware:
+    def test_gzip_body_decoded_across_chunks(self):
+        payload = b'{"visits": "' + b"a" * 5000 + b'"}'
+        compressed = gzip.compress(payload)
+        store = []
+        run_middleware(
+            RequestDecompressionMiddleware(capture_app(store), ["/upload"], 10_000),
+            [compressed[:100], compressed[100:]],
+            [(b"content-encoding", b"gzip"), (b"content-length", str(len(compressed)).encode())],
+        )
+
+        scope, body = store[0]
+        assert body == payload
+        assert (b"content-length", str(len(payload)).encode()) in scope["headers"]
+        assert all(name != b"content-encoding" for name, _ in scope["headers"])
+
+    def test_gzip_bomb_rejected_without_full_inflation(self):
+        bomb = gzip.compress(b"\0" * 50_000_000)
+        store = []
+        sent = run_middleware(
+            RequestDecompressionMiddleware(capture_app(store), ["/upload"], 1_000_000),
+            [bomb],
+            [(b"content-encoding", b"gzip")],
+        )
+
+        assert store == []
+        assert sent[0]["status"] == 413
+
+    def test_zstd_body_decoded(self):
+        payload = b"[" + b'{"url": "https://example.com"},' * 100 + b"{}]"
+        store = []
+        run_middleware(
+            RequestDecompressionMiddleware(capture_app(store), ["/upload"], 10_000),
+            [zstandard.ZstdCompressor().compress(payload)],
+            [(b"content-encoding", b"zstd")],
+        )
+
+        assert store[0][1] == payload
+
+    def test_zstd_bomb_rejected(self):
+        bomb = zstandard.ZstdCompressor().compress(b"\0" * 50_000_000)
+        store = []
+        sent = run_middleware(
+            RequestDecompressionMiddleware(capture_app(store), ["/upload"], 1_000_000),
+            [bomb],
+            [(b"content-encoding", b"zstd")],
+        )
+
+        assert store == []
+        assert sent[0]["status"] == 413
+
+    @pytest.mark.parametrize("encoding, body", [
+        (b"gzip", b"not gzip"),
+        (b"gzip", gzip.compress(b"truncated payload")[:-8]),
+        (b"zstd", b"not zstd"),
+        (b"zstd", zstandard.ZstdCompressor().compress(b"x" * 1000)[:10]),
+    ])
+    def test_invalid_body_rejected(self, encoding, body):
+        store = []
+        sent = run_middleware(
+            RequestDecompressionMiddleware(capture_app(store), ["/upload"], 10_000),
+            [body],
+            [(b"content-encoding", encoding)],
+        )
+
+        assert store == []
+        assert sent[0]["status"] == 400
+
+    def test_unsupported_encoding_rejected(self):
+        store = []
+        sent = run_middleware(
+            RequestDecompressionMiddleware(capture_app(store), ["/upload"], 10_000),
+            [b"data"],
+            [(b"content-encoding", b"br")],
+        )
+
+        assert sent[0]["status"] == 415
+
+    def test_other_paths_untouched(self):
+        store = []
+        run_middleware(
+            RequestDecompressionMiddleware(capture_app(store), ["/elsewhere"], 10_000),
+            [b"raw"],
+            [(b"content-encoding", b"gzip")],
+        )
+
+        assert store[0][1] == b"raw"
+
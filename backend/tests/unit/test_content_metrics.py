@@ -0,0 +1,69 @@
+import pytest
+
+from services.content_metrics import CONTENT_COLUMNS, ContentMetricsCache, content_statistics
+from utils.metrics import content_metrics_cache_total
+
+
+class TestContentStatistics:
+    def test_statistics_per_column(self):
+        stats = content_statistics([[100, 200, 300, 400], [0, 5, 5, 10], [2, 2, 2, 2]])
+
+        assert list(stats) == list(CONTENT_COLUMNS)
+        words = stats["word_count"]
+        assert (words["min"], words["max"], words["mean"]) == (100, 400, 250.0)
+        assert words["p50"] == 250.0
+        assert words["p25"] == pytest.approx(175.0)
+        assert words["p99"] == pytest.approx(397.0)
+        assert (words["first"], words["latest"], words["change"], words["change_pct"]) == (100, 400, 300, 300.0)
+        assert stats["image_count"]["change_pct"] == 0.0
+
+    def test_change_pct_undefined_from_zero(self):
+        stats = content_statistics([[0, 10], [3, 0], [0, 0]])
+
+        assert stats["word_count"]["change_pct"] is None
+        assert stats["link_count"]["change_pct"] == -100.0
+        assert stats["image_count"]["change_pct"] is None
+
+    def test_single_visit(self):
+        stats = content_statistics([[7], [1], [0]])
+
+        assert stats["word_count"]["p90"] == 7.0
+        assert stats["word_count"]["change"] == 0
+
+    def test_no_visits(self):
+        assert content_statistics(([], [], [])) == {name: None for name in CONTENT_COLUMNS}
+
+    def test_values_are_plain_python_numbers(self):
+        stats = content_statistics([[1, 2], [3, 4], [5, 6]])
+
+        assert all(type(value) in (int, float) for value in stats["word_count"].values())
+
+
+class TestContentMetricsCache:
+    def test_entry_only_returned_for_matching_version(self):
+        cache = ContentMetricsCache()
+        misses = content_metrics_cache_total.collect().get(("miss",), 0)
+        cache.put("https://example.com", (1, "a"), {"total_visits": 1})
+
+        assert cache.get("https://example.com", (1, "a")) == {"total_visits": 1}
+        assert cache.get("https://example.com", (2, "a")) is None
+        assert cache.get("https://example.org", (1, "a")) is None
+        assert content_metrics_cache_total.collect()[("miss",)] == misses + 2
+
+    def test_least_recently_used_entry_evicted(self):
+        cache = ContentMetricsCache(maxsize=2)
+        cache.put("a", 1, {})
+        cache.put("b", 1, {})
+        cache.get("a", 1)
+
+        cache.put("c", 1, {})
+
+        assert cache.get("a", 1) == {}
+        assert cache.get("b", 1) is None
+        assert cache.get("c", 1) == {}
+
+    def test_disabled_when_size_zero(self):
+        cache = ContentMetricsCache(maxsize=0)
+        cache.put("a", 1, {})
+
+        assert cache.get("a", 1) is None
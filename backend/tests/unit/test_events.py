@@ -0,0 +1,331 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import psycopg
+import psycopg2.extensions
+import pytest
+from sqlalchemy import create_engine
+
+from services.events import (
+    MAX_NOTIFY_PAYLOAD,
+    Broadcaster,
+    PgNotifyListener,
+    Subscription,
+    TooManySubscribers,
+    event_stream,
+    format_event,
+    notify_events,
+)
+from tests.conftest import run
+from utils.metrics import sse_events_dropped_total, sse_subscribers
+
+
+def visits_event(url: str, count: int = 1) -> dict:
+    return {"type": "visits", "url": url, "count": count, "visit": None}
+
+
+async def collect(stream) -> list[str]:
+    return [frame async for frame in stream]
+
+
+class TestSubscription:
+    def test_overflow_replaced_by_resync(self):
+        async def scenario():
+            subscription = Subscription("https://example.com", maxsize=2)
+            dropped = sse_events_dropped_total.collect().get((), 0)
+            for count in range(3):
+                subscription.put(visits_event("https://example.com", count))
+
+            assert subscription.queue.qsize() == 1
+            assert subscription.queue.get_nowait() == {"type": "resync", "url": "https://example.com"}
+            assert sse_events_dropped_total.collect().get((), 0) == dropped + 2
+
+        run(scenario())
+
+    def test_close_survives_full_queue(self):
+        async def scenario():
+            subscription = Subscription("https://example.com", maxsize=1)
+            subscription.put(visits_event("https://example.com"))
+            subscription.put(None)
+
+            assert subscription.queue.get_nowait() is None
+
+        run(scenario())
+
+
+class TestBroadcaster:
+    def test_deliver_routes_by_url(self):
+        async def scenario():
+            broadcaster = Broadcaster()
+            first = broadcaster.subscribe("https://example.com")
+            second = broadcaster.subscribe("https://example.com")
+            other = broadcaster.subscribe("https://example.org")
+
+            broadcaster.deliver([visits_event("https://example.com")])
+
+            assert first.queue.qsize() == second.queue.qsize() == 1
+            assert other.queue.empty()
+
+        run(scenario())
+
+    def test_subscriber_limit(self):
+        broadcaster = Broadcaster(max_subscribers=1)
+        subscription = broadcaster.subscribe("https://example.com")
+
+        with pytest.raises(TooManySubscribers):
+            broadcaster.subscribe("https://example.org")
+
+        broadcaster.unsubscribe(subscription)
+        broadcaster.subscribe("https://example.org")
+
+    def test_unsubscribe_updates_gauge_once(self):
+        broadcaster = Broadcaster()
+        before = sse_subscribers.collect().get((), 0)
+        subscription = broadcaster.subscribe("https://example.com")
+        assert sse_subscribers.collect()[()] == before + 1
+
+        broadcaster.unsubscribe(subscription)
+        broadcaster.unsubscribe(subscription)
+
+        assert sse_subscribers.collect()[()] == before
+        assert broadcaster._subscribers == {}
+
+    def test_publish_from_thread_delivers_on_loop(self):
+        async def scenario():
+            broadcaster = Broadcaster()
+            broadcaster.bind(asyncio.get_running_loop())
+            subscription = broadcaster.subscribe("https://example.com")
+
+            thread = threading.Thread(target=broadcaster.publish, args=([visits_event("https://example.com")],))
+            thread.start()
+            thread.join()
+
+            event = await asyncio.wait_for(subscription.queue.get(), 1)
+            assert event["count"] == 1
+
+        run(scenario())
+
+    def test_publish_without_loop_is_noop(self):
+        broadcaster = Broadcaster()
+        broadcaster.publish([visits_event("https://example.com")])
+        broadcaster.publish([])
+
+    def test_notifier_replaces_local_delivery(self):
+        broadcaster = Broadcaster()
+        broadcaster.notifier = MagicMock()
+        broadcaster.deliver_threadsafe = MagicMock()
+        events = [visits_event("https://example.com")]
+
+        broadcaster.publish(events)
+
+        broadcaster.notifier.assert_called_once_with(events)
+        broadcaster.deliver_threadsafe.assert_not_called()
+
+    def test_notifier_failure_falls_back_to_local(self):
+        broadcaster = Broadcaster()
+        broadcaster.notifier = MagicMock(side_effect=RuntimeError("connection lost"))
+        broadcaster.deliver_threadsafe = MagicMock()
+        events = [visits_event("https://example.com")]
+
+        broadcaster.publish(events)
+
+        broadcaster.deliver_threadsafe.assert_called_once_with(events)
+
+
+class TestEventStream:
+    def test_burst_followed_by_single_metrics_frame(self):
+        async def scenario():
+            broadcaster = Broadcaster()
+            subscription = broadcaster.subscribe("https://example.com")
+            loads = []
+
+            async def load_metrics():
+                loads.append(1)
+                return {"total_visits": len(loads)}
+
+            broadcaster.deliver([visits_event("https://example.com"), visits_event("https://example.com", 2)])
+            subscription.put(None)
+            frames = await collect(event_stream(broadcaster, subscription, load_metrics, 10, 10))
+
+            assert frames[0] == "retry: 5000\n\n"
+            assert frames[1] == format_event("metrics", {"total_visits": 1})
+            # Stream closed within the burst, so no trailing metrics frame
+            assert frames[2:] == [
+                format_event("visits", visits_event("https://example.com")),
+                format_event("visits", visits_event("https://example.com", 2)),
+            ]
+            assert broadcaster._subscribers == {}
+
+        run(scenario())
+
+    def test_metrics_sent_after_each_burst(self):
+        async def scenario():
+            broadcaster = Broadcaster()
+            subscription = broadcaster.subscribe("https://example.com")
+
+            async def load_metrics():
+                return {"total_visits": 3}
+
+            stream = event_stream(broadcaster, subscription, load_metrics, 10, 10)
+            assert await stream.__anext__() == "retry: 5000\n\n"
+            await stream.__anext__()
+            broadcaster.deliver([visits_event("https://example.com", 3)])
+
+            assert (await stream.__anext__()).startswith("event: visits\n")
+            assert await stream.__anext__() == format_event("metrics", {"total_visits": 3})
+            await stream.aclose()
+            assert broadcaster._subscribers == {}
+
+        run(scenario())
+
+    def test_streams_of_a_url_share_one_metrics_read_per_burst(self):
+        async def scenario():
+            broadcaster = Broadcaster()
+            loads = []
+
+            async def load_metrics():
+                loads.append(1)
+                await asyncio.sleep(0.01)
+                return {"total_visits": len(loads)}
+
+            streams = [
+                event_stream(broadcaster, broadcaster.subscribe("https://example.com"), load_metrics, 10, 10)
+                for _ in range(3)
+            ]
+            for stream in streams:
+                await stream.__anext__()
+            connect = await asyncio.gather(*(stream.__anext__() for stream in streams))
+            broadcaster.deliver([visits_event("https://example.com")])
+
+            async def after_burst(stream):
+                await stream.__anext__()
+                return await stream.__anext__()
+
+            burst = await asyncio.gather(*(after_burst(stream) for stream in streams))
+            for stream in streams:
+                await stream.aclose()
+
+            assert connect == [format_event("metrics", {"total_visits": 1})] * 3
+            assert burst == [format_event("metrics", {"total_visits": 2})] * 3
+            assert len(loads) == 2
+            assert broadcaster._metrics == {}
+
+        run(scenario())
+
+    def test_failed_metrics_read_not_reused(self):
+        async def scenario():
+            broadcaster = Broadcaster()
+            broadcaster.subscribe("https://example.com")
+            results = iter([RuntimeError("database unavailable"), {"total_visits": 1}])
+
+            async def load_metrics():
+                result = next(results)
+                if isinstance(result, Exception):
+                    raise result
+                return result
+
+            with pytest.raises(RuntimeError):
+                await broadcaster.load_metrics("https://example.com", load_metrics)
+            assert await broadcaster.load_metrics("https://example.com", load_metrics) == {"total_visits": 1}
+
+        run(scenario())
+
+    def test_heartbeat_until_deadline(self):
+        async def scenario():
+            broadcaster = Broadcaster()
+            subscription = broadcaster.subscribe("https://example.com")
+
+            async def load_metrics():
+                return {}
+
+            return await collect(event_stream(broadcaster, subscription, load_metrics, 0.02, 0.07))
+
+        frames = run(scenario())
+
+        assert frames[:2] == ["retry: 5000\n\n", format_event("metrics", {})]
+        assert set(frames[2:]) == {": heartbeat\n\n"}
+        assert 2 <= len(frames[2:]) <= 4
+
+
+class TestNotifyEvents:
+    def payloads(self, events: list[dict]) -> list[str]:
+        engine = MagicMock()
+        conn = engine.begin.return_value.__enter__.return_value
+        notify_events(engine, events)
+        return [call.args[1]["payload"] for call in conn.execute.call_args_list]
+
+    def test_small_events_share_one_payload(self):
+        events = [visits_event(f"https://example.com/{i}") for i in range(3)]
+
+        payloads = self.payloads(events)
+
+        assert len(payloads) == 1
+        assert json.loads(payloads[0]) == events
+
+    def test_payloads_stay_under_limit(self):
+        events = [visits_event(f"https://example.com/{i:04d}/" + "a" * 200) for i in range(200)]
+
+        payloads = self.payloads(events)
+
+        assert len(payloads) > 1
+        assert all(len(payload) <= MAX_NOTIFY_PAYLOAD for payload in payloads)
+        assert [event for payload in payloads for event in json.loads(payload)] == events
+
+    def test_oversized_visit_dropped_from_event(self):
+        event = {**visits_event("https://example.com"), "visit": {"description": "x" * MAX_NOTIFY_PAYLOAD}}
+
+        payloads = self.payloads([event])
+
+        assert json.loads(payloads[0]) == [visits_event("https://example.com")]
+
+
+class TestPgNotifyListener:
+    def listen(self, database_url: str, driver_connection) -> list[dict]:
+        """Run the listener against ``driver_connection`` until it has delivered one batch."""
+        engine = create_engine(database_url)
+        received, delivered = [], threading.Event()
+
+        def on_events(events):
+            received.extend(events)
+            delivered.set()
+
+        raw = MagicMock(driver_connection=driver_connection)
+        with patch.object(engine, "raw_connection", return_value=raw):
+            listener = PgNotifyListener(engine, on_events, poll_seconds=0.01)
+            listener.start()
+            assert delivered.wait(2)
+            listener.stop()
+        driver_connection.cursor.return_value.__enter__.return_value.execute.assert_called_with("LISTEN visit_events")
+        raw.detach.assert_called_once()
+        return received
+
+    def test_psycopg3_connection(self):
+        conn = MagicMock(spec=psycopg.Connection)
+        notification = SimpleNamespace(payload=json.dumps([visits_event("https://example.com")]))
+        batches = [[notification], []]
+        conn.notifies.side_effect = lambda timeout: iter(batches.pop() if batches else [])
+
+        received = self.listen("postgresql+psycopg://user@unreachable.invalid/db", conn)
+
+        assert received == [visits_event("https://example.com")]
+        conn.notifies.assert_called_with(timeout=0.01)
+
+    def test_psycopg2_connection(self, monkeypatch):
+        conn = MagicMock(spec=psycopg2.extensions.connection)
+        conn.notifies = [SimpleNamespace(payload=json.dumps([visits_event("https://example.com")]))]
+        monkeypatch.setattr("services.events.select.select", lambda r, w, x, timeout: (r, [], []))
+
+        received = self.listen("postgresql+psycopg2://user@unreachable.invalid/db", conn)
+
+        assert received == [visits_event("https://example.com")]
+        assert conn.notifies == []
+
+    def test_unsupported_driver_rejected(self):
+        engine = MagicMock()
+        engine.dialect.driver = "pg8000"
+
+        with pytest.raises(ValueError, match="pg8000"):
+            PgNotifyListener(engine, lambda events: None)
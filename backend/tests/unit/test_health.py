@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from core.health import HealthProber, ProbeResult
+from tests.conftest import run
+
+
+def engine(**kwargs):
+    return create_engine("sqlite://", poolclass=QueuePool, pool_size=2, max_overflow=1, **kwargs)
+
+
+class TestHealthProber:
+    def test_probe_reports_latency_and_pool(self):
+        db = engine()
+
+        result = HealthProber(lambda: db).probe()
+
+        assert result.connected is True
+        assert result.error is None
+        assert result.latency_ms >= 0
+        assert result.pool == {"size": 2, "checked_in": 1, "checked_out": 0, "overflow": 0}
+
+    def test_probe_failure(self):
+        def broken():
+            raise ConnectionError("refused")
+
+        result = HealthProber(lambda: engine(creator=broken)).probe()
+
+        assert result.connected is False
+        assert "refused" in result.error
+
+    def test_slow_probe_times_out(self):
+        release = threading.Event()
+        prober = HealthProber(engine, timeout=0.01)
+        prober.probe = lambda: release.wait(1)
+
+        try:
+            result = run(prober.refresh())
+        finally:
+            release.set()
+
+        assert result.connected is False
+        assert result.error == "probe timed out"
+        assert prober.latest is result
+
+    def test_timed_out_probe_not_started_again(self):
+        release = threading.Event()
+        calls = []
+        prober = HealthProber(engine, timeout=0.01)
+
+        def blocked_probe():
+            calls.append(1)
+            release.wait(1)
+            return ProbeResult(True, 1.0, None)
+
+        prober.probe = blocked_probe
+
+        async def scenario():
+            try:
+                first = await prober.refresh()
+                second = await prober.refresh()
+            finally:
+                release.set()
+            await asyncio.sleep(0.05)
+            return first, second, await prober.refresh()
+
+        first, second, after = run(scenario())
+
+        assert first.error == second.error == "probe timed out"
+        assert after.connected is True
+        assert len(calls) == 2
+
+    def test_recovery_replaces_failure(self):
+        db = engine()
+        prober = HealthProber(lambda: db)
+        prober.probe = lambda: ProbeResult(False, 1.0, None, "refused")
+        run(prober.refresh())
+        del prober.probe
+
+        assert run(prober.refresh()).connected is True
+        assert prober.latest.connected is True
+
+    def test_loop_refreshes_until_stopped(self):
+        async def scenario():
+            db = engine()
+            prober = HealthProber(lambda: db, interval=0.01)
+            await prober.start()
+            first = prober.latest
+            await asyncio.sleep(0.05)
+            assert prober.latest is not first
+            await prober.stop()
+            last = prober.latest
+            await asyncio.sleep(0.03)
+            assert prober.latest is last
+
+        run(scenario())
@@ -0,0 +1,54 @@
+import zlib
+
+import pytest
+
+from utils.hll import REGISTER_COUNT, RELATIVE_ERROR, HyperLogLog
+
+
+class TestHyperLogLog:
+    def test_empty(self):
+        assert HyperLogLog().count() == 0
+    
+    def test_small_counts_are_exact(self):
+        sketch = HyperLogLog().update(f"2025-06-{day:02d}" for day in range(1, 31))
+        
+        assert sketch.count() == 30
+    
+    @pytest.mark.parametrize("n", [5000, 50000])
+    def test_large_counts_within_error_bound(self, n):
+        sketch = HyperLogLog().update(f"client-{i}" for i in range(n))
+        
+        # Four standard errors: a stable bound for a fixed input
+        assert abs(sketch.count() - n) / n < 4 * RELATIVE_ERROR
+    
+    def test_repeats_do_not_change_the_sketch(self):
+        sketch = HyperLogLog().update(["a", "b", "c"])
+        before = bytes(sketch.registers)
+        
+        sketch.update(["a", "b", "c"] * 10)
+        
+        assert bytes(sketch.registers) == before
+        assert sketch.count() == 3
+    
+    def test_merge_is_union(self):
+        left = HyperLogLog().update(str(i) for i in range(0, 600))
+        right = HyperLogLog().update(str(i) for i in range(300, 900))
+        union = HyperLogLog().update(str(i) for i in range(900))
+        
+        assert left.merge(right).registers == union.registers
+    
+    def test_round_trip(self):
+        sketch = HyperLogLog().update(str(i) for i in range(100))
+        data = sketch.to_bytes()
+        
+        assert HyperLogLog.from_bytes(data).registers == sketch.registers
+        assert len(data) < REGISTER_COUNT
+        assert HyperLogLog.from_bytes(None).count() == 0
+    
+    def test_rejects_unknown_format(self):
+        data = HyperLogLog().to_bytes()
+        
+        with pytest.raises(ValueError):
+            HyperLogLog.from_bytes(b"\x09" + data[1:])
+        with pytest.raises(ValueError):
+            HyperLogLog.from_bytes(data[:1] + zlib.compress(b"\x00" * 10))
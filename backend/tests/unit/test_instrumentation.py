@@ -0,0 +1,77 @@
+from unittest.mock import patch
+
+from sqlalchemy import text
+
+from db.instrumentation import QueryProfiler, instrument_engine, normalize_statement, redact_parameters
+from utils.request_context import begin_request_stats, end_request_stats
+
+
+class TestRedactParameters:
+    def test_named_parameters(self):
+        assert redact_parameters({"url_1": "https://secret.com", "id": 3, "x": None}) == {
+            "url_1": "<str>", "id": "<int>", "x": None
+        }
+
+    def test_positional_parameters(self):
+        assert redact_parameters(("https://secret.com", 10)) == ["<str>", "<int>"]
+
+    def test_executemany(self):
+        assert redact_parameters([("a",), ("b",)], executemany=True) == "<2 parameter sets>"
+
+
+class TestNormalizeStatement:
+    def test_collapses_whitespace(self):
+        assert normalize_statement("SELECT *\n  FROM visits\n") == "SELECT * FROM visits"
+
+
+class TestQueryProfiler:
+    def test_counts_queries_without_profiler(self, db_engine):
+        stats, token = begin_request_stats()
+        try:
+            with db_engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                conn.execute(text("SELECT 2"))
+        finally:
+            end_request_stats(token)
+
+        assert stats.db_queries == 2
+        assert stats.statements == {}
+
+    def test_records_statement_timings(self, db_engine):
+        QueryProfiler(slow_query_ms=10000).attach(db_engine)
+        stats, token = begin_request_stats()
+        try:
+            with db_engine.connect() as conn:
+                for _ in range(3):
+                    conn.execute(text("SELECT 1"))
+        finally:
+            end_request_stats(token)
+
+        count, total_ms = stats.statements["SELECT 1"]
+        assert count == 3
+        assert stats.db_time_ms == total_ms
+        assert stats.slowest_statements()[0]["count"] == 3
+        assert stats.repeated_statements(threshold=2) == [{"statement": "SELECT 1", "count": 3}]
+        assert stats.repeated_statements(threshold=3) == []
+        assert not stats.has_slow_statement
+
+    def test_slow_query_logged_with_redacted_parameters(self, db_engine):
+        instrument_engine(db_engine, QueryProfiler(slow_query_ms=0))
+
+        with patch("db.instrumentation.logger") as mock_logger:
+            with db_engine.connect() as conn:
+                conn.execute(text("SELECT :secret"), {"secret": "hunter2"})
+
+        mock_logger.warning.assert_called_once()
+        extra = mock_logger.warning.call_args.kwargs["extra"]
+        assert extra["statement"] == "SELECT ?"
+        assert "hunter2" not in str(extra["parameters"])
+        assert extra["parameters"] == ["<str>"]
+
+    def test_queries_outside_request_are_not_attributed(self, db_engine):
+        QueryProfiler(slow_query_ms=10000).attach(db_engine)
+
+        with db_engine.connect() as conn:
+            result = conn.execute(text("SELECT 1")).scalar()
+
+        assert result == 1
@@ -0,0 +1,123 @@
+import logging
+import queue
+import sys
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from db.instrumentation import QueryProfiler
+from middleware.logging import LoggingMiddleware
+from middleware.metrics import MetricsMiddleware
+from utils.logger import CallerlessLogger, DroppingQueueHandler, get_api_logger, logger
+from utils.metrics import log_records_dropped_total
+
+
+def record(msg: str = "Visit %s", args=("recorded",), exc_info=None) -> logging.LogRecord:
+    return logging.LogRecord("api", logging.INFO, __file__, 1, msg, args, exc_info)
+
+
+class TestDroppingQueueHandler:
+    def test_full_queue_drops_and_counts(self):
+        handler = DroppingQueueHandler(queue.Queue(1))
+        dropped = log_records_dropped_total.collect().get((), 0)
+
+        handler.emit(record())
+        handler.emit(record())
+
+        assert handler.queue.qsize() == 1
+        assert log_records_dropped_total.collect()[()] == dropped + 1
+
+    def test_prepare_resolves_message_and_traceback(self):
+        handler = DroppingQueueHandler(queue.Queue())
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            original = record(exc_info=sys.exc_info())
+        original.path = "/api/v1/visits"
+
+        prepared = handler.prepare(original)
+
+        assert prepared.msg == "Visit recorded" and prepared.args is None
+        assert prepared.exc_info is None
+        assert "ValueError: boom" in prepared.exc_text
+        assert prepared.path == "/api/v1/visits"
+        # The caller's record is left untouched for other handlers
+        assert original.exc_info is not None
+
+
+class TestCallerInfo:
+    def test_only_api_logger_skips_caller_lookup(self):
+        assert isinstance(logger, CallerlessLogger)
+        assert logger.findCaller() == ("(unknown file)", 0, "(unknown function)", None)
+        assert logging._srcfile is not None
+        assert logging.getLogger("tests.other").findCaller()[0] == __file__
+
+    def test_caller_info_uses_default_logger_class(self):
+        assert type(get_api_logger(True, "tests.caller_info")) is logging.Logger
+        assert isinstance(get_api_logger(False, "tests.callerless"), CallerlessLogger)
+        assert type(logging.getLogger("tests.after_callerless")) is logging.Logger
+
+
+class TestLoggingMiddlewareSampling:
+    def client(self, sample_rate: float) -> TestClient:
+        app = FastAPI()
+
+        @app.get("/ok")
+        def ok():
+            return {"ok": True}
+
+        app.add_middleware(LoggingMiddleware, sample_rate=sample_rate)
+        return TestClient(app)
+
+    def test_successes_sampled_errors_always_logged(self):
+        client = self.client(0.0)
+
+        with patch("middleware.logging.logger") as mock_logger:
+            client.get("/ok")
+            mock_logger.info.assert_not_called()
+            client.get("/not-found")
+
+        extra = mock_logger.info.call_args.kwargs["extra"]
+        assert extra["status_code"] == 404
+        assert "sample_rate" not in extra
+
+    def test_sampled_lines_carry_rate(self):
+        client = self.client(0.5)
+
+        with patch("middleware.logging.logger") as mock_logger, \
+                patch("middleware.logging.random.random", return_value=0.1):
+            client.get("/ok")
+
+        assert mock_logger.info.call_args.kwargs["extra"]["sample_rate"] == 0.5
+
+    def test_full_rate_logs_everything(self):
+        client = self.client(1.0)
+
+        with patch("middleware.logging.logger") as mock_logger:
+            client.get("/ok")
+
+        assert "sample_rate" not in mock_logger.info.call_args.kwargs["extra"]
+
+    @pytest.mark.parametrize("slow_query_ms, logged", [(10000, False), (0, True)])
+    def test_only_slow_statements_bypass_sampling(self, db_engine, slow_query_ms, logged):
+        QueryProfiler(slow_query_ms=slow_query_ms).attach(db_engine)
+        app = FastAPI()
+
+        @app.get("/query")
+        def query():
+            with db_engine.connect() as conn:
+                return {"value": conn.execute(text("SELECT 1")).scalar()}
+
+        app.add_middleware(LoggingMiddleware, sample_rate=0.0)
+        # Opens the per-request stats, as in the app
+        app.add_middleware(MetricsMiddleware)
+
+        with patch("middleware.logging.logger") as mock_logger:
+            TestClient(app).get("/query")
+
+        assert mock_logger.info.called == logged
+        if logged:
+            assert mock_logger.info.call_args.kwargs["extra"]["db_statements"][0]["statement"] == "SELECT 1"
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta, timezone
+
+from db.maintenance import analyze_tables, backfill_sketches, prune_visits
+from models.visit import Url, UrlSketch, Visit
+from repositories.visit_repository import VisitRepository
+
+
+def add_visits(session, url: str, ages_in_days: list[int]) -> Url:
+    url_obj = Url(url=url)
+    session.add(url_obj)
+    session.flush()
+    now = datetime.now(timezone.utc)
+    session.add_all([
+        Visit(url_id=url_obj.id, datetime_visited=now - timedelta(days=age)) for age in ages_in_days
+    ])
+    session.commit()
+    return url_obj
+
+
+class TestPruneVisits:
+    def test_deletes_expired_visits_and_orphaned_urls(self, db_engine, db_session):
+        add_visits(db_session, "https://old.com", [40, 50])
+        add_visits(db_session, "https://mixed.com", [5, 45])
+        add_visits(db_session, "https://new.com", [1])
+        
+        with db_engine.begin() as conn:
+            result = prune_visits(conn, retention_days=30, limit=100)
+        
+        assert result == {"visits": 3, "urls": 1}
+        assert db_session.query(Visit).count() == 2
+        assert sorted(url for (url,) in db_session.query(Url.url)) == ["https://mixed.com", "https://new.com"]
+    
+    def test_deletes_sketches_of_orphaned_urls(self, db_engine, db_session):
+        repo = VisitRepository(db_session)
+        repo.create_visit("https://old.com", None, None, 0, 0, 0,
+                          datetime_visited=datetime.now(timezone.utc) - timedelta(days=40))
+        
+        with db_engine.begin() as conn:
+            prune_visits(conn, retention_days=30, limit=100)
+        
+        assert db_session.query(UrlSketch).count() == 0
+    
+    def test_deletes_at_most_limit(self, db_engine, db_session):
+        add_visits(db_session, "https://old.com", [40, 41, 42, 43, 44])
+        
+        with db_engine.begin() as conn:
+            first = prune_visits(conn, retention_days=30, limit=2)
+        
+        assert first == {"visits": 2, "urls": 0}
+        assert db_session.query(Visit).count() == 3
+    
+    def test_nothing_expired(self, db_engine, db_session):
+        add_visits(db_session, "https://new.com", [1])
+        
+        with db_engine.begin() as conn:
+            assert prune_visits(conn, retention_days=30, limit=100) == {"visits": 0, "urls": 0}
+
+
+class TestBackfillSketches:
+    def test_builds_visit_days_for_pending_urls(self, db_engine, db_session):
+        old = add_visits(db_session, "https://old.com", [1, 1, 2, 3])
+        empty = Url(url="https://empty.com")
+        db_session.add(empty)
+        db_session.flush()
+        db_session.add_all([
+            UrlSketch(url_id=old.id, backfill_pending=True),
+            UrlSketch(url_id=empty.id, backfill_pending=True),
+        ])
+        db_session.commit()
+        repo = VisitRepository(db_session)
+        assert repo.get_metrics_by_url("https://old.com")["distinct_days"] is None
+        
+        with db_engine.begin() as conn:
+            assert backfill_sketches(conn, limit=10) == 2
+            assert backfill_sketches(conn, limit=10) == 0
+        
+        db_session.expire_all()
+        metrics = repo.get_metrics_by_url("https://old.com")
+        assert metrics["distinct_days"] == 3
+        assert metrics["distinct_clients"] is None
+        assert db_session.query(UrlSketch).filter(UrlSketch.backfill_pending).count() == 0
+
+
+class TestAnalyzeTables:
+    def test_runs_on_sqlite(self, db_engine, db_session):
+        add_visits(db_session, "https://example.com", [1, 2])
+        
+        with db_engine.begin() as conn:
+            analyze_tables(conn)
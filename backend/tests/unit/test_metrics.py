@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+from utils.metrics import Counter, Gauge, Histogram, MetricsRegistry, _Metric
+
+
+class TestCounter:
+    def test_inc_with_labels(self):
+        counter = Counter("test_total", "Test counter.", ("method",))
+        counter.inc(method="GET")
+        counter.inc(2, method="GET")
+        counter.inc(method="POST")
+
+        assert counter.collect() == {("GET",): 3, ("POST",): 1}
+
+    def test_wrong_labels_rejected(self):
+        counter = Counter("test_total", "Test counter.", ("method",))
+        with pytest.raises(ValueError):
+            counter.inc(route="/")
+
+    def test_increments_from_many_threads_are_merged(self):
+        counter = Counter("test_total", "Test counter.")
+
+        def work():
+            for _ in range(1000):
+                counter.inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.collect() == {(): 8000}
+
+
+class TestGauge:
+    def test_inc_and_dec_across_threads(self):
+        gauge = Gauge("test_in_flight", "Test gauge.")
+        gauge.inc()
+        gauge.inc()
+        thread = threading.Thread(target=gauge.dec)
+        thread.start()
+        thread.join()
+
+        assert gauge.collect() == {(): 1}
+
+
+class TestHistogram:
+    def test_observe_buckets(self):
+        histogram = Histogram("test_seconds", "Test histogram.", buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        counts, total = histogram.collect()[()]
+        assert counts == [2, 1, 1]
+        assert total == pytest.approx(5.65)
+
+    def test_render_is_cumulative(self):
+        histogram = Histogram("test_seconds", "Test histogram.", ("route",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, route="/a")
+        histogram.observe(0.5, route="/a")
+
+        lines = histogram.render()
+
+        assert '# TYPE test_seconds histogram' in lines
+        assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{route="/a",le="1"} 2' in lines
+        assert 'test_seconds_bucket{route="/a",le="+Inf"} 2' in lines
+        assert 'test_seconds_count{route="/a"} 2' in lines
+
+
+class TestMetricsRegistry:
+    def test_render_text_format(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Total requests.", ("path",))
+        counter.inc(path='/a"b\\c')
+
+        output = registry.render()
+
+        assert "# HELP requests_total Total requests.\n" in output
+        assert "# TYPE requests_total counter\n" in output
+        assert 'requests_total{path="/a\\"b\\\\c"} 1\n' in output
+
+    def test_duplicate_registration_rejected(self):
+        registry = MetricsRegistry()
+        registry.counter("requests_total", "Total requests.")
+        with pytest.raises(ValueError):
+            registry.gauge("requests_total", "Total requests.")
+
+
+class TestMetric:
+    def test_subclass_without_samples_cannot_be_created(self):
+        class Summary(_Metric):
+            type = "summary"
+
+        with pytest.raises(TypeError):
+            Summary("app_summary", "Missing _render_samples")
@@ -0,0 +1,72 @@
+from unittest.mock import MagicMock
+
+from db.replicas import ReplicaRouter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_router(count=2, **kwargs):
+    clock = FakeClock()
+    replicas = [MagicMock(name=f"replica{i}") for i in range(count)]
+    return ReplicaRouter(replicas, clock=clock, **kwargs), replicas, clock
+
+
+class TestReplicaRouter:
+    def test_no_replicas_uses_primary(self):
+        router, _, _ = make_router(count=0)
+        assert router.candidates("1.2.3.4") == []
+
+    def test_round_robin(self):
+        router, (a, b), _ = make_router()
+        assert router.candidates()[0] is a
+        assert router.candidates()[0] is b
+        assert router.candidates()[0] is a
+
+    def test_down_replica_skipped_until_retry(self):
+        router, (a, b), clock = make_router(retry_seconds=30)
+        router.mark_down(a)
+
+        assert router.candidates() == [b]
+        assert router.candidates() == [b]
+        assert router.healthy_count() == 1
+
+        clock.now += 31
+        assert a in router.candidates()
+        assert router.healthy_count() == 2
+
+    def test_read_your_writes_window(self):
+        router, _, clock = make_router(read_your_writes_seconds=5)
+        router.record_write("1.2.3.4")
+
+        assert router.candidates("1.2.3.4") == []
+        assert len(router.candidates("5.6.7.8")) == 2
+
+        clock.now += 6
+        assert len(router.candidates("1.2.3.4")) == 2
+
+    def test_read_your_writes_disabled(self):
+        router, _, _ = make_router(read_your_writes_seconds=0)
+        router.record_write("1.2.3.4")
+        assert len(router.candidates("1.2.3.4")) == 2
+
+    def test_tracked_writers_are_pruned(self, monkeypatch):
+        monkeypatch.setattr("db.replicas.MAX_TRACKED_WRITERS", 3)
+        router, _, clock = make_router(read_your_writes_seconds=5)
+        for i in range(3):
+            router.record_write(f"old-{i}")
+        clock.now += 10
+        router.record_write("new-0")
+
+        assert router._recent_writes == {"new-0": clock.now}
+
+    def test_dispose(self):
+        router, (a, b), _ = make_router()
+        router.dispose()
+        a.dispose.assert_called_once()
+        b.dispose.assert_called_once()
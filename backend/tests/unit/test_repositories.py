@@ -1,14 +1,18 @@
 import pytest
+from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
 
-from repositories.visit_repository import VisitRepository
+from api.schemas import VisitResponse
+from models.visit import Url, UrlSketch
+from repositories.visit_repository import PartialBatchError, VisitRepository
 
 
 class TestVisitRepository:
     def test_create_visit(self, db_session):
         repo = VisitRepository(db_session)
-        visit = repo.create_visit(
+        visit, created = repo.create_visit(
             url="https://example.com",
             title="Test",
             description="Test description",
@@ -16,10 +20,35 @@ class TestVisitRepository:
             word_count=500,
             image_count=5
         )
+        assert created is True
         assert visit.id is not None
         assert visit.url == "https://example.com"
         assert visit.link_count == 10
     
+    def test_create_visit_returns_response_row(self, db_session):
+        repo = VisitRepository(db_session)
+        visited_at = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        first, _ = repo.create_visit("https://example.com", "A", None, 1, 2, 3, datetime_visited=visited_at)
+        second, _ = repo.create_visit("https://example.com", "B", "Desc", 4, 5, 6)
+        
+        assert second.url_id == first.url_id
+        assert VisitResponse.model_validate(first).model_dump(mode="json") == {
+            "id": first.id, "url": "https://example.com", "title": "A", "description": None,
+            "datetime_visited": "2025-01-02T03:04:05+00:00", "link_count": 1, "word_count": 2, "image_count": 3
+        }
+        assert (second.title, second.description, second.image_count) == ("B", "Desc", 6)
+    
+    def test_create_visit_duplicate_client_id_writes_nothing(self, db_session):
+        repo = VisitRepository(db_session)
+        repo.create_visit("https://example.com", "First", None, 1, 1, 1, client_visit_id="c" * 36)
+        
+        again, created = repo.create_visit("https://other.com", "Retry", None, 1, 1, 1, client_visit_id="c" * 36)
+        
+        # The stored visit is returned and the retry's URL is not created
+        assert created is False
+        assert again.url == "https://example.com"
+        assert db_session.execute(select(func.count()).select_from(Url)).scalar() == 1
+    
     def test_get_visits_by_url(self, db_session):
         repo = VisitRepository(db_session)
         
@@ -47,6 +76,16 @@ class TestVisitRepository:
         assert len(visits_page2) == 10
         assert visits_page1[0].id != visits_page2[0].id
     
+    def test_pagination_breaks_timestamp_ties_by_id(self, db_session):
+        repo = VisitRepository(db_session)
+        visited = datetime(2025, 3, 1, tzinfo=timezone.utc)
+        ids = [repo.create_visit("https://example.com", f"Test {i}", None, 10, 500, 5,
+                                 datetime_visited=visited)[0].id for i in range(5)]
+        
+        pages = [repo.get_visit_rows_by_url("https://example.com", page=page, page_size=2)[0] for page in (1, 2, 3)]
+        
+        assert [row[0] for page in pages for row in page] == ids[::-1]
+    
     def test_get_latest_visit_by_url(self, db_session):
         repo = VisitRepository(db_session)
         
@@ -58,6 +97,86 @@ class TestVisitRepository:
         assert latest is not None
         assert latest.title == "Latest"
     
+    def test_get_summary_by_url(self, db_session):
+        repo = VisitRepository(db_session)
+        for day in (1, 2, 3):
+            repo.create_visit("https://example.com", f"Day {day}", None, day, 500, 5,
+                              datetime_visited=datetime(2025, 6, day, tzinfo=timezone.utc),
+                              client_key="10.0.0.1")
+        repo.create_visit("https://other.com", "Other", None, 5, 300, 3)
+        
+        rows, metrics = repo.get_summary_by_url("https://example.com", limit=2)
+        
+        assert [row[2] for row in rows] == ["Day 3", "Day 2"]
+        expected, _ = repo.get_visit_rows_by_url("https://example.com", page=1, page_size=2)
+        assert rows == [tuple(row) for row in expected]
+        assert metrics == repo.get_metrics_by_url("https://example.com")
+        assert metrics["total_visits"] == 3
+        assert metrics["distinct_days"] == 3
+    
+    def test_get_summary_by_url_without_sketch(self, db_session):
+        repo = VisitRepository(db_session)
+        repo.create_visit("https://example.com", "Test", None, 10, 500, 5)
+        db_session.query(UrlSketch).delete()
+        db_session.commit()
+        
+        rows, metrics = repo.get_summary_by_url("https://example.com")
+        
+        assert len(rows) == 1
+        assert metrics["distinct_days"] is None
+        assert metrics["distinct_clients"] is None
+    
+    def test_get_summary_by_url_nonexistent(self, db_session):
+        repo = VisitRepository(db_session)
+        
+        assert repo.get_summary_by_url("https://nonexistent.com") == ([], repo.get_metrics_by_url("https://nonexistent.com"))
+    
+    def test_get_content_columns(self, db_session):
+        repo = VisitRepository(db_session)
+        for day, words in ((3, 300), (1, 100), (2, 200)):
+            repo.create_visit("https://example.com", None, None, day, words, 0,
+                              datetime_visited=datetime(2025, 6, day, tzinfo=timezone.utc))
+        repo.create_visit("https://other.com", None, None, 9, 900, 9)
+        
+        count, first, last = repo.get_content_version("https://example.com")
+        
+        assert count == 3
+        assert (first.day, last.day) == (1, 3)
+        assert repo.get_content_columns("https://example.com") == ([100, 200, 300], [1, 2, 3], [0, 0, 0])
+    
+    def test_get_content_columns_nonexistent(self, db_session):
+        repo = VisitRepository(db_session)
+        
+        assert repo.get_content_version("https://nonexistent.com") == (0, None, None)
+        assert repo.get_content_columns("https://nonexistent.com") == ([], [], [])
+    
+    def test_get_visits_after(self, db_session):
+        repo = VisitRepository(db_session)
+        at = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+        
+        first, _ = repo.create_visit("https://example.com", "First", None, 1, 1, 1, datetime_visited=at)
+        tied, _ = repo.create_visit("https://example.com", "Tied", None, 1, 1, 1, datetime_visited=at)
+        repo.create_visit("https://example.com", "Earlier", None, 1, 1, 1,
+                          datetime_visited=datetime(2025, 5, 1, tzinfo=timezone.utc))
+        repo.create_visit("https://other.com", "Other", None, 1, 1, 1, datetime_visited=at)
+        later, _ = repo.create_visit("https://example.com", "Later", None, 1, 1, 1,
+                               datetime_visited=datetime(2025, 6, 2, tzinfo=timezone.utc))
+        
+        visits, total = repo.get_visits_after("https://example.com", first.id, limit=10)
+        
+        # Visits dated before the watermark are only reflected in the total
+        assert [visit.id for visit in visits] == [tied.id, later.id]
+        assert total == 4
+        assert repo.get_visits_after("https://example.com", later.id, limit=10) == ([], 4)
+        assert len(repo.get_visits_after("https://example.com", first.id, limit=1)[0]) == 1
+    
+    def test_get_visits_after_unknown_watermark(self, db_session):
+        repo = VisitRepository(db_session)
+        visit, _ = repo.create_visit("https://example.com", "Test", None, 1, 1, 1)
+        
+        assert repo.get_visits_after("https://example.com", visit.id + 1, limit=10) is None
+        assert repo.get_visits_after("https://other.com", visit.id, limit=10) is None
+    
     def test_get_metrics_by_url(self, db_session):
         repo = VisitRepository(db_session)
         
@@ -69,6 +188,40 @@ class TestVisitRepository:
         
         assert metrics["total_visits"] == 3
     
+    def test_metrics_distinct_days_and_clients(self, db_session):
+        repo = VisitRepository(db_session)
+        day = datetime(2025, 6, 1, 12, tzinfo=timezone.utc)
+        
+        repo.create_visit("https://example.com", None, None, 0, 0, 0, datetime_visited=day, client_key="10.0.0.1")
+        batch = [
+            {"url": "https://example.com", "datetime_visited": day.replace(day=d), "client_visit_id": f"{d}" * 36}
+            for d in (1, 2, 3)
+        ]
+        repo.bulk_create_visits(batch, client_key="10.0.0.2")
+        repo.bulk_create_visits(batch, client_key="10.0.0.2")
+        
+        metrics = repo.get_metrics_by_url("https://example.com")
+        
+        assert metrics["total_visits"] == 4
+        assert metrics["distinct_days"] == 3
+        assert metrics["distinct_clients"] == 2
+        assert 0 < metrics["distinct_error"] < 0.05
+    
+    def test_metrics_without_sketches(self, db_session):
+        repo = VisitRepository(db_session)
+        repo.create_visit("https://example.com", None, None, 0, 0, 0)
+        url_id = db_session.query(UrlSketch.url_id).scalar()
+        
+        db_session.query(UrlSketch).update({"backfill_pending": True})
+        pending = repo.get_metrics_by_url("https://example.com")
+        db_session.query(UrlSketch).delete()
+        missing = repo.get_metrics_by_url("https://example.com")
+        
+        assert url_id is not None
+        assert (pending["distinct_days"], pending["distinct_clients"]) == (None, None)
+        assert (missing["distinct_days"], missing["distinct_clients"]) == (None, None)
+        assert repo.get_metrics_by_url("https://unknown.com")["distinct_days"] == 0
+    
     def test_bulk_create_visits(self, db_session):
         repo = VisitRepository(db_session)
         
@@ -79,13 +232,94 @@ class TestVisitRepository:
              "link_count": 15, "word_count": 600, "image_count": 6}
         ]
         
-        count = repo.bulk_create_visits(visits_data)
+        inserted, duplicates = repo.bulk_create_visits(visits_data)
         
-        assert count == 2
+        assert inserted == 2
+        assert duplicates == 0
         
         visits, total = repo.get_visits_by_url("https://example.com", page=1, page_size=10)
         assert total == 1
     
+    def test_bulk_create_visits_skips_known_client_ids(self, db_session):
+        repo = VisitRepository(db_session)
+        visited_at = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        visits_data = [
+            {"url": "https://example.com", "client_visit_id": "a" * 36, "datetime_visited": visited_at},
+            {"url": "https://example.com", "client_visit_id": "b" * 36},
+            {"url": "https://example.com"}
+        ]
+        
+        assert repo.bulk_create_visits(visits_data) == (3, 0)
+        assert repo.bulk_create_visits(visits_data) == (1, 2)
+        
+        visits, total = repo.get_visits_by_url("https://example.com")
+        assert total == 4
+        assert visits[-1].datetime_visited.replace(tzinfo=timezone.utc) == visited_at
+    
+    def test_bulk_create_visits_inserts_new_urls_in_sorted_order(self, db_session):
+        urls = [f"https://site{i}.com" for i in (3, 1, 4, 0, 2)]
+        
+        VisitRepository(db_session).bulk_create_visits([{"url": url} for url in urls])
+        
+        stored = db_session.execute(select(Url.url).order_by(Url.id)).scalars().all()
+        assert stored == sorted(urls)
+    
+    def test_bulk_create_visits_empty(self, db_session):
+        assert VisitRepository(db_session).bulk_create_visits([]) == (0, 0)
+    
+    def test_bulk_create_visits_commits_per_chunk(self, db_session):
+        repo = VisitRepository(db_session)
+        visits_data = [{"url": f"https://example.com/{i % 3}"} for i in range(7)]
+        
+        with patch.object(db_session, 'commit', wraps=db_session.commit) as commit:
+            assert repo.bulk_create_visits(visits_data, chunk_size=3) == (7, 0)
+        
+        assert commit.call_count == 3
+        assert repo.get_visits_by_url("https://example.com/0")[1] == 3
+    
+    def test_bulk_create_visits_partial_failure(self, db_session):
+        repo = VisitRepository(db_session)
+        visits_data = [
+            {"url": "https://example.com", "client_visit_id": f"{i}" * 36} for i in range(5)
+        ]
+        repo.bulk_create_visits(visits_data[:1])
+        original = repo._insert_chunk
+        chunks = iter([original, original, MagicMock(side_effect=SQLAlchemyError("DB Error"))])
+        
+        with patch.object(repo, '_insert_chunk', side_effect=lambda rows, client_key: next(chunks)(rows, client_key)):
+            with pytest.raises(PartialBatchError) as exc_info:
+                repo.bulk_create_visits(visits_data, chunk_size=2)
+        
+        assert (exc_info.value.inserted, exc_info.value.duplicates) == (3, 1)
+        assert (exc_info.value.processed, exc_info.value.total) == (4, 5)
+        assert isinstance(exc_info.value.__cause__, SQLAlchemyError)
+        assert repo.get_visits_by_url("https://example.com")[1] == 4
+    
+    def test_bulk_create_visits_first_chunk_failure_raises_original(self, db_session):
+        repo = VisitRepository(db_session)
+        
+        with patch.object(repo, '_insert_chunk', side_effect=SQLAlchemyError("DB Error")):
+            with pytest.raises(SQLAlchemyError) as exc_info:
+                repo.bulk_create_visits([{"url": "https://example.com"}] * 4, chunk_size=2)
+        
+        assert not isinstance(exc_info.value, PartialBatchError)
+    
+    def test_create_visit_with_known_client_id_returns_existing(self, db_session):
+        repo = VisitRepository(db_session)
+        first, _ = repo.create_visit("https://example.com", "First", None, 1, 1, 1, client_visit_id="c" * 36)
+        again, created = repo.create_visit("https://example.com", "Retry", None, 1, 1, 1, client_visit_id="c" * 36)
+        
+        assert created is False
+        assert again.id == first.id
+        assert repo.get_metrics_by_url("https://example.com")["total_visits"] == 1
+    
+    def test_create_visit_keeps_original_time(self, db_session):
+        repo = VisitRepository(db_session)
+        visited_at = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        visit, _ = repo.create_visit("https://example.com", "T", None, 1, 1, 1, datetime_visited=visited_at)
+        
+        assert visit.datetime_visited.replace(tzinfo=timezone.utc) == visited_at
+    
     def test_get_visits_by_url_nonexistent(self, db_session):
         repo = VisitRepository(db_session)
         visits, total = repo.get_visits_by_url("https://nonexistent.com")
@@ -112,21 +346,21 @@ class TestVisitRepository:
     def test_get_visits_by_url_error_handling(self, db_session):
         repo = VisitRepository(db_session)
         
-        with patch.object(db_session, 'query', side_effect=SQLAlchemyError("DB Error")):
+        with patch.object(db_session, 'execute', side_effect=SQLAlchemyError("DB Error")):
             with pytest.raises(SQLAlchemyError):
                 repo.get_visits_by_url("https://example.com")
     
     def test_get_latest_visit_error_handling(self, db_session):
         repo = VisitRepository(db_session)
         
-        with patch.object(db_session, 'query', side_effect=SQLAlchemyError("DB Error")):
+        with patch.object(db_session, 'execute', side_effect=SQLAlchemyError("DB Error")):
             with pytest.raises(SQLAlchemyError):
                 repo.get_latest_visit_by_url("https://example.com")
     
     def test_get_metrics_error_handling(self, db_session):
         repo = VisitRepository(db_session)
         
-        with patch.object(db_session, 'query', side_effect=SQLAlchemyError("DB Error")):
+        with patch.object(db_session, 'execute', side_effect=SQLAlchemyError("DB Error")):
             with pytest.raises(SQLAlchemyError):
                 repo.get_metrics_by_url("https://example.com")
     
@@ -138,10 +372,10 @@ class TestVisitRepository:
             with pytest.raises(SQLAlchemyError):
                 repo.bulk_create_visits(visits_data)
     
-    def test_get_or_create_url_error_handling(self, db_session):
+    def test_create_visit_insert_error_handling(self, db_session):
         repo = VisitRepository(db_session)
         
-        with patch.object(db_session, 'query', side_effect=SQLAlchemyError("DB Error")):
+        with patch.object(db_session, 'execute', side_effect=SQLAlchemyError("DB Error")):
             with pytest.raises(SQLAlchemyError):
-                repo._get_or_create_url("https://example.com")
+                repo.create_visit("https://example.com", "Test", None, 10, 500, 5)
 
@@ -0,0 +1,128 @@
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import select, text
+
+from core.scheduler import Job, Scheduler, maintenance_scheduler
+from models.visit import MaintenanceRun
+from tests.conftest import run
+from utils.metrics import maintenance_job_runs_total
+
+
+def outcome_count(job: str, outcome: str) -> float:
+    return maintenance_job_runs_total.collect().get((job, outcome), 0)
+
+
+class TestJob:
+    def test_lock_key_is_stable_per_name(self):
+        first = Job("analyze", lambda conn: None, 60, 5)
+        second = Job("analyze", lambda conn: None, 120, 5)
+        other = Job("prune", lambda conn: None, 60, 5)
+        
+        assert first.lock_key == second.lock_key
+        assert first.lock_key != other.lock_key
+        assert 0 <= first.lock_key < 2 ** 32
+
+
+class TestScheduler:
+    def test_next_delay_within_jitter(self, db_engine):
+        scheduler = Scheduler(lambda: db_engine, rng=random.Random(1))
+        job = Job("jittered", lambda conn: None, 100, 5, jitter=0.2)
+        
+        delays = [scheduler.next_delay(job) for _ in range(200)]
+        
+        assert all(80 <= delay <= 120 for delay in delays)
+        assert len(set(delays)) > 1
+    
+    def test_run_job_records_completion_and_skips_recent_runs(self, db_engine):
+        calls = []
+        scheduler = Scheduler(lambda: db_engine)
+        job = Job("recorded", lambda conn: calls.append(conn.execute(text("SELECT 1")).scalar()), 60, 5)
+        
+        assert run(scheduler.run_job(job)) == "ok"
+        assert run(scheduler.run_job(job)) == "skipped"
+        
+        assert calls == [1]
+        with db_engine.connect() as conn:
+            finished_at = conn.execute(select(MaintenanceRun.finished_at).where(MaintenanceRun.job == "recorded")).scalar()
+        assert finished_at is not None
+    
+    def test_run_job_again_after_half_an_interval(self, db_engine):
+        calls = []
+        scheduler = Scheduler(lambda: db_engine)
+        job = Job("frequent", lambda conn: calls.append(1), 0.02, 5)
+        
+        run(scheduler.run_job(job))
+        time.sleep(0.02)
+        run(scheduler.run_job(job))
+        
+        assert calls == [1, 1]
+    
+    def test_failed_job_is_counted_and_rolled_back(self, db_engine):
+        def fail(conn):
+            raise RuntimeError("boom")
+        
+        scheduler = Scheduler(lambda: db_engine)
+        before = outcome_count("failing", "error")
+        
+        assert run(scheduler.run_job(Job("failing", fail, 60, 5))) == "error"
+        
+        assert outcome_count("failing", "error") == before + 1
+        with db_engine.connect() as conn:
+            assert conn.execute(select(MaintenanceRun)).first() is None
+    
+    def test_slow_job_times_out(self, db_engine):
+        scheduler = Scheduler(lambda: db_engine)
+        job = Job("slow", lambda conn: time.sleep(0.3), 60, 0.05)
+        
+        assert run(scheduler.run_job(job)) == "timeout"
+    
+    def test_start_runs_jobs_until_stopped(self, db_engine):
+        calls = []
+        scheduler = Scheduler(lambda: db_engine)
+        scheduler.add(Job("looping", lambda conn: calls.append(1), 0.01, 5, jitter=0))
+        
+        async def main():
+            await scheduler.start()
+            await asyncio.sleep(0.1)
+            await scheduler.stop()
+        
+        run(main())
+        
+        assert len(calls) >= 2
+        assert scheduler._tasks == []
+
+
+class TestMaintenanceScheduler:
+    def settings(self, **overrides):
+        values = {
+            "maintenance_enabled": True,
+            "maintenance_timeout_seconds": 30.0,
+            "maintenance_jitter": 0.1,
+            "analyze_interval_seconds": 3600.0,
+            "sketch_backfill_interval_seconds": 60.0,
+            "prune_interval_seconds": 600.0,
+            "visit_retention_days": 0,
+            "prune_batch_size": 100,
+        }
+        return SimpleNamespace(**{**values, **overrides})
+    
+    def test_default_jobs(self, db_engine):
+        scheduler = maintenance_scheduler(lambda: db_engine, self.settings())
+        
+        assert [job.name for job in scheduler.jobs] == ["analyze", "backfill_sketches"]
+        assert scheduler.jobs[0].interval == 3600.0
+        assert run(scheduler.run_job(scheduler.jobs[1])) == "ok"
+    
+    def test_pruning_enabled_by_retention(self, db_engine):
+        scheduler = maintenance_scheduler(lambda: db_engine, self.settings(visit_retention_days=30))
+        
+        assert [job.name for job in scheduler.jobs] == ["analyze", "backfill_sketches", "prune_visits"]
+        assert run(scheduler.run_job(scheduler.jobs[2])) == "ok"
+    
+    def test_disabled(self, db_engine):
+        scheduler = maintenance_scheduler(lambda: db_engine, self.settings(maintenance_enabled=False))
+        
+        assert scheduler.jobs == []
@@ -1,7 +1,19 @@
+import json
+from datetime import datetime, timezone
+
 import pytest
-from pydantic import ValidationError
+from pydantic import TypeAdapter, ValidationError
 
-from api.schemas import VisitCreate, VisitResponse, PaginatedVisitResponse, BatchCreateResponse
+from api.schemas import (
+    VisitCreate,
+    VisitResponse,
+    PaginatedVisitResponse,
+    BatchCreateResponse,
+    history_columns,
+    BatchTooLargeError,
+    validate_visit_batch,
+)
+from models.visit import VisitRow
 
 
 class TestVisitCreate:
@@ -71,6 +83,115 @@ class TestPaginatedVisitResponse:
 
 class TestBatchCreateResponse:
     def test_batch_response(self):
-        response = BatchCreateResponse(created_count=5)
+        response = BatchCreateResponse(created_count=5, duplicate_count=2)
         assert response.created_count == 5
+        assert response.duplicate_count == 2
+
+
+
+class TestHistoryColumns:
+    rows = [
+        (2, datetime(2025, 6, 1, 12, 0, 1), "B", None, 1, 2, 3),
+        (1, datetime(2025, 6, 1, 12, 0, 0, tzinfo=timezone.utc), "A", "desc", 4, 5, 6),
+    ]
+
+    def test_transposes_rows(self):
+        columns = history_columns(self.rows)
+        assert columns["id"] == [2, 1]
+        assert columns["title"] == ["B", "A"]
+        assert columns["datetime_visited"] == ["2025-06-01T12:00:01+00:00", "2025-06-01T12:00:00+00:00"]
+        assert columns["image_count"] == [3, 6]
+
+    def test_epoch_millis(self):
+        columns = history_columns(self.rows, timestamps="epoch_ms")
+        assert columns["datetime_visited"] == [1748779201000, 1748779200000]
+
+    def test_empty(self):
+        assert all(values == [] for values in history_columns([]).values())
+
+
+class TestValidateVisitBatch:
+    model_adapter = TypeAdapter(list[VisitCreate])
+
+    def errors(self, call):
+        with pytest.raises(ValidationError) as exc_info:
+            call()
+        return [(e["loc"], e["type"], e["msg"], e.get("ctx")) for e in exc_info.value.errors()]
+
+    def test_rows_match_visit_create(self):
+        batch = [
+            {"url": "https://Example.com/page#frag", "title": "  A  <b>title</b>\n", "extra": 1},
+            {"url": "https://example.com/page", "client_visit_id": "6f1c2b9e-8a47-4f0e-9d8e-2b1f6c0a7e53",
+             "datetime_visited": "2025-06-01T12:00:00", "description": "x\x00y", "link_count": 3},
+            {"url": "https://example.com/page/#frag", "title": "  A  <b>title</b>\n"},
+        ]
+
+        rows = validate_visit_batch(json.dumps(batch))
+
+        expected = [
+            VisitRow(
+                str(visit.url),
+                str(visit.client_visit_id) if visit.client_visit_id else None,
+                visit.datetime_visited,
+                visit.title,
+                visit.description,
+                visit.link_count,
+                visit.word_count,
+                visit.image_count,
+            )
+            for visit in self.model_adapter.validate_python(batch)
+        ]
+        assert rows == expected
+        assert rows[0].url == "https://example.com/page"
+        assert rows[1].datetime_visited.tzinfo is timezone.utc
+
+    @pytest.mark.parametrize("batch", [
+        [{"url": "not-a-url"}],
+        [{"url": "https://ok.com"}, {"url": "ftp:/bad"}],
+        [{"url": "https://ok.com", "title": "x" * 501}],
+        [{"url": "https://ok.com", "link_count": -1, "word_count": "many"}],
+        [{"url": "https://ok.com", "client_visit_id": "nope"}],
+        [{"url": "https://ok.com", "datetime_visited": "yesterday"}],
+        [{"title": "missing url"}],
+        [{"url": 5}],
+        {"url": "https://not-a-list.com"},
+    ])
+    def test_errors_match_visit_create(self, batch):
+        body = json.dumps(batch)
+        assert self.errors(lambda: validate_visit_batch(body)) == \
+            self.errors(lambda: self.model_adapter.validate_json(body))
+
+    def test_future_times_clamped_to_now(self):
+        before = datetime.now(timezone.utc)
+        rows = validate_visit_batch(json.dumps([
+            {"url": "https://ok.com", "datetime_visited": "2999-01-01T00:00:00Z"},
+            {"url": "https://ok.com", "datetime_visited": "2025-06-01T12:00:00Z"},
+        ]))
+
+        assert before <= rows[0].datetime_visited <= datetime.now(timezone.utc)
+        assert rows[1].datetime_visited == datetime(2025, 6, 1, 12, tzinfo=timezone.utc)
+
+    def test_repeated_urls_normalized_once(self, monkeypatch):
+        calls = []
+        import api.schemas as schemas
+        original = schemas.normalize_url_value
+        monkeypatch.setattr(schemas, "normalize_url_value", lambda url: calls.append(url) or original(url))
+
+        rows = validate_visit_batch(json.dumps([{"url": "https://example.com/"}] * 50))
+
+        assert len(rows) == 50
+        assert len(calls) == 1
+
+    def test_item_limit(self):
+        body = json.dumps([{"url": "https://example.com"}] * 4)
+
+        assert len(validate_visit_batch(body, max_items=4)) == 4
+        with pytest.raises(BatchTooLargeError) as exc_info:
+            validate_visit_batch(body, max_items=3)
+        assert (exc_info.value.count, exc_info.value.max_items) == (4, 3)
+
+    def test_item_limit_takes_precedence_over_item_errors(self):
+        body = json.dumps([{"url": "not-a-url"}] * 4)
 
+        with pytest.raises(BatchTooLargeError):
+            validate_visit_batch(body, max_items=2)
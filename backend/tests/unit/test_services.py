@@ -1,4 +1,5 @@
 import pytest
+from unittest.mock import patch
 
 from repositories.visit_repository import VisitRepository
 from services.visit_service import VisitService
@@ -9,7 +10,7 @@ class TestVisitService:
         repo = VisitRepository(db_session)
         service = VisitService(repo)
         
-        visit = service.record_visit(
+        visit, created = service.record_visit(
             url="https://example.com",
             title="Test",
             description="Test description",
@@ -18,6 +19,7 @@ class TestVisitService:
             image_count=5
         )
         
+        assert created is True
         assert visit.id is not None
         assert visit.url == "https://example.com"
     
@@ -33,6 +35,55 @@ class TestVisitService:
         assert total == 2
         assert len(visits) == 2
     
+    def test_get_history_changes(self, db_session):
+        repo = VisitRepository(db_session)
+        service = VisitService(repo)
+        
+        first, _ = service.record_visit("https://example.com", "Test 1", None, 10, 500, 5)
+        second, _ = service.record_visit("https://example.com", "Test 2", None, 15, 600, 6)
+        
+        visits, total = service.get_history_changes("https://example.com", first.id)
+        
+        assert [visit.id for visit in visits] == [second.id]
+        assert total == 2
+    
+    def test_get_page_summary(self, db_session):
+        repo = VisitRepository(db_session)
+        service = VisitService(repo)
+        
+        service.record_visit("https://example.com", "Test 1", None, 10, 500, 5)
+        
+        rows, metrics = service.get_page_summary("https://example.com")
+        
+        assert len(rows) == 1
+        assert metrics["total_visits"] == 1
+    
+    def test_get_content_metrics_recomputed_only_after_writes(self, db_session):
+        repo = VisitRepository(db_session)
+        service = VisitService(repo)
+        service.record_visit("https://example.com", "Test 1", None, 10, 500, 5)
+        
+        with patch.object(repo, "get_content_columns", wraps=repo.get_content_columns) as columns:
+            first = service.get_content_metrics("https://example.com")
+            assert service.get_content_metrics("https://example.com") is first
+            assert columns.call_count == 1
+            
+            service.record_visit("https://example.com", "Test 2", None, 20, 600, 5)
+            metrics = service.get_content_metrics("https://example.com")
+            assert columns.call_count == 2
+        
+        assert metrics["total_visits"] == 2
+        assert metrics["word_count"]["change"] == 100
+        assert metrics["link_count"]["change_pct"] == 100.0
+    
+    def test_get_content_metrics_unknown_url(self, db_session):
+        service = VisitService(VisitRepository(db_session))
+        
+        metrics = service.get_content_metrics("https://nonexistent.com")
+        
+        assert metrics["total_visits"] == 0
+        assert metrics["word_count"] is None
+    
     def test_get_page_metrics(self, db_session):
         repo = VisitRepository(db_session)
         service = VisitService(repo)
@@ -55,7 +106,8 @@ class TestVisitService:
              "link_count": 15, "word_count": 600, "image_count": 6}
         ]
         
-        count = service.batch_record_visits(visits_data)
+        inserted, duplicates = service.batch_record_visits(visits_data)
         
-        assert count == 2
+        assert inserted == 2
+        assert duplicates == 0
 
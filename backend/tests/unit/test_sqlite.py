@@ -0,0 +1,137 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from core.config import Settings
+from core.health import HealthProber, health_prober
+from db.session import configure_engine, dispose_engine
+from db.sqlite import create_sqlite_engine
+from models.visit import Base
+from repositories.visit_repository import VisitRepository
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def engines(tmp_path):
+    url = make_url(f"sqlite:///{tmp_path / 'history.db'}")
+    settings = Settings(database_url=str(url), sqlite_mmap_size_mb=16, sqlite_cache_size_mb=8)
+    writer = create_sqlite_engine(url, settings)
+    reader = create_sqlite_engine(url, settings, readonly=True)
+    Base.metadata.create_all(writer)
+    yield writer, reader
+    reader.dispose()
+    writer.dispose()
+
+
+def pragma(conn, name: str):
+    return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+class TestSqliteEngine:
+    def test_pragmas_set_on_connect(self, engines):
+        writer, reader = engines
+
+        with writer.connect() as conn:
+            assert pragma(conn, "journal_mode") == "wal"
+            assert pragma(conn, "synchronous") == 1
+            assert pragma(conn, "busy_timeout") == 5000
+            assert pragma(conn, "cache_size") == -8 * 1024
+            assert pragma(conn, "mmap_size") == 16 * 1024 * 1024
+            assert pragma(conn, "query_only") == 0
+        with reader.connect() as conn:
+            assert pragma(conn, "query_only") == 1
+
+    def test_pools(self, engines):
+        writer, reader = engines
+
+        assert (writer.pool.size(), writer.pool._max_overflow) == (1, 0)
+        assert reader.pool.size() == Settings(database_url="sqlite:///x.db").db_pool_size
+
+    def test_reader_cannot_write(self, engines):
+        _, reader = engines
+
+        with pytest.raises(OperationalError, match="readonly"), reader.begin() as conn:
+            conn.execute(text("INSERT INTO urls (url) VALUES ('https://example.com')"))
+
+    def test_reads_proceed_during_write_transaction(self, engines):
+        writer, reader = engines
+
+        with writer.begin() as conn:
+            conn.execute(text("INSERT INTO urls (url) VALUES ('https://example.com')"))
+            with reader.connect() as read_conn:
+                assert read_conn.execute(text("SELECT count(*) FROM urls")).scalar() == 0
+        with reader.connect() as read_conn:
+            assert read_conn.execute(text("SELECT count(*) FROM urls")).scalar() == 1
+
+    def test_health_probe_does_not_wait_for_writer(self, engines):
+        writer, _ = engines
+        configure_engine(writer)
+        prober = HealthProber(health_prober.engine_factory, timeout=1.0)
+        try:
+            with writer.begin() as conn:
+                conn.execute(text("INSERT INTO urls (url) VALUES ('https://example.com')"))
+                result = asyncio.run(prober.refresh())
+        finally:
+            dispose_engine()
+
+        assert result.connected is True
+
+    def test_concurrent_writes_are_serialized(self, engines):
+        writer, reader = engines
+        sessions = sessionmaker(bind=writer)
+        errors = []
+
+        def record(index: int) -> None:
+            try:
+                with sessions() as session:
+                    for i in range(10):
+                        VisitRepository(session).create_visit(f"https://example.com/{index % 3}", None, None, i, i, i)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=record, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        with sessionmaker(bind=reader)() as session:
+            _, metrics = VisitRepository(session).get_summary_by_url("https://example.com/0")
+        assert metrics["total_visits"] == 30
+
+
+class TestSqliteMigrations:
+    def test_upgrade_head_matches_models(self, tmp_path):
+        database_url = f"sqlite:///{tmp_path / 'migrated.db'}"
+        env = {**os.environ, "DATABASE_URL": database_url}
+
+        result = subprocess.run(
+            [sys.executable, "-m", "alembic", "upgrade", "head"],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+        )
+
+        assert result.returncode == 0, result.stderr
+        with create_engine(database_url).connect() as conn:
+            tables = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'")).scalars())
+            indexes = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+        assert set(Base.metadata.tables) <= tables
+        assert "idx_url_id_datetime" in indexes
+
+    def test_downgrade_base_and_upgrade_again(self, tmp_path):
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'migrated.db'}"}
+
+        for args in (["upgrade", "head"], ["downgrade", "base"], ["upgrade", "head"]):
+            result = subprocess.run(
+                [sys.executable, "-m", "alembic", *args],
+                cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+            )
+            assert result.returncode == 0, result.stderr
@@ -1,22 +1,88 @@
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
+
 from pythonjsonlogger import jsonlogger
 
+from core.config import get_settings
+from utils.metrics import log_records_dropped_total
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+CALLER_FORMAT = " %(pathname)s %(lineno)d"
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Hands records to a background thread and never waits for it.
+
+    When the queue is full the record is counted in
+    ``log_records_dropped_total`` and discarded, so a slow stdout (a full
+    pipe, a stalled log shipper) costs log lines instead of request latency.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve what cannot cross threads (message args and the
+        # traceback); JSON encoding happens on the listener thread
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped_total.inc()
+
+
+class CallerlessLogger(logging.Logger):
+    """Skips logging's stack walk for the caller's pathname/lineno.
+
+    ``findCaller`` runs on every call, so loggers that do not print the
+    caller use this class; other loggers in the process are unaffected.
+    """
+
+    def findCaller(self, stack_info: bool = False, stacklevel: int = 1):
+        return "(unknown file)", 0, "(unknown function)", None
+
+
+def get_api_logger(caller_info: bool, name: str = "api") -> logging.Logger:
+    if caller_info:
+        return logging.getLogger(name)
+    manager = logging.Logger.manager
+    logger_class = manager.loggerClass
+    manager.setLoggerClass(CallerlessLogger)
+    try:
+        return logging.getLogger(name)
+    finally:
+        manager.loggerClass = logger_class
+
 
-def setup_logger():
-    logger = logging.getLogger("api")
+def setup_logger() -> tuple[logging.Logger, QueueListener]:
+    settings = get_settings()
+    logger = get_api_logger(settings.log_caller_info)
     logger.setLevel(logging.INFO)
 
     handler = logging.StreamHandler(sys.stdout)
     formatter = jsonlogger.JsonFormatter(
-        "%(asctime)s %(levelname)s %(name)s %(message)s %(pathname)s %(lineno)d",
+        LOG_FORMAT + (CALLER_FORMAT if settings.log_caller_info else ""),
         datefmt="%Y-%m-%d %H:%M:%S"
     )
     handler.setFormatter(formatter)
-    logger.addHandler(handler)
 
-    return logger
+    records: queue.Queue = queue.Queue(settings.log_queue_size)
+    listener = QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    # Flushes whatever is still queued when the process exits
+    atexit.register(listener.stop)
+    logger.addHandler(DroppingQueueHandler(records))
 
+    return logger, listener
 
-logger = setup_logger()
 
+logger, log_listener = setup_logger()
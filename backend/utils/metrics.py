@@ -0,0 +1,267 @@
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Iterable
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+class _ThreadShards:
+    """Per-thread storage so the hot path never takes a lock.
+
+    Each thread writes only to its own shard; readers merge all shards.
+    The lock is taken once per thread (on first use) and on collection.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._lock = threading.Lock()
+
+    def get(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]
+
+
+class _Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._shards = _ThreadShards()
+
+    def _key(self, labels: dict) -> tuple:
+        try:
+            if len(labels) == len(self.labelnames):
+                return tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError:
+            pass
+        raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+
+    def _format_labels(self, key: tuple, extra: tuple = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        lines.extend(self._render_samples())
+        return lines
+
+    @abstractmethod
+    def _render_samples(self) -> list[str]:
+        ...
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        shard = self._shards.get()
+        shard[key] = shard.get(key, 0) + amount
+
+    def collect(self) -> dict[tuple, float]:
+        totals: dict[tuple, float] = {}
+        for shard in self._shards.snapshot():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def _render_samples(self) -> list[str]:
+        return [
+            f"{self.name}{self._format_labels(key)} {_format_value(value)}"
+            for key, value in sorted(self.collect().items())
+        ]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        shard = self._shards.get()
+        state = shard.get(key)
+        if state is None:
+            # [per-bucket counts (last slot is +Inf), sum]
+            state = shard[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def collect(self) -> dict[tuple, tuple[list[int], float]]:
+        totals: dict[tuple, tuple[list[int], float]] = {}
+        for shard in self._shards.snapshot():
+            for key, (counts, total) in shard.items():
+                merged_counts, merged_sum = totals.get(key, ([0] * len(counts), 0.0))
+                totals[key] = (
+                    [a + b for a, b in zip(merged_counts, counts)],
+                    merged_sum + total,
+                )
+        return totals
+
+    def _render_samples(self) -> list[str]:
+        lines = []
+        for key, (counts, total) in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = _format_value(bound)
+                lines.append(
+                    f"{self.name}_bucket{self._format_labels(key, (('le', le),))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    "http_requests_total",
+    "Total HTTP requests processed.",
+    ("method", "route", "status"),
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency in seconds.",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being processed.",
+    ("method",),
+)
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request",
+    "Database statements executed per HTTP request.",
+    ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+rate_limit_rejections_total = registry.counter(
+    "rate_limit_rejections_total",
+    "Requests rejected by the rate limiter.",
+    ("route",),
+)
+db_read_routing_total = registry.counter(
+    "db_read_routing_total",
+    "Read-only sessions opened, by target database.",
+    ("target",),
+)
+maintenance_job_runs_total = registry.counter(
+    "maintenance_job_runs_total",
+    "Background maintenance job runs, by outcome (ok, skipped, timeout, error).",
+    ("job", "outcome"),
+)
+maintenance_job_duration_seconds = registry.histogram(
+    "maintenance_job_duration_seconds",
+    "Background maintenance job runtime in seconds.",
+    ("job",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+sse_subscribers = registry.gauge(
+    "sse_subscribers",
+    "Open visit event streams on this worker.",
+)
+sse_events_dropped_total = registry.counter(
+    "sse_events_dropped_total",
+    "Visit events discarded because a stream fell too far behind (replaced by a resync event).",
+)
+admission_active = registry.gauge(
+    "admission_active",
+    "Database-bound requests holding an admission slot.",
+    ("priority",),
+)
+admission_queued = registry.gauge(
+    "admission_queued",
+    "Database-bound requests waiting for an admission slot.",
+    ("priority",),
+)
+admission_wait_seconds = registry.histogram(
+    "admission_wait_seconds",
+    "Time admitted requests waited for a slot, in seconds.",
+    ("priority",),
+)
+admission_rejections_total = registry.counter(
+    "admission_rejections_total",
+    "Requests shed with 503 because the admission queue was full or the wait timed out.",
+    ("priority", "reason"),
+)
+content_metrics_cache_total = registry.counter(
+    "content_metrics_cache_total",
+    "Content metrics lookups, by whether the cached statistics were still current (hit) or recomputed (miss).",
+    ("result",),
+)
+log_records_dropped_total = registry.counter(
+    "log_records_dropped_total",
+    "Log records discarded because the log queue was full.",
+)
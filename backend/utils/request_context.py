@@ -0,0 +1,60 @@
+from contextvars import ContextVar, Token
+from typing import Optional
+
+
+class RequestStats:
+    """Mutable per-request counters shared with worker threads.
+
+    Sync routes run in the threadpool with a *copy* of the request context,
+    so the context variable holds a mutable object rather than a value.
+    """
+
+    __slots__ = ("db_queries", "db_time_ms", "statements", "has_slow_statement")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time_ms = 0.0
+        # statement text -> [count, total_ms]; only filled while query profiling is on
+        self.statements: dict[str, list] = {}
+        # Whether any single execution reached SLOW_QUERY_MS (query profiling only)
+        self.has_slow_statement = False
+
+    def record_statement(self, statement: str, duration_ms: float, slow: bool = False) -> None:
+        self.db_time_ms += duration_ms
+        self.has_slow_statement = self.has_slow_statement or slow
+        entry = self.statements.get(statement)
+        if entry is None:
+            self.statements[statement] = [1, duration_ms]
+        else:
+            entry[0] += 1
+            entry[1] += duration_ms
+
+    def slowest_statements(self, limit: int = 5) -> list[dict]:
+        ranked = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)
+        return [
+            {"statement": statement[:200], "count": count, "total_ms": round(total_ms, 2)}
+            for statement, (count, total_ms) in ranked[:limit]
+        ]
+
+    def repeated_statements(self, threshold: int) -> list[dict]:
+        return [
+            {"statement": statement[:200], "count": count}
+            for statement, (count, _) in self.statements.items()
+            if count > threshold
+        ]
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def begin_request_stats() -> tuple[RequestStats, Token]:
+    stats = RequestStats()
+    return stats, _request_stats.set(stats)
+
+
+def end_request_stats(token: Token) -> None:
+    _request_stats.reset(token)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
@@ -20,12 +20,47 @@ export interface PaginatedVisits {
     has_more: boolean;
 }
 
+export interface VisitChanges {
+    items: Visit[];
+    total: number;
+    since_id: number;
+    has_more: boolean;
+    reset: boolean;
+}
+
 export interface Metrics {
     total_visits: number;
+    distinct_days?: number | null;
+    distinct_clients?: number | null;
+    distinct_error?: number;
+}
+
+export interface VisitEvent {
+    type: 'visits';
+    url: string;
+    count: number;
+    visit: Visit | null;
+}
+
+export interface VisitStreamHandlers {
+    onVisits: (event: VisitEvent) => void;
+    onMetrics: (metrics: Metrics) => void;
+    onResync: () => void;
+    onOpen?: () => void;
+    onError?: () => void;
+}
+
+export interface PageSummary {
+    url: string;
+    latest_visit: Visit | null;
+    metrics: Metrics;
+    history: PaginatedVisits;
 }
 
 export interface VisitCreate {
     url: string;
+    client_visit_id?: string;
+    datetime_visited?: string;
     title?: string | null;
     description?: string | null;
     link_count: number;
@@ -81,11 +116,46 @@ export const visitApi = {
         return response.data;
     },
 
+    getHistoryChanges: async (url: string, since_id: number, limit: number = 100): Promise<VisitChanges> => {
+        const response = await apiClient.get<VisitChanges>('/visits/history/changes', {
+            params: {url, since_id, limit},
+        });
+        return response.data;
+    },
+
     getMetrics: async (url: string): Promise<Metrics> => {
         const response = await apiClient.get<Metrics>('/visits/metrics', {
             params: {url},
         });
         return response.data;
     },
+
+    getSummary: async (url: string, page_size: number = 10): Promise<PageSummary> => {
+        const response = await apiClient.get<PageSummary>('/visits/summary', {
+            params: {url, page_size},
+        });
+        return response.data;
+    },
+
+    streamUrl: (url: string): string => {
+        return `${config.apiBaseUrl}/visits/stream?${new URLSearchParams({url})}`;
+    },
+
+    // Returns null where EventSource is unavailable; callers keep refetching on their own then
+    subscribe: (url: string, handlers: VisitStreamHandlers): EventSource | null => {
+        if (typeof EventSource === 'undefined') return null;
+
+        const source = new EventSource(visitApi.streamUrl(url));
+        source.addEventListener('visits', (event) => {
+            handlers.onVisits(JSON.parse((event as MessageEvent).data));
+        });
+        source.addEventListener('metrics', (event) => {
+            handlers.onMetrics(JSON.parse((event as MessageEvent).data));
+        });
+        source.addEventListener('resync', () => handlers.onResync());
+        source.onopen = () => handlers.onOpen?.();
+        source.onerror = () => handlers.onError?.();
+        return source;
+    },
 };
 
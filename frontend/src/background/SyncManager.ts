@@ -1,5 +1,6 @@
 import axios from 'axios';
 import { BackoffCalculator } from './BackoffCalculator';
+import { visitQueue } from '../utils/visitQueue';
 
 export interface SyncState {
     failureCount: number;
@@ -14,6 +15,42 @@ export interface SyncConfig {
     isDev: boolean;
 }
 
+// Batches smaller than this are sent as plain JSON; gzip would barely help
+export const COMPRESSION_THRESHOLD_BYTES = 1024;
+
+// Stays well under the server's BATCH_MAX_ITEMS so a long offline backlog is never rejected
+export const MAX_BATCH_SIZE = 1000;
+
+// Used when a 429 carries no usable Retry-After: the batch limit's one-minute window
+export const DEFAULT_RETRY_AFTER_MS = 60 * 1000;
+
+/** Milliseconds to wait according to a Retry-After header (seconds or an HTTP date). */
+export function parseRetryAfter(value: unknown, now = Date.now()): number | null {
+    if (typeof value !== 'string' || value.trim() === '') return null;
+    const seconds = Number(value);
+    if (Number.isFinite(seconds)) return Math.max(0, seconds * 1000);
+    const date = Date.parse(value);
+    return Number.isNaN(date) ? null : Math.max(0, date - now);
+}
+
+/**
+ * Gzip large batches when the runtime supports CompressionStream.
+ * Queued visits repeat the same URLs and descriptions, so they shrink well.
+ */
+export async function encodeBatch(
+    visits: unknown[]
+): Promise<{ body: unknown; headers: Record<string, string> }> {
+    const json = JSON.stringify(visits);
+    if (typeof CompressionStream === 'undefined' || json.length < COMPRESSION_THRESHOLD_BYTES) {
+        return { body: visits, headers: { 'Content-Type': 'application/json' } };
+    }
+    const stream = new Blob([json]).stream().pipeThrough(new CompressionStream('gzip'));
+    return {
+        body: await new Response(stream).arrayBuffer(),
+        headers: { 'Content-Type': 'application/json', 'Content-Encoding': 'gzip' },
+    };
+}
+
 export class SyncManager {
     private state: SyncState = {
         failureCount: 0,
@@ -33,9 +70,9 @@ export class SyncManager {
         const now = Date.now();
         this.state.lastSyncAttempt = now;
 
-        const { visitQueue = [] } = await chrome.storage.local.get(['visitQueue']);
+        let queue: any[] = await visitQueue.getAll();
 
-        if (visitQueue.length === 0) {
+        if (queue.length === 0) {
             if (this.state.failureCount > 0) {
                 this.resetState();
             }
@@ -47,20 +84,60 @@ export class SyncManager {
         }
 
         try {
-            const visits = visitQueue.map(({ timestamp, ...v }: any) => v);
-            await axios.post(`${this.config.apiBaseUrl}/visits/batch`, visits, {
-                headers: { 'Content-Type': 'application/json' },
-                timeout: this.config.apiTimeout,
-            });
+            // Visits queued before client ids existed get one now, persisted so retries reuse it
+            if (queue.some((v: any) => !v.client_visit_id)) {
+                queue = queue.map((v: any) =>
+                    v.client_visit_id ? v : { ...v, client_visit_id: crypto.randomUUID() }
+                );
+                await chrome.storage.local.set({ visitQueue: queue });
+            }
+
+            // Sent in slices from the front of the queue. Each slice is removed
+            // once the server has it, so a retry resumes after the last saved
+            // slice; visits queued meanwhile stay behind it for the next sync.
+            for (let start = 0; start < queue.length; start += MAX_BATCH_SIZE) {
+                const slice = queue.slice(start, start + MAX_BATCH_SIZE);
+                const { body, headers } = await encodeBatch(
+                    slice.map(({ timestamp, ...v }: any) => ({
+                        ...v,
+                        datetime_visited: new Date(timestamp).toISOString(),
+                    }))
+                );
+                await axios.post(`${this.config.apiBaseUrl}/visits/batch`, body, {
+                    headers,
+                    timeout: this.config.apiTimeout,
+                });
+                await visitQueue.clear(slice.length);
+            }
 
-            await chrome.storage.local.remove(['visitQueue']);
             this.resetState();
 
             chrome.runtime.sendMessage({ type: 'QUEUE_SYNCED' }, () => {
                 if (chrome.runtime.lastError) return;
             });
         } catch (err) {
-            this.handleSyncFailure(err);
+            const response = (err as { response?: { status?: number; headers?: Record<string, unknown> } })
+                ?.response;
+            if (response?.status === 429) {
+                this.handleRateLimited(response.headers?.['retry-after']);
+            } else {
+                this.handleSyncFailure(err);
+            }
+        }
+    }
+
+    /**
+     * A rate-limited sync is not a failure: nothing is wrong with the queue or
+     * the server, so it waits as long as asked without using up a retry.
+     */
+    private handleRateLimited(retryAfter: unknown): void {
+        this.state.currentInterval = Math.max(
+            parseRetryAfter(retryAfter) ?? DEFAULT_RETRY_AFTER_MS,
+            this.backoffCalculator.calculateInterval(this.state.failureCount)
+        );
+
+        if (this.config.isDev) {
+            console.warn(`Background sync rate limited. Next retry in ${this.state.currentInterval / 1000}s`);
         }
     }
 
@@ -1,7 +1,7 @@
-import {useEffect, useState} from 'react';
-import {useQuery, useInfiniteQuery, useQueryClient} from '@tanstack/react-query';
+import {useEffect, useRef, useState} from 'react';
+import {useQuery, useInfiniteQuery, useQueryClient, InfiniteData} from '@tanstack/react-query';
 import {useStore} from '../store/useStore';
-import {visitApi, Visit} from '../api/client';
+import {visitApi, Visit, PaginatedVisits} from '../api/client';
 import {visitQueue} from '../utils/visitQueue';
 import {urlRateLimiter} from '../utils/rateLimiter';
 import MetricsCard from './components/MetricsCard';
@@ -15,6 +15,8 @@ function App() {
     const [initialized, setInitialized] = useState(false);
     const [queuedVisits, setQueuedVisits] = useState<Visit[]>([]);
     const [queueCount, setQueueCount] = useState(0);
+    const queueCountRef = useRef(0);
+    const streamOpenRef = useRef(false);
     const queryClient = useQueryClient();
 
     const loadQueuedVisits = async () => {
@@ -31,22 +33,79 @@ function App() {
             word_count: v.word_count,
             image_count: v.image_count,
         })));
+        queueCountRef.current = queued.length;
         setQueueCount(queued.length);
     };
 
+    // Prepends visits recorded since the newest loaded one instead of refetching every loaded page
+    const syncHistory = async (url: string) => {
+        const key = ['history', url];
+        const cached = queryClient.getQueryData<InfiniteData<PaginatedVisits>>(key);
+        const newest = cached?.pages[0]?.items[0];
+        if (!cached || !newest) {
+            queryClient.invalidateQueries({queryKey: key});
+            return;
+        }
+
+        try {
+            const changes = await visitApi.getHistoryChanges(url, newest.id);
+            // Visits dated before the watermark (or pruned ones) only show up in the total
+            if (changes.reset || changes.has_more || changes.total !== cached.pages[0].total + changes.items.length) {
+                queryClient.invalidateQueries({queryKey: key});
+                return;
+            }
+            if (changes.items.length === 0) return;
+
+            const added = [...changes.items].reverse();
+            queryClient.setQueryData<InfiniteData<PaginatedVisits>>(key, (old) => old && {
+                ...old,
+                pages: old.pages.map((page, index) => ({
+                    ...page,
+                    items: index === 0 ? [...added, ...page.items] : page.items,
+                    total: changes.total,
+                })),
+            });
+        } catch {
+            queryClient.invalidateQueries({queryKey: key});
+        }
+    };
+
     const triggerManualSync = () => {
         chrome.runtime.sendMessage({type: 'SYNC_QUEUE'}, () => {
             if (chrome.runtime.lastError) return;
         });
     };
 
+    const pageEnabled = !!currentUrl && currentUrl !== '' && !currentUrl.startsWith('chrome://') && initialized;
+
+    // One request per tab switch: the summary seeds the metrics and first history page queries
+    const {isFetched: summaryFetched} = useQuery({
+        queryKey: ['summary', currentUrl],
+        queryFn: async () => {
+            const summary = await visitApi.getSummary(currentUrl!, 10);
+            const queued = queueCountRef.current;
+            queryClient.setQueryData(
+                ['metrics', currentUrl, queued],
+                {...summary.metrics, total_visits: summary.metrics.total_visits + queued}
+            );
+            queryClient.setQueryData<InfiniteData<PaginatedVisits>>(
+                ['history', currentUrl],
+                {pages: [summary.history], pageParams: [1]}
+            );
+            return summary;
+        },
+        enabled: pageEnabled,
+        retry: false,
+    });
+
     const {data: metricsData} = useQuery({
         queryKey: ['metrics', currentUrl, queueCount],
         queryFn: async () => {
             const data = await visitApi.getMetrics(currentUrl!);
-            return {total_visits: data.total_visits + queueCount};
+            return {...data, total_visits: data.total_visits + queueCount};
         },
-        enabled: !!currentUrl && currentUrl !== '' && !currentUrl.startsWith('chrome://') && initialized,
+        // If the summary failed, these fetch on their own
+        enabled: pageEnabled && summaryFetched,
     });
 
     const {
@@ -59,7 +118,7 @@ function App() {
     } = useInfiniteQuery({
         queryKey: ['history', currentUrl],
         queryFn: ({pageParam = 1}) => visitApi.getHistory(currentUrl!, pageParam, 10),
-        enabled: !!currentUrl && currentUrl !== '' && !currentUrl.startsWith('chrome://') && initialized,
+        enabled: pageEnabled && summaryFetched,
         getNextPageParam: (lastPage) => lastPage.has_more ? lastPage.page + 1 : undefined,
         initialPageParam: 1,
     });
@@ -70,6 +129,44 @@ function App() {
         }
     }, [currentUrl, initialized]);
 
+    useEffect(() => {
+        if (!currentUrl || currentUrl.startsWith('chrome://') || !initialized) return;
+
+        const refetch = () => {
+            queryClient.invalidateQueries({queryKey: ['history', currentUrl]});
+            queryClient.invalidateQueries({queryKey: ['metrics', currentUrl]});
+        };
+        let reconnecting = false;
+        const source = visitApi.subscribe(currentUrl, {
+            onVisits: () => {
+                syncHistory(currentUrl);
+                loadQueuedVisits();
+            },
+            onMetrics: (metrics) => {
+                const queued = queueCountRef.current;
+                queryClient.setQueryData(
+                    ['metrics', currentUrl, queued],
+                    {...metrics, total_visits: metrics.total_visits + queued}
+                );
+            },
+            onResync: refetch,
+            onOpen: () => {
+                // Metrics arrive on connect; history sent while reconnecting was missed
+                if (reconnecting) syncHistory(currentUrl);
+                streamOpenRef.current = true;
+            },
+            onError: () => {
+                reconnecting = true;
+                streamOpenRef.current = false;
+            },
+        });
+
+        return () => {
+            streamOpenRef.current = false;
+            source?.close();
+        };
+    }, [currentUrl, initialized]);
+
     useEffect(() => {
         const loadCurrentTab = async () => {
             const [tab] = await chrome.tabs.query({active: true, currentWindow: true});
@@ -90,8 +187,12 @@ function App() {
 
         const messageListener = async (message: any) => {
             if (message.type === 'QUEUE_SYNCED') {
-                queryClient.invalidateQueries({queryKey: ['history']});
-                queryClient.invalidateQueries({queryKey: ['metrics']});
+                // An open stream delivers the synced visits itself
+                const latestUrl = useStore.getState().currentUrl;
+                if (!streamOpenRef.current && latestUrl) {
+                    await syncHistory(latestUrl);
+                    queryClient.invalidateQueries({queryKey: ['metrics']});
+                }
                 await loadQueuedVisits();
                 return;
             }
@@ -153,9 +254,12 @@ function App() {
         };
     }, []);
 
-    const backendHistory = historyData?.pages.flatMap((page) => page.items) ?? [];
+    // Prepended visits shift later pages, so a page loaded afterwards can repeat a few of them
+    const seen = new Set<number>();
+    const backendHistory = (historyData?.pages.flatMap((page) => page.items) ?? [])
+        .filter((visit) => !seen.has(visit.id) && !!seen.add(visit.id));
     const allHistory = [...queuedVisits, ...backendHistory];
-    const isLoading = historyLoading;
+    const isLoading = historyLoading || (pageEnabled && !summaryFetched);
     const error = historyError?.message;
 
     if (!initialized) {
@@ -1,10 +1,43 @@
 import { describe, it, expect, vi, beforeEach, afterEach } from 'vitest';
-import { SyncManager } from '../../background/SyncManager';
+import {
+    SyncManager,
+    encodeBatch,
+    parseRetryAfter,
+    COMPRESSION_THRESHOLD_BYTES,
+    DEFAULT_RETRY_AFTER_MS,
+    MAX_BATCH_SIZE,
+} from '../../background/SyncManager';
 import { BackoffCalculator } from '../../background/BackoffCalculator';
 import axios from 'axios';
 
 vi.mock('axios');
 
+/** Back chrome.storage.local with a real queue so slices saved mid-sync can be inspected. */
+function useStoredQueue(initial: any[]): { queue: any[] } {
+    const store = { queue: initial };
+    vi.spyOn(chrome.storage.local, 'get').mockImplementation(
+        (() => Promise.resolve({ visitQueue: store.queue })) as any
+    );
+    vi.spyOn(chrome.storage.local, 'set').mockImplementation((async (items: any) => {
+        store.queue = items.visitQueue;
+    }) as any);
+    return store;
+}
+
+function queuedVisits(count: number): any[] {
+    return Array.from({ length: count }, (_, i) => ({
+        url: `https://example.com/${i}`,
+        client_visit_id: `id-${i}`,
+        timestamp: 12345,
+    }));
+}
+
+function rateLimited(retryAfter?: string) {
+    return Object.assign(new Error('Request failed with status code 429'), {
+        response: { status: 429, headers: retryAfter === undefined ? {} : { 'retry-after': retryAfter } },
+    });
+}
+
 describe('SyncManager', () => {
     let syncManager: SyncManager;
     let backoffCalculator: BackoffCalculator;
@@ -35,10 +68,7 @@ describe('SyncManager', () => {
                 { url: 'https://test.com', title: 'Test 2', timestamp: Date.now() },
             ];
 
-            vi.spyOn(chrome.storage.local, 'get')
-                .mockResolvedValue({ visitQueue: mockVisits });
-            vi.spyOn(chrome.storage.local, 'remove')
-                .mockResolvedValue(undefined);
+            const store = useStoredQueue(mockVisits);
             vi.mocked(axios.post).mockResolvedValue({ data: 'success' });
 
             await syncManager.syncQueuedVisits();
@@ -54,10 +84,23 @@ describe('SyncManager', () => {
                     timeout: 10000,
                 })
             );
-            expect(chrome.storage.local.remove).toHaveBeenCalledWith(['visitQueue']);
+            expect(store.queue).toEqual([]);
             expect(syncManager.getFailureCount()).toBe(0);
         });
 
+        it('should keep visits queued while the sync was running', async () => {
+            const store = useStoredQueue(queuedVisits(2));
+            const lateVisit = { url: 'https://late.com', client_visit_id: 'late', timestamp: 12345 };
+            vi.mocked(axios.post).mockImplementation(async () => {
+                store.queue = [...store.queue, lateVisit];
+                return { data: 'ok' };
+            });
+
+            await syncManager.syncQueuedVisits();
+
+            expect(store.queue).toEqual([lateVisit]);
+        });
+
         it('should not sync when queue is empty', async () => {
             vi.spyOn(chrome.storage.local, 'get')
                 .mockResolvedValue({ visitQueue: [] });
@@ -146,9 +189,9 @@ describe('SyncManager', () => {
             );
         });
 
-        it('should strip timestamp from visits before sending', async () => {
+        it('should send the original visit time instead of the queue timestamp', async () => {
             const mockVisits = [
-                { url: 'https://strip.com', title: 'Strip', timestamp: 12345 },
+                { url: 'https://strip.com', title: 'Strip', client_visit_id: 'id-1', timestamp: 12345 },
             ];
 
             vi.spyOn(chrome.storage.local, 'get')
@@ -161,12 +204,155 @@ describe('SyncManager', () => {
 
             expect(axios.post).toHaveBeenCalledWith(
                 expect.any(String),
-                expect.not.arrayContaining([
-                    expect.objectContaining({ timestamp: expect.anything() })
-                ]),
+                [
+                    {
+                        url: 'https://strip.com',
+                        title: 'Strip',
+                        client_visit_id: 'id-1',
+                        datetime_visited: new Date(12345).toISOString(),
+                    },
+                ],
                 expect.any(Object)
             );
         });
+
+        it('should persist client ids for legacy queue items before sending', async () => {
+            const mockVisits = [{ url: 'https://legacy.com', timestamp: 12345 }];
+
+            vi.spyOn(chrome.storage.local, 'get')
+                .mockResolvedValue({ visitQueue: mockVisits });
+            const setSpy = vi.spyOn(chrome.storage.local, 'set')
+                .mockResolvedValue(undefined);
+            vi.spyOn(chrome.storage.local, 'remove')
+                .mockResolvedValue(undefined);
+            vi.mocked(axios.post).mockRejectedValue(new Error('timeout'));
+
+            await syncManager.syncQueuedVisits();
+
+            const savedQueue = (setSpy.mock.calls[0][0] as any).visitQueue;
+            const sent = vi.mocked(axios.post).mock.calls[0][1] as any[];
+            expect(savedQueue[0].client_visit_id).toEqual(expect.any(String));
+            expect(sent[0].client_visit_id).toBe(savedQueue[0].client_visit_id);
+        });
+    });
+
+    describe('large queues', () => {
+        it('should send the queue in slices of at most MAX_BATCH_SIZE', async () => {
+            const store = useStoredQueue(queuedVisits(MAX_BATCH_SIZE * 2 + 5));
+            vi.mocked(axios.post).mockResolvedValue({ data: 'ok' });
+            const original = globalThis.CompressionStream;
+            // Keep bodies as plain arrays so the slice sizes can be inspected
+            (globalThis as any).CompressionStream = undefined;
+
+            try {
+                await syncManager.syncQueuedVisits();
+            } finally {
+                (globalThis as any).CompressionStream = original;
+            }
+
+            const sizes = vi.mocked(axios.post).mock.calls.map((call) => (call[1] as any[]).length);
+            expect(sizes).toEqual([MAX_BATCH_SIZE, MAX_BATCH_SIZE, 5]);
+            expect(store.queue).toEqual([]);
+        });
+
+        it('should resume after the last saved slice when a later slice fails', async () => {
+            const visits = queuedVisits(MAX_BATCH_SIZE + 1);
+            const store = useStoredQueue(visits);
+            vi.mocked(axios.post)
+                .mockResolvedValueOnce({ data: 'ok' })
+                .mockRejectedValueOnce(new Error('Network error'));
+
+            await syncManager.syncQueuedVisits();
+
+            expect(axios.post).toHaveBeenCalledTimes(2);
+            expect(store.queue).toEqual([visits[MAX_BATCH_SIZE]]);
+            expect(syncManager.getFailureCount()).toBe(1);
+
+            vi.mocked(axios.post).mockClear().mockResolvedValue({ data: 'ok' });
+            await syncManager.syncQueuedVisits();
+
+            expect(axios.post).toHaveBeenCalledTimes(1);
+            expect(vi.mocked(axios.post).mock.calls[0][1]).toEqual([
+                expect.objectContaining({ client_visit_id: `id-${MAX_BATCH_SIZE}` }),
+            ]);
+            expect(store.queue).toEqual([]);
+        });
+    });
+
+    describe('rate limiting', () => {
+        it('should stop and wait for Retry-After without counting a failure', async () => {
+            const visits = queuedVisits(MAX_BATCH_SIZE * 3);
+            const store = useStoredQueue(visits);
+            vi.mocked(axios.post)
+                .mockResolvedValueOnce({ data: 'ok' })
+                .mockRejectedValueOnce(rateLimited('120'));
+
+            await syncManager.syncQueuedVisits();
+
+            expect(axios.post).toHaveBeenCalledTimes(2);
+            expect(store.queue).toEqual(visits.slice(MAX_BATCH_SIZE));
+            expect(syncManager.getFailureCount()).toBe(0);
+            expect(syncManager.getCurrentInterval()).toBe(120000);
+        });
+
+        it('should wait a full rate limit window without Retry-After', async () => {
+            useStoredQueue(queuedVisits(1));
+            vi.mocked(axios.post).mockRejectedValue(rateLimited());
+
+            for (let i = 0; i < 10; i++) {
+                await syncManager.syncQueuedVisits();
+            }
+
+            expect(axios.post).toHaveBeenCalledTimes(10);
+            expect(syncManager.getFailureCount()).toBe(0);
+            expect(syncManager.getCurrentInterval()).toBe(DEFAULT_RETRY_AFTER_MS);
+        });
+    });
+
+    describe('parseRetryAfter', () => {
+        it('should accept seconds and HTTP dates', () => {
+            const now = Date.parse('2025-06-01T12:00:00Z');
+
+            expect(parseRetryAfter('30', now)).toBe(30000);
+            expect(parseRetryAfter('Sun, 01 Jun 2025 12:01:00 GMT', now)).toBe(60000);
+            expect(parseRetryAfter('Sun, 01 Jun 2025 11:00:00 GMT', now)).toBe(0);
+        });
+
+        it('should ignore missing or invalid values', () => {
+            expect(parseRetryAfter(undefined)).toBeNull();
+            expect(parseRetryAfter('')).toBeNull();
+            expect(parseRetryAfter('soon')).toBeNull();
+        });
+    });
+
+    describe('encodeBatch', () => {
+        it('should send small batches as plain JSON', async () => {
+            const visits = [{ url: 'https://example.com' }];
+
+            const { body, headers } = await encodeBatch(visits);
+
+            expect(body).toBe(visits);
+            expect(headers).toEqual({ 'Content-Type': 'application/json' });
+        });
+
+        it.skipIf(typeof CompressionStream === 'undefined')(
+            'should gzip large batches',
+            async () => {
+                const visits = Array.from({ length: 50 }, (_, i) => ({
+                    url: 'https://example.com/article',
+                    description: `Repeated description ${i}`,
+                }));
+                expect(JSON.stringify(visits).length).toBeGreaterThan(COMPRESSION_THRESHOLD_BYTES);
+
+                const { body, headers } = await encodeBatch(visits);
+
+                expect(headers['Content-Encoding']).toBe('gzip');
+                const decoded = await new Response(
+                    new Blob([body as ArrayBuffer]).stream().pipeThrough(new DecompressionStream('gzip'))
+                ).text();
+                expect(JSON.parse(decoded)).toEqual(visits);
+            }
+        );
     });
 
     describe('scheduleNextSync', () => {
@@ -1,7 +1,7 @@
-import { describe, it, expect, beforeAll, afterAll, afterEach } from 'vitest';
+import { describe, it, expect, beforeAll, afterAll, afterEach, vi } from 'vitest';
 import { http, HttpResponse } from 'msw';
 import { setupServer } from 'msw/node';
-import { visitApi, Visit, PaginatedVisits, Metrics } from '../../api/client';
+import { visitApi, Visit, PaginatedVisits, Metrics, PageSummary, VisitChanges } from '../../api/client';
 
 const API_BASE_URL = 'http://localhost:8000/api/v1';
 
@@ -158,6 +158,68 @@ describe('visitApi', () => {
     });
   });
 
+  describe('getSummary', () => {
+    it('should fetch the page summary', async () => {
+      const mockSummary: PageSummary = {
+        url: 'https://example.com',
+        latest_visit: null,
+        metrics: { total_visits: 0 },
+        history: { items: [], total: 0, page: 1, page_size: 10, has_more: false },
+      };
+
+      server.use(
+        http.get(`${API_BASE_URL}/visits/summary`, ({ request }) => {
+          const url = new URL(request.url);
+          expect(url.searchParams.get('url')).toBe('https://example.com');
+          expect(url.searchParams.get('page_size')).toBe('10');
+
+          return HttpResponse.json({
+            success: true,
+            message: 'Success',
+            data: mockSummary,
+            status_code: 200,
+          });
+        })
+      );
+
+      const result = await visitApi.getSummary('https://example.com');
+
+      expect(result).toEqual(mockSummary);
+    });
+  });
+
+  describe('getHistoryChanges', () => {
+    it('should request changes after the watermark', async () => {
+      const mockChanges: VisitChanges = {
+        items: [],
+        total: 3,
+        since_id: 42,
+        has_more: false,
+        reset: false,
+      };
+
+      server.use(
+        http.get(`${API_BASE_URL}/visits/history/changes`, ({ request }) => {
+          const url = new URL(request.url);
+          expect(url.searchParams.get('url')).toBe('https://example.com');
+          expect(url.searchParams.get('since_id')).toBe('42');
+          expect(url.searchParams.get('limit')).toBe('100');
+
+          return HttpResponse.json({
+            success: true,
+            message: 'Success',
+            data: mockChanges,
+            status_code: 200,
+          });
+        })
+      );
+
+      const result = await visitApi.getHistoryChanges('https://example.com', 42);
+
+      expect(result).toEqual(mockChanges);
+    });
+  });
+
   describe('getMetrics', () => {
     it('should fetch metrics successfully', async () => {
       const mockMetrics: Metrics = {
@@ -243,6 +305,65 @@ describe('visitApi', () => {
     });
   });
 
+  describe('subscribe', () => {
+    class FakeEventSource {
+      static last: FakeEventSource;
+      listeners: Record<string, (event: MessageEvent) => void> = {};
+      onopen: (() => void) | null = null;
+      onerror: (() => void) | null = null;
+      close = vi.fn();
+
+      constructor(public url: string) {
+        FakeEventSource.last = this;
+      }
+
+      addEventListener(type: string, listener: (event: MessageEvent) => void) {
+        this.listeners[type] = listener;
+      }
+
+      emit(type: string, data: unknown) {
+        this.listeners[type](new MessageEvent(type, { data: JSON.stringify(data) }));
+      }
+    }
+
+    afterEach(() => vi.unstubAllGlobals());
+
+    it('should return null without EventSource support', () => {
+      vi.stubGlobal('EventSource', undefined);
+
+      const source = visitApi.subscribe('https://example.com', {
+        onVisits: vi.fn(),
+        onMetrics: vi.fn(),
+        onResync: vi.fn(),
+      });
+
+      expect(source).toBeNull();
+    });
+
+    it('should dispatch stream events to handlers', () => {
+      vi.stubGlobal('EventSource', FakeEventSource);
+      const handlers = {
+        onVisits: vi.fn(),
+        onMetrics: vi.fn(),
+        onResync: vi.fn(),
+        onOpen: vi.fn(),
+      };
+
+      visitApi.subscribe('https://example.com/a?b=1', handlers);
+      const source = FakeEventSource.last;
+      source.onopen?.();
+      source.emit('visits', { type: 'visits', url: 'https://example.com/a?b=1', count: 2, visit: null });
+      source.emit('metrics', { total_visits: 4 });
+      source.emit('resync', { type: 'resync', url: 'https://example.com/a?b=1' });
+
+      expect(source.url).toBe(`${API_BASE_URL}/visits/stream?url=https%3A%2F%2Fexample.com%2Fa%3Fb%3D1`);
+      expect(handlers.onOpen).toHaveBeenCalled();
+      expect(handlers.onVisits).toHaveBeenCalledWith(expect.objectContaining({ count: 2 }));
+      expect(handlers.onMetrics).toHaveBeenCalledWith({ total_visits: 4 });
+      expect(handlers.onResync).toHaveBeenCalled();
+    });
+  });
+
   describe('response interceptor', () => {
     it('should extract data from successful response', async () => {
       server.use(
@@ -57,6 +57,22 @@ describe('visitQueue', () => {
       expect(savedQueue[0].timestamp).toBeGreaterThanOrEqual(beforeAdd);
     });
 
+    it('should give each visit a unique client id', async () => {
+      let savedQueue: any[] = [];
+
+      chrome.storage.local.get = vi.fn(() => Promise.resolve({ visitQueue: savedQueue }));
+      chrome.storage.local.set = vi.fn((items: any) => {
+        savedQueue = items.visitQueue;
+        return Promise.resolve();
+      });
+
+      await visitQueue.add(mockVisit);
+      await visitQueue.add(mockVisit);
+
+      expect(savedQueue[0].client_visit_id).toEqual(expect.any(String));
+      expect(savedQueue[0].client_visit_id).not.toBe(savedQueue[1].client_visit_id);
+    });
+
     it('should append to existing queue', async () => {
       const existingVisit = { ...mockVisit, url: 'https://existing.com', timestamp: Date.now() };
       
@@ -5,7 +5,8 @@ const QUEUE_KEY = 'visitQueue';
 export const visitQueue = {
   async add(visit: VisitCreate): Promise<void> {
     const { [QUEUE_KEY]: queue = [] } = await chrome.storage.local.get([QUEUE_KEY]);
-    queue.push({ ...visit, timestamp: Date.now() });
+    // The id lets the backend drop re-sent visits when a sync is retried
+    queue.push({ ...visit, client_visit_id: crypto.randomUUID(), timestamp: Date.now() });
     await chrome.storage.local.set({ [QUEUE_KEY]: queue });
   },
 